@@ -16,6 +16,13 @@ DEFAULT_SAMPLING_INTERVAL = 60
 # How often remote reporter does a preemptive flush of its buffers
 DEFAULT_FLUSH_INTERVAL = 1
 
+# Default jaeger-agent address for reporting spans over UDP
+DEFAULT_REPORTING_HOST = 'localhost'
+DEFAULT_REPORTING_PORT = 6831
+
+# Max size of UDP packet jaeger-agent accepts
+UDP_MAX_PACKET_SIZE = 65000
+
 # Name of the HTTP header used to encode trace ID
 TRACE_ID_HEADER = 'uber-trace-id'
 
@@ -0,0 +1,129 @@
+import base64
+import json
+from json.encoder import encode_basestring
+from typing import Any, Dict, List, Sequence
+
+from opentracing import ReferenceType
+
+from async_jaeger.thrift import SPEC, get_tag_value
+
+# Spans encoded as JSON lines, one span per line, with field names of
+# jaeger JSON model (the one returned by jaeger-query API).
+
+PROTOCOL_JSON = 'json'
+
+TAG_TYPES = {
+    SPEC.TagType.STRING: 'string',
+    SPEC.TagType.DOUBLE: 'float64',
+    SPEC.TagType.BOOL: 'bool',
+    SPEC.TagType.LONG: 'int64',
+    SPEC.TagType.BINARY: 'binary',
+}
+
+REF_TYPES = {
+    ReferenceType.CHILD_OF: 'CHILD_OF',
+    ReferenceType.FOLLOWS_FROM: 'FOLLOWS_FROM',
+}
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+# Spans are formatted directly, only strings and doubles go through json
+# module, output is the same as of _encoder.encode() of the span dict.
+_SPAN_FORMAT = (
+    '{"traceID":"%032x","spanID":"%016x","operationName":%s,'
+    '"references":[%s],"flags":%d,"startTime":%d,"duration":%d,'
+    '"tags":[%s],"logs":[%s]%s}'
+)
+_REFERENCE_FORMAT = '{"refType":"%s","traceID":"%032x","spanID":"%016x"}'
+_TAG_FORMAT = '{"key":%s,"type":"%s","value":%s}'
+_LOG_FORMAT = '{"timestamp":%d,"fields":[%s]}'
+
+
+def _encode_tag_value(tag) -> str:
+    if tag.vType == SPEC.TagType.STRING:
+        return encode_basestring(tag.vStr)
+    if tag.vType == SPEC.TagType.BOOL:
+        return 'true' if tag.vBool else 'false'
+    if tag.vType == SPEC.TagType.LONG:
+        return '%d' % tag.vLong
+    if tag.vType == SPEC.TagType.BINARY:
+        return '"%s"' % base64.b64encode(tag.vBinary).decode('ascii')
+    return _encoder.encode(get_tag_value(tag))
+
+
+def _make_tags(tags) -> List[Dict[str, Any]]:
+    result = []
+    for tag in tags:
+        value = get_tag_value(tag)
+        if tag.vType == SPEC.TagType.BINARY:
+            value = base64.b64encode(value).decode('ascii')
+        result.append({
+            'key': tag.key, 'type': TAG_TYPES[tag.vType], 'value': value,
+        })
+    return result
+
+
+def _format_tags(tags) -> str:
+    return ','.join([
+        _TAG_FORMAT % (
+            encode_basestring(tag.key), TAG_TYPES[tag.vType],
+            _encode_tag_value(tag),
+        )
+        for tag in tags
+    ])
+
+
+def serialize_span(span) -> bytes:
+    """
+    Encodes finished span as JSON object without process, timestamps
+    and duration are in microseconds.
+    """
+    references = []
+    for ref in span.references or ():
+        if ref.type not in REF_TYPES:
+            raise ValueError('Unknown reference type %r' % ref.type)
+        references.append(_REFERENCE_FORMAT % (
+            REF_TYPES[ref.type],
+            ref.referenced_context.trace_id,
+            ref.referenced_context.span_id,
+        ))
+    return (_SPAN_FORMAT % (
+        span.trace_id,
+        span.span_id,
+        encode_basestring(span.operation_name),
+        ','.join(references),
+        span.flags,
+        int(span.start_time * 1000000),
+        int((span.end_time - span.start_time) * 1000000),
+        _format_tags(span.tags),
+        ','.join([
+            _LOG_FORMAT % (int(log.timestamp), _format_tags(log.fields))
+            for log in span.logs
+        ]),
+        (
+            ',"parentSpanID":"%016x"' % span.parent_id
+            if span.parent_id else ''
+        ),
+    )).encode('utf-8')
+
+
+def serialize_process(process: SPEC.Process) -> bytes:  # noqa
+    return _encoder.encode({
+        'serviceName': process.serviceName,
+        'tags': _make_tags(process.tags or ()),
+    }).encode('utf-8')
+
+
+def serialize_lines(spans: Sequence[bytes], process: bytes) -> bytes:
+    """
+    Joins spans encoded by serialize_span() into JSON lines, adding
+    process encoded by serialize_process() to every span.
+    """
+    head = b'{"process":' + process + b','
+    parts = []
+    for span in spans:
+        parts.append(head)
+        # span is a non-empty JSON object
+        parts.append(span[1:])
+        parts.append(b'\n')
+    return b''.join(parts)
@@ -1,3 +1,4 @@
 from .metrics import MetricsFactory  # noqa
 from .metrics import LegacyMetricsFactory  # noqa
 from .metrics import Metrics  # noqa
+from .metrics import TaggedMetricsFactory  # noqa
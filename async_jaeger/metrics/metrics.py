@@ -90,6 +90,42 @@ class LegacyMetricsFactory(MetricsFactory):
         return key
 
 
+class TaggedMetricsFactory(MetricsFactory):
+    """Adds ``tags`` to all metrics created by ``metrics_factory``."""
+
+    def __init__(
+        self, metrics_factory: MetricsFactory, tags: Dict[str, str]
+    ) -> None:
+        self._metrics_factory = metrics_factory
+        self._tags = tags
+
+    def _merge_tags(
+        self, tags: Optional[Dict[str, str]]
+    ) -> Dict[str, str]:
+        return dict(self._tags, **tags) if tags else self._tags
+
+    def create_counter(
+        self, name: str, tags: Optional[Dict[str, str]] = None
+    ) -> Callable[[int], None]:
+        return self._metrics_factory.create_counter(
+            name, self._merge_tags(tags)
+        )
+
+    def create_timer(
+        self, name: str, tags: Optional[Dict[str, str]] = None
+    ) -> Callable[[float], None]:
+        return self._metrics_factory.create_timer(
+            name, self._merge_tags(tags)
+        )
+
+    def create_gauge(
+        self, name: str, tags: Optional[Dict[str, str]] = None
+    ) -> Callable[[float], None]:
+        return self._metrics_factory.create_gauge(
+            name, self._merge_tags(tags)
+        )
+
+
 class Metrics(object):
     """
     Provides an abstraction of metrics reporting framework.
@@ -0,0 +1,231 @@
+import struct
+from typing import Sequence, Tuple
+
+from opentracing import ReferenceType
+from opentracing.ext import tags as ext_tags
+
+from async_jaeger.thrift import SPEC
+from async_jaeger.version import __version__
+
+# Spans encoded directly to OTLP protobuf (ExportTraceServiceRequest of
+# opentelemetry/proto/collector/trace/v1), without protobuf runtime.
+
+PROTOCOL_OTLP = 'otlp'
+CONTENT_TYPE = 'application/x-protobuf'
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LEN = 2
+
+SPAN_KIND_UNSPECIFIED = 0
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+SPAN_KIND_PRODUCER = 4
+SPAN_KIND_CONSUMER = 5
+
+SPAN_KINDS = {
+    ext_tags.SPAN_KIND_RPC_SERVER: SPAN_KIND_SERVER,
+    ext_tags.SPAN_KIND_RPC_CLIENT: SPAN_KIND_CLIENT,
+    ext_tags.SPAN_KIND_PRODUCER: SPAN_KIND_PRODUCER,
+    ext_tags.SPAN_KIND_CONSUMER: SPAN_KIND_CONSUMER,
+}
+
+STATUS_CODE_ERROR = 2
+
+SERVICE_NAME_KEY = 'service.name'
+SCOPE_NAME = 'async_jaeger'
+
+_fixed64 = struct.Struct('<Q').pack
+_double = struct.Struct('<d').pack
+# start_time_unix_nano and end_time_unix_nano of Span
+_span_times = struct.Struct('<BQBQ').pack
+
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _key(field: int, wire_type: int) -> int:
+    return field << 3 | wire_type
+
+
+def _varint(out: bytearray, value: int) -> None:
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _bytes_field(out: bytearray, field: int, value) -> None:
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    length = len(value)
+    if length < 0x80:
+        # most of strings are short
+        out += bytes((_key(field, WIRE_LEN), length))
+    else:
+        out.append(_key(field, WIRE_LEN))
+        _varint(out, length)
+    out += value
+
+
+def _any_value(tag) -> bytearray:
+    out = bytearray()
+    if tag.vType == SPEC.TagType.STRING:
+        _bytes_field(out, 1, tag.vStr)
+    elif tag.vType == SPEC.TagType.BOOL:
+        out.append(_key(2, WIRE_VARINT))
+        out.append(1 if tag.vBool else 0)
+    elif tag.vType == SPEC.TagType.LONG:
+        out.append(_key(3, WIRE_VARINT))
+        _varint(out, tag.vLong & _UINT64_MASK)
+    elif tag.vType == SPEC.TagType.DOUBLE:
+        out.append(_key(4, WIRE_FIXED64))
+        out += _double(tag.vDouble)
+    else:
+        _bytes_field(out, 7, tag.vBinary)
+    return out
+
+
+def _key_value(out: bytearray, field: int, key: str, tag) -> None:
+    key_value = bytearray()
+    _bytes_field(key_value, 1, key)
+    _bytes_field(key_value, 2, _any_value(tag))
+    _bytes_field(out, field, key_value)
+
+
+def _log_event(out: bytearray, log) -> None:
+    event = bytearray((_key(1, WIRE_FIXED64),))
+    event += _fixed64(log.timestamp * 1000)
+    for field in log.fields:
+        # jaeger convention: the event field names the log
+        if field.key == 'event' and field.vType == SPEC.TagType.STRING:
+            _bytes_field(event, 2, field.vStr)
+        else:
+            _key_value(event, 3, field.key, field)
+    _bytes_field(out, 11, event)
+
+
+def serialize_span(span) -> bytes:
+    """
+    Encodes finished span as an element of ``spans`` field of ScopeSpans.
+    ``span.kind`` and ``error`` tags are converted to span kind and status.
+    """
+    out = bytearray()
+    _bytes_field(out, 1, span.trace_id.to_bytes(16, 'big'))
+    _bytes_field(out, 2, span.span_id.to_bytes(8, 'big'))
+    parent_id = span.parent_id
+    if parent_id:
+        _bytes_field(out, 4, parent_id.to_bytes(8, 'big'))
+    _bytes_field(out, 5, span.operation_name)
+
+    kind = SPAN_KIND_UNSPECIFIED
+    error = False
+    attributes = bytearray()
+    for tag in span.tags:
+        if tag.key == ext_tags.SPAN_KIND and tag.vStr in SPAN_KINDS:
+            kind = SPAN_KINDS[tag.vStr]
+        elif tag.key == ext_tags.ERROR and tag.vBool:
+            error = True
+        else:
+            _key_value(attributes, 9, tag.key, tag)
+
+    if kind:
+        out.append(_key(6, WIRE_VARINT))
+        out.append(kind)
+    out += _span_times(
+        _key(7, WIRE_FIXED64), int(span.start_time * 1e9),
+        _key(8, WIRE_FIXED64), int(span.end_time * 1e9),
+    )
+    out += attributes
+    for log in span.logs:
+        _log_event(out, log)
+
+    for ref in span.references or ():
+        context = ref.referenced_context
+        if ref.type == ReferenceType.CHILD_OF and context.span_id == parent_id:
+            continue
+        link = bytearray()
+        _bytes_field(link, 1, context.trace_id.to_bytes(16, 'big'))
+        _bytes_field(link, 2, context.span_id.to_bytes(8, 'big'))
+        _bytes_field(out, 13, link)
+
+    if error:
+        status = bytearray((_key(3, WIRE_VARINT), STATUS_CODE_ERROR))
+        _bytes_field(out, 15, status)
+
+    span_field = bytearray()
+    _bytes_field(span_field, 2, out)
+    return bytes(span_field)
+
+
+def serialize_resource(process: SPEC.Process) -> bytes:  # noqa
+    """
+    Encodes process as ``resource`` field of ResourceSpans. Service name
+    is the ``service.name`` attribute, process tags are the rest of
+    attributes.
+    """
+    resource = bytearray()
+    _key_value(
+        resource, 1, SERVICE_NAME_KEY,
+        SPEC.Tag(vType=SPEC.TagType.STRING, vStr=process.serviceName)
+    )
+    for tag in process.tags or ():
+        _key_value(resource, 1, tag.key, tag)
+    out = bytearray()
+    _bytes_field(out, 1, resource)
+    return bytes(out)
+
+
+def _make_scope() -> bytes:
+    scope = bytearray()
+    _bytes_field(scope, 1, SCOPE_NAME)
+    _bytes_field(scope, 2, __version__)
+    out = bytearray()
+    _bytes_field(out, 1, scope)
+    return bytes(out)
+
+
+SCOPE = _make_scope()
+
+
+def get_request_overhead(resource: bytes) -> int:
+    """
+    Returns the upper bound of request size without spans:
+    keys and lengths of ResourceSpans and ScopeSpans, resource and scope.
+    """
+    return len(resource) + len(SCOPE) + 2 * (1 + 5)
+
+
+def serialize_request(spans: Sequence[bytes], resource: bytes) -> bytes:
+    """
+    Encodes ExportTraceServiceRequest from spans encoded by serialize_span()
+    and resource encoded by serialize_resource().
+    """
+    scope_spans = bytearray(SCOPE)
+    for span in spans:
+        scope_spans += span
+    resource_spans = bytearray(resource)
+    _bytes_field(resource_spans, 2, scope_spans)
+    out = bytearray()
+    _bytes_field(out, 1, resource_spans)
+    return bytes(out)
+
+
+def serialize_request_parts(
+        spans: Sequence[bytes], resource: bytes
+) -> Tuple[bytes, bytes]:
+    """
+    Returns parts of serialize_request() output which go before and after
+    ``spans``, so that request can be written without joining them.
+    """
+    scope_spans_length = len(SCOPE) + sum(len(span) for span in spans)
+    scope_spans_key = bytearray((_key(2, WIRE_LEN),))
+    _varint(scope_spans_key, scope_spans_length)
+    resource_spans_length = (
+        len(resource) + len(scope_spans_key) + scope_spans_length
+    )
+    head = bytearray((_key(1, WIRE_LEN),))
+    _varint(head, resource_spans_length)
+    head += resource
+    head += scope_spans_key
+    head += SCOPE
+    return bytes(head), b''
@@ -1,23 +1,137 @@
 import asyncio
+import bisect
+import functools
+import gzip
 import logging
+import math
+import os
+import random
+import struct
+import threading
+import time
+import zlib
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from email.utils import parsedate_to_datetime
 from http import HTTPStatus
-from typing import Any, Optional, Mapping, List
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import aiohttp
 from aiohttp import ClientSession, hdrs
-from thriftpy2.utils import serialize  # noqa
 
-from async_jaeger import thrift
-from async_jaeger.constants import DEFAULT_FLUSH_INTERVAL, MAX_TAG_VALUE_LENGTH
-from async_jaeger.metrics import MetricsFactory, Metrics, LegacyMetricsFactory
+from async_jaeger import jsonl, otlp, thrift
+from async_jaeger.constants import (
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_REPORTING_HOST,
+    DEFAULT_REPORTING_PORT,
+    MAX_TAG_VALUE_LENGTH,
+    UDP_MAX_PACKET_SIZE,
+)
+from async_jaeger.metrics import (
+    LegacyMetricsFactory,
+    Metrics,
+    MetricsFactory,
+    TaggedMetricsFactory,
+)
+from async_jaeger.shm import (
+    DEFAULT_RING_BYTES, RECORD_PROCESS, RECORD_SPAN, SharedRing
+)
 from async_jaeger.span import Span
+from async_jaeger.spool import Spool
 from async_jaeger.utils import ErrorReporter
 
 
 default_logger = logging.getLogger(__name__)
 
 
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_DEFLATE = 'deflate'
+
+COMPRESSORS: Dict[str, Callable[[bytes, int], bytes]] = {
+    COMPRESSION_GZIP: gzip.compress,
+    COMPRESSION_DEFLATE: zlib.compress,
+}
+
+# incremental compressors by compression level, for streamed batches
+STREAM_COMPRESSORS: Dict[str, Callable[[int], Any]] = {
+    COMPRESSION_GZIP: lambda level: zlib.compressobj(
+        level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    ),
+    COMPRESSION_DEFLATE: zlib.compressobj,
+}
+
+# Reasons spans are dropped by reporter without being submitted
+DROP_REASON_QUEUE_FULL = 'queue_full'
+DROP_REASON_CLOSED = 'closed'
+DROP_REASON_TOO_LARGE = 'too_large'
+DROP_REASON_RETRY_BUFFER_FULL = 'retry_buffer_full'
+DROP_REASON_SPOOL_EVICTED = 'spool_evicted'
+DROP_REASON_OLDEST = 'oldest'
+DROP_REASON_LOW_PRIORITY = 'low_priority'
+DROP_REASON_NON_ROOT = 'non_root'
+
+DROP_REASONS = (
+    DROP_REASON_QUEUE_FULL,
+    DROP_REASON_CLOSED,
+    DROP_REASON_TOO_LARGE,
+    DROP_REASON_RETRY_BUFFER_FULL,
+    DROP_REASON_SPOOL_EVICTED,
+    DROP_REASON_OLDEST,
+    DROP_REASON_LOW_PRIORITY,
+    DROP_REASON_NON_ROOT,
+)
+
+# Collector responses worth retrying, Retry-After is honored for
+# 429 and 503
+RETRYABLE_STATUSES = frozenset((
+    HTTPStatus.REQUEST_TIMEOUT,
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+))
+RETRY_AFTER_STATUSES = frozenset((
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+))
+
+# HttpReporter options passed to make_client_session()
+SESSION_OPTIONS = ('pool_size', 'keepalive_timeout', 'dns_cache_ttl')
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Returns delay in seconds from Retry-After header value."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
 class BaseReporter(ABC):
     """Abstract class."""
     def set_process(
@@ -32,6 +146,13 @@ class BaseReporter(ABC):
     def report_span(self, span: Span):
         pass
 
+    def get_load(self) -> float:
+        """
+        Returns how saturated the reporter is, from 0.0 (idle) to 1.0
+        (spans are dropped), see BackpressureSampler.
+        """
+        return 0.0
+
     async def close(self):
         pass
 
@@ -55,6 +176,69 @@ class InMemoryReporter(BaseReporter):
         return self.spans[:]
 
 
+class BoundedInMemoryReporter(InMemoryReporter):
+    """
+    Keeps the last ``capacity`` spans in memory, indexed by trace id and
+    operation name, e.g. for a debug page showing recent traces.
+    The oldest span is evicted to make room for a new one.
+    """
+    def __init__(self, capacity: int = 10000):
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        super().__init__()
+        self.capacity = capacity
+        self.spans: Deque[Span] = deque()  # type: ignore
+        # spans of every trace and operation in order they are reported,
+        # the oldest span is always the first one of its trace/operation
+        self.traces: 'OrderedDict[int, Deque[Span]]' = OrderedDict()
+        self.operations: Dict[str, Deque[Span]] = {}
+        # operation names spans were indexed by, they may be renamed later
+        self._operation_names: Deque[str] = deque()
+
+    def report_span(self, span: Span):
+        if len(self.spans) >= self.capacity:
+            self._evict(self.spans.popleft(), self._operation_names.popleft())
+        self.spans.append(span)
+        self._operation_names.append(span.operation_name)
+        trace = self.traces.get(span.trace_id)
+        if trace is None:
+            trace = self.traces[span.trace_id] = deque()
+        else:
+            self.traces.move_to_end(span.trace_id)
+        trace.append(span)
+        self.operations.setdefault(span.operation_name, deque()).append(span)
+
+    def _evict(self, span: Span, operation_name: str):
+        trace = self.traces[span.trace_id]
+        trace.popleft()
+        if not trace:
+            del self.traces[span.trace_id]
+        operation = self.operations[operation_name]
+        operation.popleft()
+        if not operation:
+            del self.operations[operation_name]
+
+    def get_spans(self, operation_name: Optional[str] = None) -> List[Span]:
+        if operation_name is None:
+            return list(self.spans)
+        return list(self.operations.get(operation_name, ()))
+
+    def get_trace(self, trace_id: int) -> List[Span]:
+        return list(self.traces.get(trace_id, ()))
+
+    def get_trace_ids(self, limit: Optional[int] = None) -> List[int]:
+        """Returns ids of traces, the most recently reported first."""
+        trace_ids = []
+        for trace_id in reversed(self.traces):
+            if limit is not None and len(trace_ids) >= limit:
+                break
+            trace_ids.append(trace_id)
+        return trace_ids
+
+    def get_operations(self) -> List[str]:
+        return list(self.operations)
+
+
 class LoggingReporter(NullReporter):
     def __init__(self, logger: Optional[logging.Logger] = None):
         self.logger = logger if logger else default_logger
@@ -63,42 +247,374 @@ class LoggingReporter(NullReporter):
         self.logger.info('Reporting span %s', span)
 
 
-class HttpReporter(NullReporter):
-    """Receives completed spans from Tracer and submits them via HTTP."""
+def _serialize_spans(
+        spans: Sequence[Any], encode_span: Callable[[Any], bytes]
+) -> List[Optional[bytes]]:
+    """
+    Serializes spans (or span records) in executor, spans already
+    serialized are passed as is and spans failed to serialize are None.
+    """
+    serialized: List[Optional[bytes]] = []
+    for span in spans:
+        if isinstance(span, bytes):
+            serialized.append(span)
+            continue
+        try:
+            serialized.append(encode_span(span))
+        except Exception:
+            serialized.append(None)
+    return serialized
+
+
+class SharedSpan(object):
+    """
+    Span reported to several reporters with the same protocol (see
+    CompositeReporter). It is serialized by the first reporter consuming
+    it, the others reuse ``data``. Reporters consuming it while it is
+    being serialized in executor serialize it on their own.
+    """
+    __slots__ = ('span', 'data')
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.data: Optional[bytes] = None
+
+
+# span waiting in reporter's queue
+QueuedSpan = Union[Span, SharedSpan, bytes]
+
+
+def _get_service_name(span: QueuedSpan) -> Optional[str]:
+    """Service of the span, None for the last process set."""
+    if isinstance(span, SharedSpan):
+        span = span.span
+    if isinstance(span, Span):
+        return span.tracer.service_name
+    return None
+
+
+class OverflowPolicy(ABC):
+    """
+    Decides which span is dropped when reporter's queue is full.
+
+    Queue holds Span objects, spans shared with other reporters (SharedSpan)
+    or spans already serialized (bytes), the latter are treated as regular
+    non-root spans.
+    """
+    @abstractmethod
+    def overflow(self, queue: Deque[QueuedSpan], span: QueuedSpan) -> str:
+        """
+        Called with a full ``queue`` instead of appending ``span`` to it.
+        Either drops ``span`` or removes a queued span and appends ``span``,
+        returns the reason of the drop.
+        """
+
+    def is_evictable(self, span: QueuedSpan) -> bool:
+        """
+        Whether ``overflow`` may remove queued ``span``. Reporter counts
+        such spans and passes an empty queue to ``overflow`` while there
+        are none, so policies looking for a span to evict don't scan a
+        queue of spans they keep.
+        """
+        return True
+
+
+class DropNewestPolicy(OverflowPolicy):
+    """Drops the span being reported, the default."""
+    def overflow(self, queue: Deque[QueuedSpan], span: QueuedSpan) -> str:
+        return DROP_REASON_QUEUE_FULL
+
+
+class DropOldestPolicy(OverflowPolicy):
+    """Drops the oldest queued span, so the most recent spans are kept."""
+    def overflow(self, queue: Deque[QueuedSpan], span: QueuedSpan) -> str:
+        queue.popleft()
+        queue.append(span)
+        return DROP_REASON_OLDEST
+
+
+def _is_priority_span(span: QueuedSpan) -> bool:
+    if isinstance(span, SharedSpan):
+        span = span.span
+    return isinstance(span, Span) and (span.is_debug() or span.is_error())
+
+
+def _is_root_span(span: QueuedSpan) -> bool:
+    if isinstance(span, SharedSpan):
+        span = span.span
+    return isinstance(span, Span) and not span.parent_id
+
+
+class DropLowPriorityPolicy(OverflowPolicy):
+    """
+    Drops spans that are neither debug nor errors first: the span being
+    reported if it is such a span, the oldest queued one otherwise.
+    """
+    def overflow(self, queue: Deque[QueuedSpan], span: QueuedSpan) -> str:
+        if not _is_priority_span(span):
+            return DROP_REASON_LOW_PRIORITY
+        for i, queued in enumerate(queue):
+            if not _is_priority_span(queued):
+                del queue[i]
+                queue.append(span)
+                return DROP_REASON_LOW_PRIORITY
+        return DROP_REASON_QUEUE_FULL
+
+    def is_evictable(self, span: QueuedSpan) -> bool:
+        return not _is_priority_span(span)
+
+
+class RootSpansOnlyPolicy(OverflowPolicy):
+    """
+    Degrades to reporting root spans only, which still give request rate
+    and latency of the service: child spans are dropped, the oldest queued
+    child span is dropped to make room for a root span.
+    """
+    def overflow(self, queue: Deque[QueuedSpan], span: QueuedSpan) -> str:
+        if not _is_root_span(span):
+            return DROP_REASON_NON_ROOT
+        for i, queued in enumerate(queue):
+            if not _is_root_span(queued):
+                del queue[i]
+                queue.append(span)
+                return DROP_REASON_NON_ROOT
+        return DROP_REASON_QUEUE_FULL
+
+    def is_evictable(self, span: QueuedSpan) -> bool:
+        return not _is_root_span(span)
+
+
+class AdaptiveBatching(object):
+    """
+    Adapts batch size and flush interval of BatchReporter to the traffic.
+
+    Span arrival rate and latency of successful submits are tracked as
+    exponentially weighted moving averages, ``alpha`` is the weight of
+    the latest sample. Flush interval is ``latency_factor`` times the
+    latency, so spans are held longer only when submits are expensive.
+    Batch size is the number of spans expected to arrive within the flush
+    interval, so busy services send a few large batches. Both are kept
+    within the ``min_*`` and ``max_*`` bounds.
+    """
+    def __init__(
+        self,
+        min_batch_size: int = 1,
+        max_batch_size: int = 100,
+        min_flush_interval: float = 0.05,
+        max_flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        latency_factor: float = 10.0,
+        alpha: float = 0.2,
+    ):
+        if not 0 < min_batch_size <= max_batch_size:
+            raise ValueError('Invalid batch size bounds')
+        if not 0 < min_flush_interval <= max_flush_interval:
+            raise ValueError('Invalid flush interval bounds')
+        if not 0 < alpha <= 1:
+            raise ValueError('alpha must be in (0, 1]')
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.min_flush_interval = min_flush_interval
+        self.max_flush_interval = max_flush_interval
+        self.latency_factor = latency_factor
+        self.alpha = alpha
+        # spans per second and seconds, None until the first sample
+        self.rate: Optional[float] = None
+        self.latency: Optional[float] = None
+        self._last_batch_at = time.monotonic()
+
+    def _average(self, average: Optional[float], sample: float) -> float:
+        if average is None:
+            return sample
+        return average + self.alpha * (sample - average)
+
+    def observe_batch(self, spans: int):
+        now = time.monotonic()
+        elapsed = now - self._last_batch_at
+        self._last_batch_at = now
+        if elapsed > 0:
+            self.rate = self._average(self.rate, spans / elapsed)
+
+    def observe_latency(self, latency: float):
+        self.latency = self._average(self.latency, latency)
+
+    def get_flush_interval(self, flush_interval: Optional[float]) -> float:
+        if self.latency is not None:
+            flush_interval = self.latency * self.latency_factor
+        elif flush_interval is None:
+            flush_interval = self.max_flush_interval
+        return min(
+            max(flush_interval, self.min_flush_interval),
+            self.max_flush_interval
+        )
+
+    def get_batch_size(self, batch_size: int, flush_interval: float) -> int:
+        if self.rate is not None:
+            batch_size = math.ceil(self.rate * flush_interval)
+        return min(max(batch_size, self.min_batch_size), self.max_batch_size)
+
+
+class BatchReporter(NullReporter):
+    """
+    Receives completed spans from Tracer, encodes them into thrift batches
+    in background and submits them with _send(), which is implemented
+    by subclasses.
+
+    Batches are encoded with thrift ``protocol`` (``binary`` or ``compact``).
+
+    Up to ``queue_capacity`` spans are buffered for the background consumer,
+    which drains all of them at once when woken up. When the queue is full,
+    ``overflow_policy`` decides which span is dropped (the reported one by
+    default, see OverflowPolicy subclasses).
+
+    If ``priority_queue_capacity`` is set, debug spans and spans tagged
+    ``error=true`` are queued into a separate lane of that capacity, which
+    is drained ahead of the regular queue, so they are not dropped under
+    pressure. Priority spans that do not fit into the lane are queued
+    as regular spans.
+
+    Spans may be reported from other threads (e.g. finished in
+    ``run_in_executor()``), they are buffered separately and handed over
+    to the event loop in bulk, with a single ``call_soon_threadsafe()``
+    at a time.
+
+    Batch is flushed when it has ``batch_size`` spans, when
+    ``flush_interval`` passed since its first span or, if
+    ``max_batch_bytes`` is set, when the next span would make serialized
+    (uncompressed) batch larger than ``max_batch_bytes``. Spans that do
+    not fit into ``max_batch_bytes`` alone are dropped.
+
+    Up to ``max_in_flight`` batches are being submitted concurrently while
+    the next batch is collected, batches may reach collector out of order.
+
+    Batches failed due to retryable errors (connection errors and timeouts
+    by default) are retried up to ``max_retries`` times with exponential
+    backoff (``retry_backoff`` doubled on every attempt, up to
+    ``retry_backoff_max``) and full jitter. Delays requested by the
+    receiving side are capped at ``retry_backoff_max`` as well. Batches
+    waiting for retry do not occupy in-flight slots and are kept in a retry
+    buffer of ``retry_buffer_bytes``, failed batches that do not fit into it
+    are dropped. On close, batches waiting for retry are woken up and get
+    a final attempt, batches failing it are spooled or dropped.
+
+    If ``spool`` is given, batches that could not be submitted due to
+    retryable errors are appended to it instead of being dropped, and
+    are submitted in background (in order, one at a time) once the
+    receiving side is available again. New batches are spooled as well
+    until the receiving side accepts a spooled batch, then they are
+    submitted directly while the rest of the spool is drained. Batches left in the spool are
+    submitted after restart, the spool is closed together with reporter.
+
+    If ``adaptive`` is given, ``batch_size`` and ``flush_interval`` are
+    only initial values and are adjusted by it after every batch.
+
+    Reporter can be shared by tracers of several services: process is set
+    by every tracer and spans are grouped by service name of their tracer
+    into a request per process when a batch is submitted. Spans already
+    serialized are sent with the process set last.
+
+    If ``executor`` is given, spans are serialized in it whenever at least
+    ``offload_threshold`` spans, or enough spans to fill the current batch,
+    are waiting, smaller amounts are serialized inline. Spans are copied into picklable records
+    for ProcessPoolExecutor. The executor is not shut down by reporter.
+    """
     def __init__(
         self,
-        url: str = 'http://127.0.0.1:14268/api/traces',
-        session: ClientSession = None,
         queue_capacity: int = 100,
         batch_size: int = 10,
         flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
         error_reporter: Optional[ErrorReporter] = None,
         metrics: Optional[Metrics] = None,
         metrics_factory: Optional[MetricsFactory] = None,
+        protocol: str = thrift.PROTOCOL_BINARY,
+        max_batch_bytes: Optional[int] = None,
+        max_in_flight: int = 1,
+        max_retries: int = 0,
+        retry_backoff: float = 0.1,
+        retry_backoff_max: float = 10.0,
+        retry_buffer_bytes: int = 4 * 1024 * 1024,
+        spool: Optional[Spool] = None,
+        adaptive: Optional[AdaptiveBatching] = None,
+        overflow_policy: Optional[OverflowPolicy] = None,
+        priority_queue_capacity: int = 0,
+        executor: Optional[Executor] = None,
+        offload_threshold: int = 100,
         **kwargs: Any
     ):
-        self.url = url
+        if protocol not in thrift.PROTOCOL_FACTORIES:
+            raise ValueError('Unknown thrift protocol %r' % protocol)
+        if max_in_flight < 1:
+            raise ValueError('max_in_flight must be positive')
+        if offload_threshold < 1:
+            raise ValueError('offload_threshold must be positive')
+
+        self.protocol = protocol
         self.logger = kwargs.get('logger', default_logger)
-        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_capacity)
+        # spans, or spans already serialized with ``protocol``
+        self.queue: Deque[QueuedSpan] = deque()
+        self.queue_capacity = queue_capacity
+        self.overflow_policy = overflow_policy or DropNewestPolicy()
+        # number of queued spans the policy may evict, None if it may evict
+        # any of them
+        self._evictable: Optional[int] = (
+            0 if type(self.overflow_policy).is_evictable
+            is not OverflowPolicy.is_evictable else None
+        )
+        # debug and error spans
+        self.priority_queue: Deque[QueuedSpan] = deque()
+        self.priority_queue_capacity = priority_queue_capacity
+        self.executor = executor
+        self.offload_threshold = offload_threshold
+        self._wakeup = asyncio.Event()
+        # wakes up batches waiting for retry on close
+        self._closing = asyncio.Event()
+        self._flush_due = False
         self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes or None
         self.flush_interval = flush_interval or None
-        self.stop = object()
+        self.max_in_flight = max_in_flight
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._in_flight_tasks: Set[asyncio.Task] = set()
+        self._in_flight_count = 0
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.retry_buffer_bytes = retry_buffer_bytes
+        self._retry_buffer_size = 0
+        self.spool = spool
+        self._drain_task: Optional[asyncio.Task] = None
+        # new batches are spooled until the receiving side is back
+        self._spool_pending = False
         self.stopped = False
+        # process set last, and processes encoded by service name
         self._process = None
-
-        if session:
-            self.session = session
-            self._close_session = False
-        else:
-            self.session = ClientSession()
-            self._close_session = True
+        self._process_data: Optional[bytes] = None
+        self._processes: Dict[str, bytes] = {}
+        self._batch_overhead = 0
 
         self.metrics_factory = metrics_factory or LegacyMetricsFactory(
             metrics or Metrics()
         )
         self.metrics = ReporterMetrics(self.metrics_factory)
+        self.adaptive = adaptive
+        if adaptive is not None:
+            self.flush_interval = adaptive.get_flush_interval(
+                self.flush_interval
+            )
+            self.batch_size = adaptive.get_batch_size(
+                batch_size, self.flush_interval
+            )
         self.error_reporter = error_reporter or ErrorReporter(Metrics())
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread = threading.get_ident()
+        # spans reported from other threads, waiting for the handover
+        self._foreign_queue: Deque[QueuedSpan] = deque()
+        self._foreign_dropped = 0
+        self._foreign_lock = threading.Lock()
+        self._handover_scheduled = False
         self.task = asyncio.create_task(self._consume_queue())
+        if self.spool is not None and len(self.spool):
+            # batches left by the previous process
+            self._drain_task = asyncio.create_task(self._drain_spool())
 
     def set_process(
             self,
@@ -109,78 +625,1516 @@ class HttpReporter(NullReporter):
         self._process = thrift.make_process(
             service_name=service_name, tags=tags, max_length=max_length
         )
+        # Process is the same for every batch, so it is encoded only once
+        self._process_data = self._encode_process(self._process)
+        self._processes[service_name] = self._process_data
+        self._batch_overhead = max(
+            self._get_batch_overhead(process)
+            for process in self._processes.values()
+        )
+
+    def _encode_process(self, process: thrift.SPEC.Process) -> bytes:
+        return thrift.serialize_struct(process, self.protocol)
+
+    def _get_batch_overhead(self, process: bytes) -> int:
+        return thrift.get_batch_overhead(process, self.protocol)
 
     def report_span(self, span: Span):
+        if threading.get_ident() != self._loop_thread:
+            self._report_foreign_span(span)
+        else:
+            self._queue_span(span)
+
+    def get_load(self) -> float:
+        queued = len(self.queue) + len(self._foreign_queue)
+        return min(queued / self.queue_capacity, 1.0)
+
+    def report_serialized_span(self, data: bytes):
+        """Reports a span already serialized with reporter's protocol."""
+        if threading.get_ident() != self._loop_thread:
+            self._report_foreign_span(data)
+        else:
+            self._queue_span(data)
+
+    def report_shared_span(self, span: SharedSpan):
+        """Reports a span serialized once for several reporters."""
+        if threading.get_ident() != self._loop_thread:
+            self._report_foreign_span(span)
+        else:
+            self._queue_span(span)
+
+    def _queue_span(self, span: QueuedSpan):
+        if self.stopped:
+            self._drop(1, DROP_REASON_CLOSED)
+            return
+        if self.priority_queue_capacity and _is_priority_span(span):
+            if len(self.priority_queue) < self.priority_queue_capacity:
+                self.priority_queue.append(span)
+                self.metrics.reporter_priority_queued(1)
+                if not self._wakeup.is_set():
+                    self._wakeup.set()
+                return
+            # lane is full, queue as a regular span
+            self.metrics.reporter_priority_overflow(1)
+        if len(self.queue) >= self.queue_capacity:
+            self._overflow(span)
+        else:
+            self.queue.append(span)
+            if self._evictable is not None:
+                self._evictable += self.overflow_policy.is_evictable(span)
+            if not self._wakeup.is_set():
+                self._wakeup.set()
+
+    def _overflow(self, span: QueuedSpan):
+        policy = self.overflow_policy
+        if self._evictable == 0:
+            # nothing to evict, let the policy pick the reason only
+            self._drop(1, policy.overflow(deque(), span))
+            return
+        self._drop(1, policy.overflow(self.queue, span))
+        if self._evictable is not None and self.queue[-1] is span:
+            # an evictable span made room for this one
+            self._evictable += policy.is_evictable(span) - 1
+
+    def _pop_span(self) -> QueuedSpan:
+        if self.priority_queue:
+            return self.priority_queue.popleft()
+        span = self.queue.popleft()
+        if self._evictable is not None:
+            self._evictable -= self.overflow_policy.is_evictable(span)
+        return span
+
+    def _report_foreign_span(self, span: QueuedSpan):
+        # deque.append() is atomic, the lock only guards the counter
+        # and scheduling of the handover
+        if len(self._foreign_queue) >= self.queue_capacity:
+            with self._foreign_lock:
+                self._foreign_dropped += 1
+        else:
+            self._foreign_queue.append(span)
+
+        if self._handover_scheduled:
+            return
+        with self._foreign_lock:
+            if self._handover_scheduled:
+                return
+            self._handover_scheduled = True
         try:
-            if self.stopped:
-                self.metrics.reporter_dropped(1)
-            else:
-                self.queue.put_nowait(span)
-        except asyncio.queues.QueueFull:
-            self.metrics.reporter_dropped(1)
+            self._loop.call_soon_threadsafe(self._take_foreign_spans)
+        except RuntimeError:
+            # event loop is closed, spans are lost anyway
+            pass
+
+    def _take_foreign_spans(self):
+        # reset the flag first: spans appended after that schedule
+        # the next handover
+        self._handover_scheduled = False
+        with self._foreign_lock:
+            dropped, self._foreign_dropped = self._foreign_dropped, 0
+        if dropped:
+            self._drop(dropped, DROP_REASON_QUEUE_FULL)
+        foreign_queue = self._foreign_queue
+        for _ in range(len(foreign_queue)):
+            self._queue_span(foreign_queue.popleft())
+
+    def _drop(self, count: int, reason: str):
+        self.metrics.reporter_dropped(count)
+        self.metrics.reporter_dropped_by_reason[reason](count)
 
     async def _consume_queue(self):
-        spans = []
-        stopped = False
-        while not stopped:
-            while len(spans) < self.batch_size:
-                try:
-                    # using timeout allows periodic flush with smaller packet
-                    timeout = (
-                        self.flush_interval
-                        if self.flush_interval and spans
-                        else None
+        loop = asyncio.get_event_loop()
+        spans: List[bytes] = []
+        # service names of spans
+        services: List[Optional[str]] = []
+        spans_bytes = 0
+        # span that did not fit into previous batch by size, and its service
+        overflow: Optional[bytes] = None
+        overflow_service: Optional[str] = None
+        # spans serialized in executor, with service names
+        ready: Deque[Tuple[Optional[str], bytes]] = deque()
+        flush_timer: Optional[asyncio.TimerHandle] = None
+        while True:
+            if self.executor is not None and not ready and overflow is None:
+                count = min(
+                    len(self.priority_queue) + len(self.queue),
+                    self.batch_size - len(spans),
+                )
+                if count >= min(self.offload_threshold, self.batch_size):
+                    ready.extend(await self._serialize_offloaded(count))
+
+            # drain everything available in one go
+            started_at = time.monotonic()
+            drained = False
+            while (
+                    (ready or self.priority_queue or self.queue)
+                    and overflow is None
+                    and len(spans) < self.batch_size
+            ):
+                drained = True
+                data: Optional[bytes]
+                if ready:
+                    service, data = ready.popleft()
+                else:
+                    span = self._pop_span()
+                    service = _get_service_name(span)
+                    data = (
+                        span if isinstance(span, bytes)
+                        else self._serialize_span(span)
+                    )
+                if data is None:
+                    continue
+                if self.max_batch_bytes:
+                    size = self._batch_overhead + len(data)
+                    if size > self.max_batch_bytes:
+                        self._drop_oversized_span(size)
+                        continue
+                    if size + spans_bytes > self.max_batch_bytes:
+                        overflow = data
+                        overflow_service = service
+                        break
+                spans.append(data)
+                services.append(service)
+                spans_bytes += len(data)
+            if drained:
+                self.metrics.reporter_loop_blocking_serialize(
+                    (time.monotonic() - started_at) * 1000000
+                )
+
+            if spans and flush_timer is None and self.flush_interval:
+                # one timer per batch allows periodic flush with smaller packet
+                flush_timer = loop.call_later(
+                    self.flush_interval, self._flush_timeout
+                )
+
+            if spans and (
+                    len(spans) >= self.batch_size
+                    or overflow is not None
+                    or self._flush_due
+                    or (
+                        self.stopped
+                        and not ready
+                        and not self.priority_queue
+                        and not self.queue
                     )
-                    span = await asyncio.wait_for(
-                        self.queue.get(), timeout=timeout
+            ):
+                if flush_timer is not None:
+                    flush_timer.cancel()
+                    flush_timer = None
+                self._flush_due = False
+                if self.adaptive is not None:
+                    self._adapt(self.adaptive, len(spans))
+                # wait for a free slot, new spans are queued meanwhile
+                await self._in_flight.acquire()
+                task = asyncio.create_task(
+                    self._submit_in_flight(spans, services)
+                )
+                self._in_flight_tasks.add(task)
+                task.add_done_callback(self._in_flight_tasks.discard)
+                spans = []
+                services = []
+                spans_bytes = 0
+                if overflow is not None:
+                    spans.append(overflow)
+                    services.append(overflow_service)
+                    spans_bytes = len(overflow)
+                    overflow = None
+                self.metrics.reporter_queue_length(len(self.queue))
+                if self.priority_queue_capacity:
+                    self.metrics.reporter_priority_queue_length(
+                        len(self.priority_queue)
                     )
-                except asyncio.TimeoutError:
+                continue
+
+            if ready or self.priority_queue or self.queue:
+                continue
+            if self.stopped:
+                break
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        self.logger.info('Span publisher exited')
+
+    def _flush_timeout(self):
+        self._flush_due = True
+        self._wakeup.set()
+
+    def _adapt(self, adaptive: AdaptiveBatching, spans: int):
+        adaptive.observe_batch(spans)
+        self.flush_interval = adaptive.get_flush_interval(self.flush_interval)
+        self.batch_size = adaptive.get_batch_size(
+            self.batch_size, self.flush_interval
+        )
+        self.metrics.reporter_batch_size(self.batch_size)
+        self.metrics.reporter_flush_interval(
+            int(self.flush_interval * 1000)
+        )
+
+    def _drop_oversized_span(self, size: int):
+        self._drop(1, DROP_REASON_TOO_LARGE)
+        self.error_reporter.error(
+            'Dropped span of %d bytes, max_batch_bytes is %d',
+            size, self.max_batch_bytes
+        )
+
+    async def _serialize_offloaded(
+            self, count: int
+    ) -> List[Tuple[Optional[str], bytes]]:
+        started_at = time.monotonic()
+        spans: List[Any] = []
+        for _ in range(count):
+            spans.append(self._pop_span())
+        services = [_get_service_name(span) for span in spans]
+        shared = spans
+        spans = [
+            (span.span if span.data is None else span.data)
+            if isinstance(span, SharedSpan) else span
+            for span in shared
+        ]
+        if isinstance(self.executor, ProcessPoolExecutor):
+            spans = [
+                span if isinstance(span, bytes)
+                else thrift.make_span_record(span)
+                for span in spans
+            ]
+        self.metrics.reporter_loop_blocking_serialize(
+            (time.monotonic() - started_at) * 1000000
+        )
+        try:
+            serialized = await asyncio.get_event_loop().run_in_executor(
+                self.executor, _serialize_spans, spans,
+                self._get_span_encoder()
+            )
+        except Exception as e:
+            self.metrics.reporter_failure(len(spans))
+            self.error_reporter.error('Failed to serialize spans: %s', e)
+            return []
+        for span, data in zip(shared, serialized):
+            if isinstance(span, SharedSpan) and span.data is None:
+                span.data = data
+        failed = serialized.count(None)
+        if failed:
+            self.metrics.reporter_failure(failed)
+            self.error_reporter.error('Failed to serialize %d spans', failed)
+        return [
+            (service, data) for service, data in zip(services, serialized)
+            if data is not None
+        ]
+
+    def _serialize_span(
+            self, span: Union[Span, SharedSpan]
+    ) -> Optional[bytes]:
+        if isinstance(span, SharedSpan):
+            if span.data is None:
+                span.data = self._serialize_span(span.span)
+            return span.data
+        try:
+            return self._encode_span(span)
+        except Exception as e:
+            self.metrics.reporter_failure(1)
+            self.error_reporter.error('Failed to serialize span: %s', e)
+            return None
+
+    async def _submit_in_flight(
+            self, spans: List[bytes], services: List[Optional[str]]
+    ):
+        self._in_flight_count += 1
+        self.metrics.reporter_in_flight(self._in_flight_count)
+        try:
+            if services.count(services[0]) == len(services):
+                await self._submit(spans, self._get_process(services[0]))
+                return
+            # a request per process
+            groups: Dict[Optional[bytes], List[bytes]] = {}
+            for service, data in zip(services, spans):
+                groups.setdefault(self._get_process(service), []).append(data)
+            for process, group in groups.items():
+                await self._submit(group, process)
+        finally:
+            self._in_flight_count -= 1
+            self.metrics.reporter_in_flight(self._in_flight_count)
+            self._in_flight.release()
+
+    def _get_process(self, service_name: Optional[str]) -> Optional[bytes]:
+        if service_name is None:
+            return self._process_data
+        return self._processes.get(service_name, self._process_data)
+
+    async def _submit(
+            self, spans: List[bytes], process: Optional[bytes] = None
+    ):
+        started_at = time.monotonic()
+        try:
+            data = self._encode(spans, process or self._process_data)
+        except Exception as e:
+            self.metrics.reporter_failure(len(spans))
+            self.error_reporter.error('Failed to encode batch: %s', e)
+            return
+        finally:
+            self.metrics.reporter_loop_blocking_encode(
+                (time.monotonic() - started_at) * 1000000
+            )
+
+        if self._spool_pending:
+            # keep order while receiving side is recovering
+            self._spool_batch(data, len(spans))
+            return
+
+        attempt = 0
+        retry_buffer_size = 0
+        try:
+            while True:
+                started_at = time.monotonic()
+                try:
+                    await self._send(data)
+                except Exception as e:
+                    if (
+                            attempt and self._closing.is_set()
+                            and self._is_retryable(e)
+                    ):
+                        # the final attempt on close failed
+                        if self.spool is not None:
+                            self._spool_batch(data, len(spans))
+                        else:
+                            self._drop(len(spans), DROP_REASON_CLOSED)
+                        return
+                    delay = self._get_retry_delay(e, attempt)
+                    if delay is None:
+                        if self.spool is not None and self._is_retryable(e):
+                            self._spool_batch(data, len(spans))
+                            return
+                        self.metrics.reporter_failure(len(spans))
+                        self.error_reporter.error(
+                            'Failed to submit traces to jaeger-collector: %s',
+                            e
+                        )
+                        return
+                    if not retry_buffer_size:
+                        if (
+                            self._retry_buffer_size + len(data)
+                            > self.retry_buffer_bytes
+                        ):
+                            if self.spool is not None:
+                                self._spool_batch(data, len(spans))
+                            else:
+                                self._drop(
+                                    len(spans), DROP_REASON_RETRY_BUFFER_FULL
+                                )
+                            return
+                        retry_buffer_size = len(data)
+                        self._retry_buffer_size += retry_buffer_size
+                    attempt += 1
+                    self.metrics.reporter_retries(1)
+                    await self._backoff(delay)
+                else:
+                    if self.adaptive is not None:
+                        self.adaptive.observe_latency(
+                            time.monotonic() - started_at
+                        )
+                    self.logger.debug('sent %r spans', len(spans))
+                    self.metrics.reporter_success(len(spans))
+                    return
+        finally:
+            self._retry_buffer_size -= retry_buffer_size
+
+    def _spool_batch(self, data: bytes, count: int):
+        try:
+            evicted = self.spool.append(bytes(data), count)  # type: ignore
+        except Exception as e:
+            self.metrics.reporter_failure(count)
+            self.error_reporter.error('Failed to spool batch: %s', e)
+            return
+        self.metrics.reporter_spooled(count)
+        self._spool_pending = True
+        if evicted:
+            self._drop(evicted, DROP_REASON_SPOOL_EVICTED)
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain_spool())
+
+    async def _drain_spool(self):
+        attempt = 0
+        try:
+            while True:
+                record = self.spool.peek()
+                if record is None:
                     break
+                data, count = record
+                try:
+                    await self._send(data)
+                except Exception as e:
+                    if self._is_retryable(e):
+                        delay = self._get_retry_after(e)
+                        if delay is None:
+                            delay = self._get_backoff(attempt)
+                        else:
+                            delay = min(delay, self.retry_backoff_max)
+                        attempt += 1
+                        await asyncio.sleep(delay)
+                        continue
+                    self.metrics.reporter_failure(count)
+                    self.error_reporter.error(
+                        'Failed to submit spooled traces: %s', e
+                    )
                 else:
-                    if span == self.stop:
-                        stopped = True
-                        self.queue.task_done()
-                        # don't return yet, submit accumulated spans first
-                        break
-                    else:
-                        spans.append(span)
-            if spans:
-                await self._submit(spans)
-                for _ in spans:
-                    self.queue.task_done()
-                spans = spans[:0]
-            self.metrics.reporter_queue_length(self.queue.qsize())
-        self.logger.info('Span publisher exited')
+                    self.metrics.reporter_success(count)
+                # receiving side is back, the rest of the spool is drained
+                # alongside new batches
+                self._spool_pending = False
+                attempt = 0
+                self.spool.consume()
+        except Exception as e:
+            self.error_reporter.error('Failed to drain spool: %s', e)
+        finally:
+            self._drain_task = None
+
+    @abstractmethod
+    async def _send(self, data: bytes):
+        pass
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, (ConnectionError, asyncio.TimeoutError))
+
+    def _get_retry_after(self, error: Exception) -> Optional[float]:
+        """Returns delay requested by the receiving side, if any."""
+        return None
+
+    def _get_retry_delay(
+            self, error: Exception, attempt: int
+    ) -> Optional[float]:
+        """Returns delay before the next attempt or None to give up."""
+        if attempt >= self.max_retries or not self._is_retryable(error):
+            return None
+        retry_after = self._get_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.retry_backoff_max)
+        return self._get_backoff(attempt)
+
+    def _get_backoff(self, attempt: int) -> float:
+        # exponential backoff with full jitter
+        backoff = min(self.retry_backoff * (2 ** attempt), self.retry_backoff_max)
+        return random.uniform(0, backoff)
+
+    async def _backoff(self, delay: float):
+        # batch waiting for retry releases its in-flight slot
+        self._in_flight_count -= 1
+        self.metrics.reporter_in_flight(self._in_flight_count)
+        self._in_flight.release()
+        try:
+            await asyncio.wait_for(self._closing.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await self._in_flight.acquire()
+            self._in_flight_count += 1
+            self.metrics.reporter_in_flight(self._in_flight_count)
+
+    def _encode(self, spans: List[bytes], process: Optional[bytes]) -> bytes:
+        if process is None:
+            raise RuntimeError('set_process() must be called before reporting')
+        data = self._encode_batch(spans, process)
+        self.metrics.reporter_bytes_raw(len(data))
+        return data
+
+    def _encode_span(self, span: Span) -> bytes:
+        return thrift.serialize_span(span, self.protocol)
+
+    def _get_span_encoder(self) -> Callable[[Any], bytes]:
+        """Returns picklable equivalent of _encode_span() for executor."""
+        return functools.partial(thrift.serialize_span, protocol=self.protocol)
+
+    def _encode_batch(self, spans: List[bytes], process: bytes) -> bytes:
+        return thrift.serialize_batch(
+            spans=spans, process=process, protocol=self.protocol
+        )
+
+    def _encode_batch_parts(
+            self, spans: List[bytes], process: bytes
+    ) -> Tuple[bytes, bytes]:
+        """Returns encoded batch without ``spans``: before and after them."""
+        return thrift.serialize_batch_parts(
+            spans=spans, process=process, protocol=self.protocol
+        )
+
+    async def close(self):
+        self._take_foreign_spans()
+        self.stopped = True
+        self._wakeup.set()
+        self._closing.set()
+        await self.task
+        while self._in_flight_tasks:
+            await asyncio.gather(*self._in_flight_tasks)
+        if self._drain_task is not None:
+            # spooled batches are kept for the next start
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+        if self.spool is not None:
+            self.spool.close()
+
+
+class StreamedBatch(object):
+    """
+    Encoded batch which is written to request body chunk by chunk,
+    compressing it on the fly, without joining its parts. ``len()`` is
+    the size of uncompressed batch, which is what it holds in memory and
+    what retry buffer is charged with, ``bytes()`` joins and compresses it.
+    ``sent`` is the size of the last request body generated to the end.
+    """
+    def __init__(
+        self,
+        parts: List[bytes],
+        compression: Optional[str],
+        compression_level: int,
+        chunk_size: int,
+    ):
+        self.parts = parts
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunk_size = chunk_size
+        self.size = sum(len(part) for part in parts)
+        self.sent: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bytes__(self) -> bytes:
+        data = b''.join(self.parts)
+        if self.compression:
+            data = COMPRESSORS[self.compression](data, self.compression_level)
+        return data
 
-    async def _submit(self, spans):
+    async def chunks(self):
+        """Generates request body, every call starts it anew."""
+        compressor = None
+        if self.compression:
+            compressor = STREAM_COMPRESSORS[self.compression](
+                self.compression_level
+            )
+        sent = 0
+        chunk = bytearray()
+        for index, part in enumerate(self.parts):
+            chunk += part
+            if len(chunk) < self.chunk_size and index < len(self.parts) - 1:
+                continue
+            data = bytes(chunk) if compressor is None else (
+                compressor.compress(chunk)
+            )
+            chunk.clear()
+            if data:
+                sent += len(data)
+                yield data
+        if compressor is not None:
+            data = compressor.flush()
+            sent += len(data)
+            yield data
+        self.sent = sent
+
+
+def make_client_session(
+    metrics_factory: MetricsFactory,
+    pool_size: int = 10,
+    keepalive_timeout: float = 30.0,
+    dns_cache_ttl: Optional[int] = 300,
+) -> ClientSession:
+    """
+    Creates ClientSession for reporters keeping up to ``pool_size``
+    connections, idle ones are kept alive for ``keepalive_timeout`` seconds.
+    Resolved addresses are cached for ``dns_cache_ttl`` seconds (forever
+    if None, not cached if 0). TCP_NODELAY is set by aiohttp on every
+    connection. Created and reused connections are counted
+    with ``metrics_factory``.
+    """
+    metrics = ConnectionMetrics(metrics_factory)
+
+    async def on_connection_created(session, context, params):
+        metrics.created(1)
+
+    async def on_connection_reused(session, context, params):
+        metrics.reused(1)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_created)
+    trace_config.on_connection_reuseconn.append(on_connection_reused)
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        keepalive_timeout=keepalive_timeout,
+        use_dns_cache=dns_cache_ttl != 0,
+        ttl_dns_cache=dns_cache_ttl,
+    )
+    return ClientSession(connector=connector, trace_configs=[trace_config])
+
+
+class HttpReporter(BatchReporter):
+    """
+    Receives completed spans from Tracer and submits them via HTTP.
+
+    Batches are optionally compressed with ``compression`` (``gzip`` or
+    ``deflate``), which is announced to the collector with Content-Encoding
+    header. N.B. jaeger-collector accepts only binary protocol without
+    compression on /api/traces, other combinations require a proxy in front
+    of it.
+
+    In addition to connection errors and timeouts, 408/429/5xx responses are
+    retried, Retry-After header is honored for 429 and 503.
+
+    Batches of at least ``stream_threshold`` bytes are streamed to the
+    collector with chunked transfer encoding in chunks of
+    ``stream_chunk_size`` bytes, instead of being joined (and compressed)
+    into a single buffer first.
+
+    Unless ``session`` is passed, connections are pooled as configured with
+    ``pool_size``, ``keepalive_timeout`` and ``dns_cache_ttl`` (see
+    make_client_session()). Requests time out after ``request_timeout``
+    seconds, and establishing a connection after ``connect_timeout``
+    seconds (session defaults if None). If ``warm_up_connections`` is set,
+    that many connections are opened on start, see warm_up().
+
+    See BatchReporter for batching, concurrency and retry options.
+    """
+    success_status = HTTPStatus.ACCEPTED
+
+    def __init__(
+        self,
+        url: str = 'http://127.0.0.1:14268/api/traces',
+        session: ClientSession = None,
+        queue_capacity: int = 100,
+        batch_size: int = 10,
+        flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+        error_reporter: Optional[ErrorReporter] = None,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+        protocol: str = thrift.PROTOCOL_BINARY,
+        compression: Optional[str] = None,
+        compression_level: int = 6,
+        stream_threshold: Optional[int] = None,
+        stream_chunk_size: int = 64 * 1024,
+        pool_size: int = 10,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: Optional[int] = 300,
+        request_timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        warm_up_connections: int = 0,
+        **kwargs: Any
+    ):
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError('Unknown compression %r' % compression)
+        if stream_chunk_size < 1:
+            raise ValueError('stream_chunk_size must be positive')
+        if pool_size < 1:
+            raise ValueError('pool_size must be positive')
+        if warm_up_connections < 0:
+            raise ValueError('warm_up_connections must not be negative')
+        super().__init__(
+            queue_capacity=queue_capacity,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            error_reporter=error_reporter,
+            metrics=metrics,
+            metrics_factory=metrics_factory,
+            protocol=protocol,
+            **kwargs
+        )
+
+        self.url = url
+        self.compression = compression
+        self.compression_level = compression_level
+        self.stream_threshold = stream_threshold
+        self.stream_chunk_size = stream_chunk_size
+        self.headers = {hdrs.CONTENT_TYPE: thrift.CONTENT_TYPES[protocol]}
+        if compression:
+            self.headers[hdrs.CONTENT_ENCODING] = compression
+
+        self.timeout: Optional[aiohttp.ClientTimeout] = None
+        if request_timeout is not None or connect_timeout is not None:
+            self.timeout = aiohttp.ClientTimeout(
+                total=request_timeout, connect=connect_timeout
+            )
+
+        if session:
+            self.session = session
+            self._close_session = False
+        else:
+            self.session = make_client_session(
+                self.metrics_factory,
+                pool_size=pool_size,
+                keepalive_timeout=keepalive_timeout,
+                dns_cache_ttl=dns_cache_ttl,
+            )
+            self._close_session = True
+
+        self._warm_up_task: Optional[asyncio.Task] = None
+        if warm_up_connections:
+            self._warm_up_task = asyncio.create_task(
+                self.warm_up(warm_up_connections)
+            )
+
+    async def warm_up(self, connections: Optional[int] = None):
+        """
+        Opens ``connections`` (``max_in_flight`` by default) connections
+        to the collector with concurrent OPTIONS requests, so that the first
+        batches do not wait for connection (and TLS) setup. Connections stay
+        in the pool of the session, status of responses is ignored.
+        """
+        results = await asyncio.gather(
+            *(
+                self._open_connection()
+                for _ in range(connections or self.max_in_flight)
+            ),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.error_reporter.error(
+                    'Failed to open connection to %s: %s', self.url, result
+                )
+
+    async def _open_connection(self):
+        kwargs = {} if self.timeout is None else {'timeout': self.timeout}
+        async with self.session.options(self.url, **kwargs) as resp:
+            # connection is kept alive only once the response is consumed
+            await resp.read()
+
+    def _encode(self, spans: List[bytes], process: Optional[bytes]) -> bytes:
+        if (
+                self.stream_threshold is not None
+                and process is not None
+                and self._batch_overhead + sum(len(span) for span in spans)
+                >= self.stream_threshold
+        ):
+            head, tail = self._encode_batch_parts(spans, process)
+            batch = StreamedBatch(
+                [head] + spans + [tail],
+                self.compression, self.compression_level,
+                self.stream_chunk_size,
+            )
+            self.metrics.reporter_bytes_raw(len(batch))
+            return batch  # type: ignore
+        data = super()._encode(spans, process)
+        if self.compression:
+            data = COMPRESSORS[self.compression](data, self.compression_level)
+        return data
+
+    async def _send(self, data: bytes):
+        started_at = time.monotonic()
+        kwargs = {} if self.timeout is None else {'timeout': self.timeout}
         try:
-            batch = thrift.make_batch(spans=spans, process=self._process)
-            serialized_batch = serialize(batch)
             async with self.session.post(
                     self.url,
-                    data=serialized_batch,
-                    headers={hdrs.CONTENT_TYPE: 'application/x-thrift'}
+                    data=(
+                        data.chunks() if isinstance(data, StreamedBatch)
+                        else data
+                    ),
+                    headers=self.headers,
+                    **kwargs
             ) as resp:
-                if resp.status != HTTPStatus.ACCEPTED:
+                if resp.status != self.success_status:
                     raise aiohttp.ClientResponseError(
-                        resp.request_info, resp.history, code=resp.status
+                        resp.request_info, resp.history,
+                        status=resp.status, headers=resp.headers
                     )
-            self.logger.debug('sent %r spans', len(spans))
-            self.metrics.reporter_success(len(spans))
-        except Exception as e:
-            self.metrics.reporter_failure(len(spans))
-            self.error_reporter.error(
-                'Failed to submit traces to jaeger-collector: %s', e
+            # counted once per acknowledged batch, not per attempt
+            if isinstance(data, StreamedBatch):
+                if data.sent is not None:
+                    self.metrics.reporter_bytes_sent(data.sent)
+            else:
+                self.metrics.reporter_bytes_sent(len(data))
+        finally:
+            self.metrics.reporter_request_latency(
+                (time.monotonic() - started_at) * 1000000
             )
 
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUSES
+        return isinstance(
+            error, (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        )
+
+    def _get_retry_after(self, error: Exception) -> Optional[float]:
+        if (
+                isinstance(error, aiohttp.ClientResponseError)
+                and error.status in RETRY_AFTER_STATUSES
+                and error.headers
+        ):
+            return parse_retry_after(error.headers.get(hdrs.RETRY_AFTER))
+        return None
+
     async def close(self):
-        self.stopped = True
-        await self.queue.put(self.stop)
-        await self.queue.join()
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+            try:
+                await self._warm_up_task
+            except asyncio.CancelledError:
+                pass
+        await super().close()
         if self._close_session:
             await self.session.close()
 
 
+class OtlpHttpReporter(HttpReporter):
+    """
+    Submits spans to OTLP/HTTP receiver (OpenTelemetry collector, or
+    jaeger-collector with OTLP enabled) as protobuf ExportTraceServiceRequest,
+    spans are encoded without intermediate thrift structures.
+
+    Process is encoded once as the resource: service name becomes
+    ``service.name`` attribute and process tags the rest of attributes.
+    ``span.kind`` and ``error`` tags are converted to span kind and status,
+    logs to events, references other than the parent to links.
+
+    See HttpReporter for compression and retries and BatchReporter for
+    batching options.
+    """
+    success_status = HTTPStatus.OK
+
+    def __init__(
+        self,
+        url: str = 'http://127.0.0.1:4318/v1/traces',
+        session: ClientSession = None,
+        queue_capacity: int = 100,
+        batch_size: int = 10,
+        flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+        error_reporter: Optional[ErrorReporter] = None,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+        compression: Optional[str] = None,
+        compression_level: int = 6,
+        **kwargs: Any
+    ):
+        super().__init__(
+            url=url,
+            session=session,
+            queue_capacity=queue_capacity,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            error_reporter=error_reporter,
+            metrics=metrics,
+            metrics_factory=metrics_factory,
+            compression=compression,
+            compression_level=compression_level,
+            **kwargs
+        )
+        self.protocol = otlp.PROTOCOL_OTLP
+        self.headers[hdrs.CONTENT_TYPE] = otlp.CONTENT_TYPE
+
+    def _encode_process(self, process: thrift.SPEC.Process) -> bytes:
+        return otlp.serialize_resource(process)
+
+    def _get_batch_overhead(self, process: bytes) -> int:
+        return otlp.get_request_overhead(process)
+
+    def _encode_span(self, span: Span) -> bytes:
+        return otlp.serialize_span(span)
+
+    def _get_span_encoder(self) -> Callable[[Any], bytes]:
+        return otlp.serialize_span
+
+    def _encode_batch(self, spans: List[bytes], process: bytes) -> bytes:
+        return otlp.serialize_request(spans, process)
+
+    def _encode_batch_parts(
+            self, spans: List[bytes], process: bytes
+    ) -> Tuple[bytes, bytes]:
+        return otlp.serialize_request_parts(spans, process)
+
+
+class CollectorEndpoint(object):
+    """
+    Collector endpoint of ShardedHttpReporter with its own HttpReporter.
+    Endpoint is ejected for ``ejection_time`` seconds after
+    ``max_failures`` consecutive failed requests, after that a single
+    failure ejects it again until a request succeeds.
+    """
+    def __init__(
+        self,
+        url: str,
+        max_failures: int,
+        ejection_time: float,
+        metrics_factory: MetricsFactory,
+    ):
+        self.url = url
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.reporter: Optional[HttpReporter] = None
+        self._ejections = metrics_factory.create_counter(
+            name='jaeger:reporter_endpoint_ejections'
+        )
+        self._available = metrics_factory.create_gauge(
+            name='jaeger:reporter_endpoint_available'
+        )
+        self._available(1)
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def on_success(self):
+        if self.failures:
+            self.failures = 0
+            self._available(1)
+
+    def on_failure(self):
+        self.failures += 1
+        if self.failures >= self.max_failures:
+            self.ejected_until = time.monotonic() + self.ejection_time
+            # probe with a single request once ejection is over
+            self.failures = self.max_failures - 1
+            self._ejections(1)
+            self._available(0)
+
+
+class EndpointHttpReporter(HttpReporter):
+    """HttpReporter reporting outcome of requests to CollectorEndpoint."""
+    def __init__(self, endpoint: CollectorEndpoint, **kwargs: Any):
+        super().__init__(url=endpoint.url, **kwargs)
+        self.endpoint = endpoint
+
+    async def _send(self, data: bytes):
+        try:
+            await super()._send(data)
+        except Exception:
+            self.endpoint.on_failure()
+            raise
+        self.endpoint.on_success()
+
+
+class ShardedHttpReporter(BaseReporter):
+    """
+    Submits spans to several collectors ``urls`` without a load balancer.
+
+    Spans are sharded by consistent hash of trace id (with ``replicas``
+    virtual nodes per collector), so all spans of a trace reported by this
+    process land on the same collector. Collectors failing ``max_failures``
+    requests in a row are ejected for ``ejection_time`` seconds and their
+    share of traces goes to the next collectors on the ring, then they get
+    their traces back and are ejected again by a single failure. Batches
+    already queued for ejected collector are not rerouted.
+
+    Every collector has its own HttpReporter created with ``kwargs``,
+    its metrics are tagged with ``endpoint`` url. Spool and adaptive
+    batching can not be shared by the reporters, they are created per
+    collector by ``spool_factory`` (called with collector url) and
+    ``adaptive_factory``. Unless ``session`` is
+    passed, the reporters share a session created with connection options
+    of ``kwargs``, ``pool_size`` limits connections to all collectors.
+    """
+    def __init__(
+        self,
+        urls: Sequence[str],
+        session: ClientSession = None,
+        max_failures: int = 3,
+        ejection_time: float = 10.0,
+        replicas: int = 100,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+        spool_factory: Optional[Callable[[str], Spool]] = None,
+        adaptive_factory: Optional[Callable[[], AdaptiveBatching]] = None,
+        **kwargs: Any
+    ):
+        if not urls:
+            raise ValueError('At least one collector url is required')
+        if max_failures < 1:
+            raise ValueError('max_failures must be positive')
+        for name in ('spool', 'adaptive'):
+            if kwargs.pop(name, None) is not None:
+                raise ValueError(
+                    '%s can not be shared by collectors, pass %s_factory'
+                    % (name, name)
+                )
+        metrics_factory = metrics_factory or LegacyMetricsFactory(
+            metrics or Metrics()
+        )
+        if session:
+            self.session = session
+            self._close_session = False
+        else:
+            self.session = make_client_session(metrics_factory, **{
+                key: kwargs[key] for key in SESSION_OPTIONS if key in kwargs
+            })
+            self._close_session = True
+
+        self.endpoints: List[CollectorEndpoint] = []
+        for url in urls:
+            endpoint_metrics_factory = TaggedMetricsFactory(
+                metrics_factory, {'endpoint': url}
+            )
+            endpoint = CollectorEndpoint(
+                url, max_failures, ejection_time, endpoint_metrics_factory
+            )
+            endpoint.reporter = EndpointHttpReporter(
+                endpoint,
+                session=self.session,
+                metrics_factory=endpoint_metrics_factory,
+                spool=spool_factory(url) if spool_factory else None,
+                adaptive=adaptive_factory() if adaptive_factory else None,
+                **kwargs
+            )
+            self.endpoints.append(endpoint)
+
+        ring = sorted(
+            (zlib.crc32(('%s#%d' % (url, i)).encode('utf-8')), index)
+            for index, url in enumerate(urls)
+            for i in range(replicas)
+        )
+        self._ring_hashes = [key for key, _ in ring]
+        self._ring_endpoints = [self.endpoints[index] for _, index in ring]
+
+    def get_endpoint(self, trace_id: int) -> CollectorEndpoint:
+        ring_size = len(self._ring_hashes)
+        start = bisect.bisect(
+            self._ring_hashes, zlib.crc32(trace_id.to_bytes(16, 'big'))
+        )
+        now = time.monotonic()
+        for i in range(start, start + ring_size):
+            endpoint = self._ring_endpoints[i % ring_size]
+            if endpoint.is_available(now):
+                return endpoint
+        # all collectors are ejected, stick to the first choice
+        return self._ring_endpoints[start % ring_size]
+
+    def set_process(
+            self,
+            service_name: str,
+            tags: Mapping[str, Any],
+            max_length: int = MAX_TAG_VALUE_LENGTH
+    ):
+        for endpoint in self.endpoints:
+            endpoint.reporter.set_process(  # type: ignore
+                service_name, tags, max_length
+            )
+
+    def report_span(self, span: Span):
+        self.get_endpoint(span.trace_id).reporter.report_span(  # type: ignore
+            span
+        )
+
+    def get_load(self) -> float:
+        return max(
+            endpoint.reporter.get_load()  # type: ignore
+            for endpoint in self.endpoints
+        )
+
+    async def close(self):
+        try:
+            await asyncio.gather(*(
+                endpoint.reporter.close()  # type: ignore
+                for endpoint in self.endpoints
+            ))
+        finally:
+            if self._close_session:
+                await self.session.close()
+
+
+class AgentProtocol(asyncio.DatagramProtocol):
+    def __init__(self, reporter: 'AgentUdpReporter'):
+        self.reporter = reporter
+
+    def error_received(self, exc: Exception):
+        self.reporter.error_reporter.error(
+            'Failed to send traces to jaeger-agent: %s', exc
+        )
+
+
+class AgentUdpReporter(BatchReporter):
+    """
+    Receives completed spans from Tracer and submits them to jaeger-agent
+    via UDP as Agent.emitBatch calls encoded with compact protocol.
+
+    Every batch is sent in a single packet of up to ``max_packet_size``
+    bytes, so batches are cut by size as well as by ``batch_size``.
+    UDP gives no delivery confirmation, so spans are counted as reported
+    once the packet is handed to the OS.
+
+    See BatchReporter for batching and concurrency options.
+    """
+    def __init__(
+        self,
+        host: str = DEFAULT_REPORTING_HOST,
+        port: int = DEFAULT_REPORTING_PORT,
+        queue_capacity: int = 100,
+        batch_size: int = 10,
+        flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+        error_reporter: Optional[ErrorReporter] = None,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+        max_packet_size: int = UDP_MAX_PACKET_SIZE,
+        **kwargs: Any
+    ):
+        super().__init__(
+            queue_capacity=queue_capacity,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            error_reporter=error_reporter,
+            metrics=metrics,
+            metrics_factory=metrics_factory,
+            protocol=thrift.PROTOCOL_COMPACT,
+            max_batch_bytes=max_packet_size,
+            **kwargs
+        )
+        self.host = host
+        self.port = port
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._connect_lock = asyncio.Lock()
+
+    def _get_batch_overhead(self, process: bytes) -> int:
+        return (
+            super()._get_batch_overhead(process) + thrift.EMIT_BATCH_OVERHEAD
+        )
+
+    def _encode(self, spans: List[bytes], process: Optional[bytes]) -> bytes:
+        data = thrift.serialize_emit_batch(super()._encode(spans, process))
+        self.metrics.reporter_bytes_sent(len(data))
+        return data
+
+    async def _get_transport(self) -> asyncio.DatagramTransport:
+        async with self._connect_lock:
+            if self._transport is None or self._transport.is_closing():
+                loop = asyncio.get_event_loop()
+                self._transport, _ = await loop.create_datagram_endpoint(
+                    lambda: AgentProtocol(self),
+                    remote_addr=(self.host, self.port)
+                )
+        return self._transport
+
+    async def _send(self, data: bytes):
+        transport = await self._get_transport()
+        transport.sendto(data)
+
+    async def close(self):
+        await super().close()
+        if self._transport is not None:
+            self._transport.close()
+
+
+ENCODING_THRIFT = 'thrift'
+ENCODING_JSON = 'json'
+
+# length prefix of thrift batches written by FileReporter
+FILE_RECORD_LENGTH = struct.Struct('!I')
+
+
+class FileReporter(BatchReporter):
+    """
+    Writes spans to file ``path`` for offline analysis.
+
+    With ``thrift`` ``encoding`` every batch is written as a Batch struct
+    serialized with ``protocol`` and prefixed with its length (4 bytes,
+    big endian). With ``json`` encoding every span is written as a line
+    with JSON object including the process, see async_jaeger.jsonl.
+
+    Writes are buffered (``buffer_size``) and made in a dedicated thread.
+    The file is synced to disk at most every ``fsync_interval`` seconds,
+    after every batch if it is 0 or only on close if it is None.
+
+    The file is rotated before a write which would make it larger than
+    ``max_bytes`` or when it has been written for ``rotate_interval``
+    seconds: ``path`` is renamed to ``path.1``, ``path.1`` to ``path.2``
+    and so on, up to ``backup_count`` files are kept. As with
+    RotatingFileHandler, the file is never rotated if ``backup_count`` is 0.
+
+    See BatchReporter for batching options.
+    """
+    def __init__(
+        self,
+        path: str,
+        encoding: str = ENCODING_THRIFT,
+        queue_capacity: int = 1000,
+        batch_size: int = 100,
+        flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+        error_reporter: Optional[ErrorReporter] = None,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+        protocol: str = thrift.PROTOCOL_BINARY,
+        max_bytes: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        backup_count: int = 5,
+        fsync_interval: Optional[float] = 1.0,
+        buffer_size: int = 64 * 1024,
+        **kwargs: Any
+    ):
+        if encoding not in (ENCODING_THRIFT, ENCODING_JSON):
+            raise ValueError('Unknown encoding %r' % encoding)
+        if backup_count < 0:
+            raise ValueError('backup_count must not be negative')
+        super().__init__(
+            queue_capacity=queue_capacity,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            error_reporter=error_reporter,
+            metrics=metrics,
+            metrics_factory=metrics_factory,
+            protocol=protocol,
+            **kwargs
+        )
+        if encoding == ENCODING_JSON:
+            self.protocol = jsonl.PROTOCOL_JSON
+        self.path = path
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+        # the file is used only by the writer thread
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='jaeger-file-reporter'
+        )
+        self._file: Optional[Any] = None
+        self._file_size = 0
+        self._opened_at = 0.0
+        self._synced_at = 0.0
+
+    def _encode_process(self, process: thrift.SPEC.Process) -> bytes:
+        if self.encoding == ENCODING_JSON:
+            return jsonl.serialize_process(process)
+        return super()._encode_process(process)
+
+    def _get_batch_overhead(self, process: bytes) -> int:
+        if self.encoding == ENCODING_JSON:
+            return 0
+        return super()._get_batch_overhead(process)
+
+    def _encode_span(self, span: Span) -> bytes:
+        if self.encoding == ENCODING_JSON:
+            return jsonl.serialize_span(span)
+        return super()._encode_span(span)
+
+    def _get_span_encoder(self) -> Callable[[Any], bytes]:
+        if self.encoding == ENCODING_JSON:
+            return jsonl.serialize_span
+        return super()._get_span_encoder()
+
+    def _encode_batch(self, spans: List[bytes], process: bytes) -> bytes:
+        if self.encoding == ENCODING_JSON:
+            return jsonl.serialize_lines(spans, process)
+        data = super()._encode_batch(spans, process)
+        return FILE_RECORD_LENGTH.pack(len(data)) + data
+
+    def _encode(self, spans: List[bytes], process: Optional[bytes]) -> bytes:
+        data = super()._encode(spans, process)
+        self.metrics.reporter_bytes_sent(len(data))
+        return data
+
+    async def _send(self, data: bytes):
+        await asyncio.get_event_loop().run_in_executor(
+            self._writer, self._write, data
+        )
+
+    def _write(self, data: bytes):
+        now = time.monotonic()
+        if (
+                self._file is not None
+                and self._file_size
+                and self.backup_count
+                and (
+                    (
+                        self.max_bytes is not None
+                        and self._file_size + len(data) > self.max_bytes
+                    ) or (
+                        self.rotate_interval is not None
+                        and now - self._opened_at >= self.rotate_interval
+                    )
+                )
+        ):
+            self._close_file()
+            self._rotate()
+        if self._file is None:
+            self._file = open(self.path, 'ab', buffering=self.buffer_size)
+            self._file_size = self._file.tell()
+            self._opened_at = self._synced_at = now
+        self._file.write(data)
+        self._file_size += len(data)
+        if (
+                self.fsync_interval is not None
+                and now - self._synced_at >= self.fsync_interval
+        ):
+            self._sync(now)
+
+    def _sync(self, now: float):
+        self._file.flush()  # type: ignore
+        os.fsync(self._file.fileno())  # type: ignore
+        self._synced_at = now
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        try:
+            self._sync(time.monotonic())
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = '%s.%d' % (self.path, index)
+            if os.path.exists(source):
+                os.replace(source, '%s.%d' % (self.path, index + 1))
+        os.replace(self.path, self.path + '.1')
+
+    async def close(self):
+        try:
+            await super().close()
+            await asyncio.get_event_loop().run_in_executor(
+                self._writer, self._close_file
+            )
+        finally:
+            self._writer.shutdown(wait=False)
+
+
+class SharedMemoryReporter(NullReporter):
+    """
+    Serializes spans into a shared memory ring drained by
+    SharedMemoryExporter, for pre-fork servers: worker processes
+    use this reporter, while a single exporter batches spans of all
+    workers and submits them to the collector.
+
+    Ring ``name`` must be created by the exporter beforehand, and must be
+    used by a single process at a time. Spans that do not fit into
+    the ring are dropped. Process of the first worker is used
+    by the exporter for all spans.
+    """
+    def __init__(
+        self,
+        name: str,
+        error_reporter: Optional[ErrorReporter] = None,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+        **kwargs: Any
+    ):
+        self.ring = SharedRing(name)
+        self.protocol = self.ring.protocol
+        self.logger = kwargs.get('logger', default_logger)
+        # spans can be finished in other threads
+        self._lock = threading.Lock()
+        self.metrics_factory = metrics_factory or LegacyMetricsFactory(
+            metrics or Metrics()
+        )
+        self.metrics = ReporterMetrics(self.metrics_factory)
+        self.error_reporter = error_reporter or ErrorReporter(Metrics())
+
+    def set_process(
+            self,
+            service_name: str,
+            tags: Mapping[str, Any],
+            max_length: int = MAX_TAG_VALUE_LENGTH
+    ):
+        process = thrift.make_process(
+            service_name=service_name, tags=tags, max_length=max_length
+        )
+        data = thrift.serialize_struct(process, self.protocol)
+        with self._lock:
+            if not self.ring.put(data, RECORD_PROCESS):
+                self.error_reporter.error('No room for process in ring')
+
+    def report_span(self, span: Span):
+        try:
+            data = thrift.serialize_span(span, self.protocol)
+        except Exception as e:
+            self.metrics.reporter_failure(1)
+            self.error_reporter.error('Failed to serialize span: %s', e)
+            return
+        with self._lock:
+            written = self.ring.put(data)
+        if not written:
+            self.metrics.reporter_dropped(1)
+            self.metrics.reporter_dropped_by_reason[DROP_REASON_QUEUE_FULL](1)
+
+    def get_load(self) -> float:
+        return min(len(self.ring) / self.ring.size, 1.0)
+
+    async def close(self):
+        self.ring.close()
+
+
+class SharedMemoryExporter(object):
+    """
+    Creates shared memory rings ``names`` of ``ring_bytes`` for
+    SharedMemoryReporter's of worker processes and drains them into
+    ``reporter``, which batches spans of all workers together.
+
+    Rings are polled every ``poll_interval`` seconds while they are empty.
+    Spans are left in rings while reporter's queue is full.
+    """
+    def __init__(
+        self,
+        reporter: BatchReporter,
+        names: Sequence[str],
+        ring_bytes: int = DEFAULT_RING_BYTES,
+        poll_interval: float = 0.01,
+    ):
+        if not names:
+            raise ValueError('At least one ring name is required')
+        self.reporter = reporter
+        self.poll_interval = poll_interval
+        self.rings: List[SharedRing] = []
+        try:
+            for name in names:
+                self.rings.append(SharedRing(
+                    name, ring_bytes, protocol=reporter.protocol, create=True
+                ))
+        except Exception:
+            for ring in self.rings:
+                ring.close()
+            raise
+        self._next_ring = 0
+        self._has_process = False
+        self.stopped = False
+        self.task = asyncio.create_task(self._export())
+
+    def _set_process(self, data: bytes):
+        process = thrift.deserialize_struct(
+            thrift.SPEC.Process(), data, self.reporter.protocol
+        )
+        self.reporter.set_process(
+            service_name=process.serviceName,
+            tags={
+                tag.key: thrift.get_tag_value(tag)
+                for tag in process.tags or ()
+            },
+        )
+        self._has_process = True
+
+    def _drain(self) -> int:
+        count = 0
+        # start from the next ring every time, so all workers make progress
+        # while reporter's queue is full
+        rings = self.rings[self._next_ring:] + self.rings[:self._next_ring]
+        self._next_ring = (self._next_ring + 1) % len(self.rings)
+        for ring in rings:
+            room = self.reporter.queue_capacity - len(self.reporter.queue)
+            if room <= 0:
+                break
+            for kind, data in ring.take(room):
+                if kind == RECORD_SPAN:
+                    self.reporter.report_serialized_span(data)
+                    count += 1
+                elif kind == RECORD_PROCESS and not self._has_process:
+                    self._set_process(data)
+        return count
+
+    async def _export(self):
+        while not self.stopped:
+            try:
+                count = self._drain()
+            except Exception as e:
+                count = 0
+                self.reporter.error_reporter.error(
+                    'Failed to export spans from shared memory: %s', e
+                )
+            await asyncio.sleep(0 if count else self.poll_interval)
+
+    async def close(self):
+        self.stopped = True
+        await self.task
+        self._drain()
+        try:
+            await self.reporter.close()
+        finally:
+            for ring in self.rings:
+                ring.close()
+
+
 class ReporterMetrics(object):
     """Reporter specific metrics."""
     def __init__(self, metrics_factory: MetricsFactory):
@@ -193,15 +2147,83 @@ class ReporterMetrics(object):
         self.reporter_dropped = metrics_factory.create_counter(
             name='jaeger:reporter_spans', tags={'result': 'dropped'}
         )
+        self.reporter_dropped_by_reason = {
+            reason: metrics_factory.create_counter(
+                name='jaeger:reporter_dropped_spans', tags={'reason': reason}
+            )
+            for reason in DROP_REASONS
+        }
+        self.reporter_retries = metrics_factory.create_counter(
+            name='jaeger:reporter_retries'
+        )
+        self.reporter_spooled = metrics_factory.create_counter(
+            name='jaeger:reporter_spooled_spans'
+        )
         self.reporter_queue_length = metrics_factory.create_gauge(
             name='jaeger:reporter_queue_length'
         )
+        self.reporter_priority_queued = metrics_factory.create_counter(
+            name='jaeger:reporter_priority_spans', tags={'lane': 'priority'}
+        )
+        self.reporter_priority_overflow = metrics_factory.create_counter(
+            name='jaeger:reporter_priority_spans', tags={'lane': 'regular'}
+        )
+        self.reporter_priority_queue_length = metrics_factory.create_gauge(
+            name='jaeger:reporter_priority_queue_length'
+        )
+        self.reporter_bytes_raw = metrics_factory.create_counter(
+            name='jaeger:reporter_bytes', tags={'payload': 'raw'}
+        )
+        self.reporter_bytes_sent = metrics_factory.create_counter(
+            name='jaeger:reporter_bytes', tags={'payload': 'sent'}
+        )
+        self.reporter_in_flight = metrics_factory.create_gauge(
+            name='jaeger:reporter_in_flight_requests'
+        )
+        self.reporter_batch_size = metrics_factory.create_gauge(
+            name='jaeger:reporter_batch_size'
+        )
+        # in milliseconds
+        self.reporter_flush_interval = metrics_factory.create_gauge(
+            name='jaeger:reporter_flush_interval'
+        )
+        self.reporter_request_latency = metrics_factory.create_timer(
+            name='jaeger:reporter_request_latency'
+        )
+        # time the event loop is blocked by serialization of spans
+        # and encoding of batches
+        self.reporter_loop_blocking_serialize = metrics_factory.create_timer(
+            name='jaeger:reporter_loop_blocking', tags={'stage': 'serialize'}
+        )
+        self.reporter_loop_blocking_encode = metrics_factory.create_timer(
+            name='jaeger:reporter_loop_blocking', tags={'stage': 'encode'}
+        )
 
 
 class CompositeReporter(BaseReporter):
-    """Delegates reporting to one or more underlying reporters."""
+    """
+    Delegates reporting to one or more underlying reporters.
+
+    Spans are serialized once for all BatchReporters with the same
+    protocol: by the first of them to consume the span, the others reuse
+    its bytes. Spans dropped by all of them are not serialized at all.
+    """
     def __init__(self, *reporters: BaseReporter):
         self.reporters = reporters
+        groups: Dict[str, List[BatchReporter]] = {}
+        for reporter in reporters:
+            if isinstance(reporter, BatchReporter):
+                groups.setdefault(reporter.protocol, []).append(reporter)
+        self._shared_groups = [
+            group for group in groups.values() if len(group) > 1
+        ]
+        shared = {
+            id(reporter) for group in self._shared_groups
+            for reporter in group
+        }
+        self._direct_reporters = [
+            reporter for reporter in reporters if id(reporter) not in shared
+        ]
 
     def set_process(
             self,
@@ -210,13 +2232,197 @@ class CompositeReporter(BaseReporter):
             max_length: int = MAX_TAG_VALUE_LENGTH
     ):
         for reporter in self.reporters:
-            reporter.set_process(service_name, tags)
+            reporter.set_process(service_name, tags, max_length)
 
     def report_span(self, span: Span):
-        for reporter in self.reporters:
+        for reporter in self._direct_reporters:
             reporter.report_span(span)
+        for group in self._shared_groups:
+            shared = SharedSpan(span)
+            for reporter in group:
+                reporter.report_shared_span(shared)
+
+    def get_load(self) -> float:
+        return max(
+            (reporter.get_load() for reporter in self.reporters), default=0.0
+        )
 
     async def close(self):
         await asyncio.gather(*(
             reporter.close() for reporter in self.reporters
         ))
+
+
+# Decisions of TailSamplingReporter about local traces
+TAIL_DECISION_ERROR = 'error'
+TAIL_DECISION_LATENCY = 'latency'
+TAIL_DECISION_PROBABILITY = 'probability'
+TAIL_DECISION_DROPPED = 'dropped'
+TAIL_DECISION_EVICTED = 'evicted'
+
+TAIL_DECISIONS = (
+    TAIL_DECISION_ERROR,
+    TAIL_DECISION_LATENCY,
+    TAIL_DECISION_PROBABILITY,
+    TAIL_DECISION_DROPPED,
+    TAIL_DECISION_EVICTED,
+)
+
+
+class TailSamplingReporter(BaseReporter):
+    """
+    Makes the sampling decision after spans are finished: buffers spans
+    by trace id and forwards the whole local trace to ``reporter`` only if
+    it is interesting. Requires Tracer with ``record_unsampled=True``,
+    tracer's sampler becomes the head sampler: spans it sampled (and debug
+    spans) are forwarded right away.
+
+    A trace is kept as soon as one of its spans is tagged ``error=true``
+    or took at least ``latency_threshold`` seconds, later spans of kept
+    traces are forwarded right away too. Otherwise the trace is kept with
+    ``probability`` when ``decision_wait`` seconds passed since its first
+    span, so ``decision_wait`` should exceed duration of most requests.
+    Up to ``max_spans`` spans are buffered, the oldest traces are dropped
+    to make room for new spans.
+    """
+    def __init__(
+        self,
+        reporter: BaseReporter,
+        decision_wait: float = 5.0,
+        latency_threshold: Optional[float] = None,
+        probability: float = 0.0,
+        max_spans: int = 10000,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+    ):
+        if decision_wait <= 0:
+            raise ValueError('decision_wait must be positive')
+        if not 0 <= probability <= 1:
+            raise ValueError('probability must be in [0, 1]')
+        if max_spans < 1:
+            raise ValueError('max_spans must be positive')
+        self.reporter = reporter
+        self.decision_wait = decision_wait
+        self.latency_threshold = latency_threshold
+        self.probability = probability
+        self.max_spans = max_spans
+        # trace id -> (decision deadline, spans), in order of the first span
+        self.traces: 'OrderedDict[int, Tuple[float, List[Span]]]' = (
+            OrderedDict()
+        )
+        self.buffered_spans = 0
+        # ids of kept traces, so their late spans are forwarded as well
+        self._kept: 'OrderedDict[int, None]' = OrderedDict()
+        self.random = random.Random()
+        self.metrics_factory = metrics_factory or LegacyMetricsFactory(
+            metrics or Metrics()
+        )
+        self.metrics = TailSamplingMetrics(self.metrics_factory)
+        self.task = asyncio.create_task(self._expire_traces())
+
+    def set_process(
+            self,
+            service_name: str,
+            tags: Mapping[str, Any],
+            max_length: int = MAX_TAG_VALUE_LENGTH
+    ):
+        self.reporter.set_process(service_name, tags, max_length)
+
+    def get_load(self) -> float:
+        return self.reporter.get_load()
+
+    def report_span(self, span: Span):
+        trace_id = span.trace_id
+        if span.is_sampled() or trace_id in self._kept:
+            self.reporter.report_span(span)
+            return
+
+        decision = self._get_decision(span)
+        if decision is not None:
+            trace = self.traces.pop(trace_id, None)
+            if trace is not None:
+                self.buffered_spans -= len(trace[1])
+                self._keep(trace_id, decision, trace[1])
+            else:
+                self._keep(trace_id, decision, ())
+            self.reporter.report_span(span)
+            return
+
+        trace = self.traces.get(trace_id)
+        if trace is None:
+            trace = (time.monotonic() + self.decision_wait, [])
+            self.traces[trace_id] = trace
+        trace[1].append(span)
+        self.buffered_spans += 1
+        while self.buffered_spans > self.max_spans:
+            _, (_, spans) = self.traces.popitem(last=False)
+            self.buffered_spans -= len(spans)
+            self.metrics.traces[TAIL_DECISION_EVICTED](1)
+        self.metrics.buffered_spans(self.buffered_spans)
+
+    def _get_decision(self, span: Span) -> Optional[str]:
+        if span.is_error():
+            return TAIL_DECISION_ERROR
+        if (
+                self.latency_threshold is not None
+                and span.end_time - span.start_time >= self.latency_threshold
+        ):
+            return TAIL_DECISION_LATENCY
+        return None
+
+    def _keep(self, trace_id: int, decision: str, spans: Sequence[Span]):
+        self.metrics.traces[decision](1)
+        self._kept[trace_id] = None
+        if len(self._kept) > self.max_spans:
+            self._kept.popitem(last=False)
+        for span in spans:
+            self.reporter.report_span(span)
+
+    def _decide_expired(self, now: float):
+        while self.traces:
+            trace_id, (deadline, spans) = next(iter(self.traces.items()))
+            if deadline > now:
+                break
+            del self.traces[trace_id]
+            self.buffered_spans -= len(spans)
+            if self.probability and self.random.random() < self.probability:
+                self._keep(trace_id, TAIL_DECISION_PROBABILITY, spans)
+            else:
+                self.metrics.traces[TAIL_DECISION_DROPPED](1)
+        self.metrics.buffered_spans(self.buffered_spans)
+
+    async def _expire_traces(self):
+        while True:
+            await asyncio.sleep(self.decision_wait / 4)
+            self._decide_expired(time.monotonic())
+
+    async def close(self):
+        self.task.cancel()
+        self._decide_expired(math.inf)
+        await self.reporter.close()
+
+
+class ConnectionMetrics(object):
+    """Metrics of connections of ClientSession made by make_client_session()."""
+    def __init__(self, metrics_factory: MetricsFactory):
+        self.created = metrics_factory.create_counter(
+            name='jaeger:reporter_connections', tags={'result': 'created'}
+        )
+        self.reused = metrics_factory.create_counter(
+            name='jaeger:reporter_connections', tags={'result': 'reused'}
+        )
+
+
+class TailSamplingMetrics(object):
+    """TailSamplingReporter specific metrics."""
+    def __init__(self, metrics_factory: MetricsFactory):
+        self.traces = {
+            decision: metrics_factory.create_counter(
+                name='jaeger:tail_sampling_traces',
+                tags={'decision': decision}
+            )
+            for decision in TAIL_DECISIONS
+        }
+        self.buffered_spans = metrics_factory.create_gauge(
+            name='jaeger:tail_sampling_buffered_spans'
+        )
@@ -1,4 +1,5 @@
 import logging
+import random
 from abc import ABC, abstractmethod
 
 from .constants import (
@@ -8,9 +9,13 @@ from .constants import (
     SAMPLER_TYPE_RATE_LIMITING,
     SAMPLER_TYPE_LOWER_BOUND,
 )
-from .metrics import MetricsFactory
+from .metrics import LegacyMetricsFactory, Metrics, MetricsFactory
 from .rate_limiter import RateLimiter
-from typing import Any, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    # reporter imports aiohttp, which is not needed for sampling
+    from .reporter import BaseReporter
 
 
 default_logger = logging.getLogger(__name__)
@@ -22,6 +27,10 @@ DEFAULT_SAMPLING_PROBABILITY = 0.001
 DEFAULT_LOWER_BOUND = 1.0 / (10.0 * 60.0)  # sample once every 10 minutes
 DEFAULT_MAX_OPERATIONS = 2000
 
+# samplers with sampling probability in sampler.param, which is scaled
+# by BackpressureSampler
+SCALED_SAMPLER_TYPES = (SAMPLER_TYPE_PROBABILISTIC, SAMPLER_TYPE_LOWER_BOUND)
+
 STRATEGIES_STR = 'perOperationStrategies'
 OPERATION_STR = 'operation'
 DEFAULT_LOWER_BOUND_STR = 'defaultLowerBoundTracesPerSecond'
@@ -315,6 +324,94 @@ class AdaptiveSampler(BaseSampler):
                   self.max_operations)
 
 
+class BackpressureSampler(BaseSampler):
+    """
+    Sheds sampling of ``sampler`` while ``reporter`` is saturated, so that
+    spans which would be dropped by reporter are not recorded at all.
+
+    Once reporter load (see BaseReporter.get_load()) exceeds
+    ``low_watermark``, traces sampled by ``sampler`` are kept with
+    probability decreasing linearly down to ``min_rate`` at
+    ``high_watermark``, and it is restored as the queue drains.
+    ``sampler.param`` tag of kept traces of probabilistic and lower bound
+    samplers is multiplied by that probability, which is also reported
+    as a gauge.
+    """
+
+    def __init__(
+        self,
+        sampler: BaseSampler,
+        reporter: 'BaseReporter',
+        low_watermark: float = 0.5,
+        high_watermark: float = 0.9,
+        min_rate: float = 0.0,
+        metrics: Optional[Metrics] = None,
+        metrics_factory: Optional[MetricsFactory] = None,
+    ):
+        super(BackpressureSampler, self).__init__()
+        if not 0.0 <= low_watermark < high_watermark <= 1.0:
+            raise ValueError(
+                'Watermarks must satisfy 0 <= low_watermark < '
+                'high_watermark <= 1'
+            )
+        if not 0.0 <= min_rate <= 1.0:
+            raise ValueError('min_rate must be between 0.0 and 1.0')
+        self.sampler = sampler
+        self.reporter = reporter
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.min_rate = min_rate
+        self.rate = 1.0
+        self.random = random.Random()
+        metrics_factory = metrics_factory or LegacyMetricsFactory(
+            metrics or Metrics()
+        )
+        self._effective_rate = metrics_factory.create_gauge(
+            name='jaeger:sampler_effective_rate'
+        )
+        self._effective_rate(self.rate)
+
+    def get_rate(self) -> float:
+        """Returns probability of keeping a sampled trace at current load."""
+        load = self.reporter.get_load()
+        if load <= self.low_watermark:
+            return 1.0
+        if load >= self.high_watermark:
+            return self.min_rate
+        shed = (load - self.low_watermark) / (
+            self.high_watermark - self.low_watermark
+        )
+        return 1.0 - shed * (1.0 - self.min_rate)
+
+    def is_sampled(self, trace_id: int, operation: str = '') -> IsSampledType:
+        sampled, tags = self.sampler.is_sampled(trace_id, operation)
+        rate = self.get_rate()
+        if rate != self.rate:
+            self.rate = rate
+            self._effective_rate(rate)
+        if not sampled or rate >= 1.0:
+            return sampled, tags
+        if self.random.random() >= rate:
+            return False, tags
+        param = tags.get(SAMPLER_PARAM_TAG_KEY)
+        if (
+                tags.get(SAMPLER_TYPE_TAG_KEY) in SCALED_SAMPLER_TYPES
+                and isinstance(param, (int, float))
+        ):
+            # param is the sampling probability
+            tags = dict(tags)
+            tags[SAMPLER_PARAM_TAG_KEY] = param * rate
+        return True, tags
+
+    async def close(self):
+        await self.sampler.close()
+
+    def __str__(self) -> str:
+        return 'BackpressureSampler(%s, %f, %f)' % (
+            self.sampler, self.low_watermark, self.high_watermark
+        )
+
+
 def get_sampling_probability(
         strategy: Optional[Dict[str, Any]] = None
 ) -> float:
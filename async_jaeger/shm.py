@@ -0,0 +1,135 @@
+import struct
+import sys
+from typing import List, Optional, Tuple
+
+from async_jaeger import thrift
+
+
+# Ring header: write position, read position (both only grow),
+# data capacity and thrift protocol of serialized spans.
+POSITION = struct.Struct('=Q')
+HEAD_OFFSET = 0
+TAIL_OFFSET = 8
+META = struct.Struct('=IB')
+META_OFFSET = 16
+DATA_OFFSET = 64
+
+# Record header: payload length and kind
+RECORD_HEADER = struct.Struct('=IB')
+RECORD_SPAN = 1
+RECORD_PROCESS = 2
+
+PROTOCOL_IDS = {thrift.PROTOCOL_BINARY: 1, thrift.PROTOCOL_COMPACT: 2}
+PROTOCOLS = {value: key for key, value in PROTOCOL_IDS.items()}
+
+DEFAULT_RING_BYTES = 4 * 1024 * 1024
+
+
+def _open_shared_memory(name: str, size: int, create: bool):
+    # not available before python 3.8
+    from multiprocessing import shared_memory
+
+    if create:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    memory = shared_memory.SharedMemory(name=name)
+    # otherwise resource tracker of the attached process unlinks
+    # the segment when the process exits
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(
+        memory._name, 'shared_memory'  # type: ignore
+    )
+    return memory
+
+
+class SharedRing(object):
+    """
+    Ring buffer of length-prefixed records in a named shared memory
+    segment, passing serialized spans from a worker process to the
+    exporter process.
+
+    The ring is created by the reading side with ``size`` bytes for
+    records and attached to by name by the writing side. It is lock-free
+    and safe for a single writer and a single reader: each side only
+    updates its own position, after the records are written (or read).
+    """
+    def __init__(
+            self,
+            name: str,
+            size: int = DEFAULT_RING_BYTES,
+            protocol: str = thrift.PROTOCOL_BINARY,
+            create: bool = False,
+    ):
+        if create and protocol not in PROTOCOL_IDS:
+            raise ValueError('Unknown thrift protocol %r' % protocol)
+        self.name = name
+        self.owner = create
+        self.memory = _open_shared_memory(name, DATA_OFFSET + size, create)
+        self.buf = self.memory.buf
+        if create:
+            POSITION.pack_into(self.buf, HEAD_OFFSET, 0)
+            POSITION.pack_into(self.buf, TAIL_OFFSET, 0)
+            META.pack_into(self.buf, META_OFFSET, size, PROTOCOL_IDS[protocol])
+        self.size, protocol_id = META.unpack_from(self.buf, META_OFFSET)
+        self.protocol = PROTOCOLS[protocol_id]
+
+    def _get_position(self, offset: int) -> int:
+        return POSITION.unpack_from(self.buf, offset)[0]
+
+    def __len__(self) -> int:
+        """Returns number of bytes used by records."""
+        return (
+            self._get_position(HEAD_OFFSET) - self._get_position(TAIL_OFFSET)
+        )
+
+    def _write(self, position: int, data: bytes):
+        start = position % self.size
+        first = min(len(data), self.size - start)
+        self.buf[DATA_OFFSET + start:DATA_OFFSET + start + first] = (
+            data[:first]
+        )
+        if first < len(data):
+            rest = len(data) - first
+            self.buf[DATA_OFFSET:DATA_OFFSET + rest] = data[first:]
+
+    def _read(self, position: int, length: int) -> bytes:
+        start = position % self.size
+        first = min(length, self.size - start)
+        data = bytes(self.buf[DATA_OFFSET + start:DATA_OFFSET + start + first])
+        if first < length:
+            rest = length - first
+            data += bytes(self.buf[DATA_OFFSET:DATA_OFFSET + rest])
+        return data
+
+    def put(self, data: bytes, kind: int = RECORD_SPAN) -> bool:
+        """Appends a record, returns False if there is no room for it."""
+        head = self._get_position(HEAD_OFFSET)
+        tail = self._get_position(TAIL_OFFSET)
+        size = RECORD_HEADER.size + len(data)
+        if head - tail + size > self.size:
+            return False
+        self._write(head, RECORD_HEADER.pack(len(data), kind) + data)
+        POSITION.pack_into(self.buf, HEAD_OFFSET, head + size)
+        return True
+
+    def take(self, limit: Optional[int] = None) -> List[Tuple[int, bytes]]:
+        """Removes up to ``limit`` records and returns them as (kind, data)."""
+        head = self._get_position(HEAD_OFFSET)
+        tail = self._get_position(TAIL_OFFSET)
+        records: List[Tuple[int, bytes]] = []
+        while tail < head and (limit is None or len(records) < limit):
+            length, kind = RECORD_HEADER.unpack(
+                self._read(tail, RECORD_HEADER.size)
+            )
+            tail += RECORD_HEADER.size
+            records.append((kind, self._read(tail, length)))
+            tail += length
+        POSITION.pack_into(self.buf, TAIL_OFFSET, tail)
+        return records
+
+    def close(self):
+        del self.buf
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
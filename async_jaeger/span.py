@@ -72,7 +72,7 @@ class Span(opentracing.Span):
         :param finish_time: an explicit Span finish timestamp as a unix
             timestamp per time.time()
         """
-        if not self.is_sampled():
+        if not self.is_recording():
             return
 
         if self.finished:
@@ -96,7 +96,7 @@ class Span(opentracing.Span):
         ):
             return self
 
-        if self.is_sampled():
+        if self.is_recording():
             tag = thrift.make_tag(
                 key=key,
                 value=value,
@@ -129,7 +129,7 @@ class Span(opentracing.Span):
             key_values: Dict[str, Any],
             timestamp: Optional[float] = None
     ) -> 'Span':
-        if self.is_sampled():
+        if self.is_recording():
             timestamp = timestamp if timestamp else time.time()
             # TODO handle exception logging, 'python.exception.type' etc.
             log = thrift.make_log(
@@ -145,7 +145,7 @@ class Span(opentracing.Span):
         prev_value = self.get_baggage_item(key=key)
         new_context = self.context.with_baggage_item(key=key, value=value)
         self._context = new_context
-        if self.is_sampled():
+        if self.is_recording():
             logs = {
                 'event': 'baggage',
                 'key': key,
@@ -163,9 +163,22 @@ class Span(opentracing.Span):
     def is_sampled(self) -> bool:
         return self.context.flags & SAMPLED_FLAG == SAMPLED_FLAG
 
+    def is_recording(self) -> bool:
+        """Sampled spans, and all spans of tracer with record_unsampled."""
+        return self.is_sampled() or getattr(
+            self._tracer, 'record_unsampled', False
+        )
+
     def is_debug(self) -> bool:
         return self.context.flags & DEBUG_FLAG == DEBUG_FLAG
 
+    def is_error(self) -> bool:
+        # the last value of the tag wins
+        for tag in reversed(self.tags):
+            if tag.key == ext_tags.ERROR:
+                return bool(tag.vBool)
+        return False
+
     def is_rpc(self) -> bool:
         for tag in self.tags:
             if tag.key == ext_tags.SPAN_KIND:
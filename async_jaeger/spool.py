@@ -0,0 +1,246 @@
+import logging
+import mmap
+import os
+import struct
+import zlib
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+
+default_logger = logging.getLogger(__name__)
+
+
+# Record header: state, number of spans, payload length, payload crc32.
+# Payload is written before the header, so a record interrupted by a crash
+# has zero state (or a wrong crc) and marks the end of the segment.
+RECORD_HEADER = struct.Struct('!BIII')
+RECORD_WRITTEN = 1
+RECORD_CONSUMED = 2
+
+SEGMENT_SUFFIX = '.spool'
+
+DEFAULT_SPOOL_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+class Segment(object):
+    """
+    Fixed size memory-mapped file holding a sequence of records.
+    Unconsumed records are indexed in memory as (offset, spans, length).
+    """
+    def __init__(self, path: str, size: int, create: bool = False):
+        self.path = path
+        with open(path, 'w+b' if create else 'r+b') as f:
+            if create:
+                f.truncate(size)
+            else:
+                size = os.fstat(f.fileno()).st_size
+            self.size = size
+            self.mmap = mmap.mmap(f.fileno(), size)
+        self.write_offset = 0
+        self.records: Deque[Tuple[int, int, int]] = deque()
+        if not create:
+            self._recover()
+
+    def _recover(self):
+        offset = 0
+        while offset + RECORD_HEADER.size <= self.size:
+            state, spans, length, crc = RECORD_HEADER.unpack_from(
+                self.mmap, offset
+            )
+            if state not in (RECORD_WRITTEN, RECORD_CONSUMED):
+                break
+            start = offset + RECORD_HEADER.size
+            end = start + length
+            if end > self.size or zlib.crc32(self.mmap[start:end]) != crc:
+                default_logger.warning(
+                    'Truncated record in spool segment %s at offset %d',
+                    self.path, offset
+                )
+                # wipe the header, so appended records are not mixed up
+                # with the broken one on the next recovery
+                self.mmap[offset] = 0
+                break
+            if state == RECORD_WRITTEN:
+                self.records.append((offset, spans, length))
+            offset = end
+        self.write_offset = offset
+
+    @property
+    def spans(self) -> int:
+        return sum(spans for _, spans, _ in self.records)
+
+    def append(self, data: bytes, spans: int) -> bool:
+        start = self.write_offset + RECORD_HEADER.size
+        end = start + len(data)
+        if end > self.size:
+            return False
+        self.mmap[start:end] = data
+        RECORD_HEADER.pack_into(
+            self.mmap, self.write_offset,
+            RECORD_WRITTEN, spans, len(data), zlib.crc32(data)
+        )
+        self.records.append((self.write_offset, spans, len(data)))
+        self.write_offset = end
+        return True
+
+    def peek(self) -> Tuple[bytes, int]:
+        offset, spans, length = self.records[0]
+        start = offset + RECORD_HEADER.size
+        return self.mmap[start:start + length], spans
+
+    def consume(self):
+        offset, _, _ = self.records.popleft()
+        self.mmap[offset] = RECORD_CONSUMED
+
+    def close(self):
+        self.mmap.flush()
+        self.mmap.close()
+
+    def remove(self):
+        self.close()
+        os.unlink(self.path)
+
+
+class Spool(object):
+    """
+    On-disk FIFO of serialized batches, used by reporters to keep batches
+    the collector could not accept.
+
+    Batches are appended to memory-mapped segment files of
+    ``segment_bytes`` in ``path`` directory. When total size would exceed
+    ``max_bytes``, the oldest segments are evicted. Segments left by the
+    previous process are recovered on start, a record truncated by a crash
+    ends its segment. Records are marked as consumed in place, so batches
+    are delivered at least once. The segment of the batch returned by
+    peek() is not evicted until it is consumed, unless it is the only one.
+
+    N.B. a spool directory must be used by a single reporter at a time.
+    """
+    def __init__(
+            self,
+            path: str,
+            max_bytes: int = DEFAULT_SPOOL_BYTES,
+            segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    ):
+        if segment_bytes <= RECORD_HEADER.size:
+            raise ValueError('segment_bytes is too small')
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(max_bytes // segment_bytes, 1)
+        self.segments: Deque[Segment] = deque()
+        # segment and offset of the record returned by peek()
+        self._peeked: Optional[Tuple[Segment, int]] = None
+        self._next_id = 0
+
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            try:
+                segment_id = int(name[:-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            self._next_id = max(self._next_id, segment_id + 1)
+            segment_path = os.path.join(path, name)
+            if not os.path.getsize(segment_path):
+                # crashed right after the segment file was created
+                os.unlink(segment_path)
+                continue
+            segment = Segment(segment_path, segment_bytes)
+            if segment.records:
+                self.segments.append(segment)
+            else:
+                segment.remove()
+
+    def __len__(self) -> int:
+        return sum(len(segment.records) for segment in self.segments)
+
+    @property
+    def spans(self) -> int:
+        return sum(segment.spans for segment in self.segments)
+
+    def _add_segment(self) -> Segment:
+        name = '%020d%s' % (self._next_id, SEGMENT_SUFFIX)
+        self._next_id += 1
+        segment = Segment(
+            os.path.join(self.path, name), self.segment_bytes, create=True
+        )
+        self.segments.append(segment)
+        return segment
+
+    def append(self, data: bytes, spans: int) -> int:
+        """
+        Appends a batch of ``spans`` spans to the spool.
+        Returns number of spans evicted to make room for it.
+        """
+        if len(data) + RECORD_HEADER.size > self.segment_bytes:
+            raise ValueError(
+                'Batch of %d bytes does not fit into spool segment' % len(data)
+            )
+        if self.segments and self.segments[-1].append(data, spans):
+            return 0
+
+        evicted = 0
+        while len(self.segments) >= self.max_segments:
+            index = 0
+            if (
+                    self._peeked is not None
+                    and self._peeked[0] is self.segments[0]
+                    and len(self.segments) > 1
+            ):
+                # the peeked batch is being delivered
+                index = 1
+            segment = self.segments[index]
+            del self.segments[index]
+            evicted += segment.spans
+            segment.remove()
+        self._add_segment().append(data, spans)
+        return evicted
+
+    def _get_head(self) -> Optional[Segment]:
+        while self.segments:
+            segment = self.segments[0]
+            if segment.records:
+                return segment
+            if len(self.segments) == 1:
+                return None
+            self.segments.popleft().remove()
+        return None
+
+    def peek(self) -> Optional[Tuple[bytes, int]]:
+        """Returns the oldest batch and number of spans in it."""
+        segment = self._get_head()
+        if segment is None:
+            return None
+        self._peeked = (segment, segment.records[0][0])
+        return segment.peek()
+
+    def consume(self):
+        """
+        Marks the batch returned by peek() (the oldest one if peek() was not
+        called) as delivered, unless it has been evicted meanwhile.
+        """
+        if self._peeked is None:
+            head = self._get_head()
+            if head is not None:
+                head.consume()
+            return
+        segment, offset = self._peeked
+        self._peeked = None
+        if (
+                any(segment is head for head in self.segments)
+                and segment.records
+                and segment.records[0][0] == offset
+        ):
+            segment.consume()
+
+    def close(self):
+        segments: List[Segment] = list(self.segments)
+        self.segments.clear()
+        self._peeked = None
+        for segment in segments:
+            if segment.records:
+                segment.close()
+            else:
+                segment.remove()
@@ -1,11 +1,17 @@
 import pkg_resources
+import struct
 import time
 import traceback
+from collections import namedtuple
 from types import TracebackType
-from typing import Mapping, Any, Optional, Tuple, Dict
+from typing import Mapping, Any, Optional, Tuple, Dict, Sequence
 
 import thriftpy2
 from opentracing import Reference, ReferenceType
+from thriftpy2.protocol import TBinaryProtocolFactory, TCompactProtocolFactory
+from thriftpy2.protocol.compact import CompactType, TCompactProtocol
+from thriftpy2.thrift import TMessageType, TType
+from thriftpy2.utils import deserialize, serialize
 
 from async_jaeger.constants import MAX_TRACEBACK_LENGTH, MAX_TAG_VALUE_LENGTH
 
@@ -17,6 +23,22 @@ SPEC = thriftpy2.load(SPEC_PATH, 'jaeger_thrift')
 MAX_SIGNED_ID = (1 << 63) - 1
 MAX_UNSIGNED_ID = (1 << 64)
 
+# Wire encodings supported by the reporters. Binary protocol is the one
+# accepted by jaeger-collector on /api/traces, compact protocol is smaller
+# and is the one used by jaeger-agent.
+PROTOCOL_BINARY = 'binary'
+PROTOCOL_COMPACT = 'compact'
+
+PROTOCOL_FACTORIES = {
+    PROTOCOL_BINARY: TBinaryProtocolFactory(),
+    PROTOCOL_COMPACT: TCompactProtocolFactory(),
+}
+
+CONTENT_TYPES = {
+    PROTOCOL_BINARY: 'application/x-thrift',
+    PROTOCOL_COMPACT: 'application/vnd.apache.thrift.compact',
+}
+
 
 def timestamp_to_microseconds(value: float) -> int:
     return int(value * 1000000)
@@ -100,6 +122,19 @@ def make_process(
     )
 
 
+TAG_VALUE_FIELDS = {
+    SPEC.TagType.STRING: 'vStr',
+    SPEC.TagType.DOUBLE: 'vDouble',
+    SPEC.TagType.BOOL: 'vBool',
+    SPEC.TagType.LONG: 'vLong',
+    SPEC.TagType.BINARY: 'vBinary',
+}
+
+
+def get_tag_value(tag: SPEC.Tag) -> Any:  # noqa
+    return getattr(tag, TAG_VALUE_FIELDS[tag.vType])
+
+
 def make_span_ref(reference: Reference) -> SPEC.SpanRef:
     if reference.type == ReferenceType.CHILD_OF:
         ref_type = SPEC.SpanRefType.CHILD_OF
@@ -163,8 +198,308 @@ def make_span(span) -> SPEC.Span:
     )
 
 
+ReferencedContext = namedtuple('ReferencedContext', 'trace_id span_id')
+
+SpanRecord = namedtuple('SpanRecord', (
+    'trace_id span_id parent_id flags operation_name start_time end_time '
+    'references tags logs'
+))
+
+
+def make_span_record(span) -> SpanRecord:
+    """
+    Copies attributes of finished span read by serializers into a
+    picklable record, so that it can be serialized in another process.
+    """
+    return SpanRecord(
+        span.trace_id, span.span_id, span.parent_id, span.flags,
+        span.operation_name, span.start_time, span.end_time,
+        [
+            Reference(ref.type, ReferencedContext(
+                ref.referenced_context.trace_id,
+                ref.referenced_context.span_id,
+            ))
+            for ref in span.references or ()
+        ],
+        span.tags, span.logs,
+    )
+
+
 def make_batch(spans, process):
     return SPEC.Batch(
         spans=[make_span(span) for span in spans],
         process=process,
     )
+
+
+def serialize_struct(obj, protocol: str = PROTOCOL_BINARY) -> bytes:
+    return serialize(obj, PROTOCOL_FACTORIES[protocol])
+
+
+def deserialize_struct(obj, data: bytes, protocol: str = PROTOCOL_BINARY):
+    return deserialize(obj, data, PROTOCOL_FACTORIES[protocol])
+
+
+def make_varint(value: int) -> bytes:
+    out = bytearray()
+    while value & ~0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+# Field headers of Batch struct: process (1: struct) and spans (2: list).
+# Compact protocol encodes field id as a delta from the previous field.
+_BINARY_BATCH_PROCESS = struct.pack('!bh', TType.STRUCT, 1)
+_BINARY_BATCH_SPANS = struct.pack('!bhb', TType.LIST, 2, TType.STRUCT)
+_COMPACT_BATCH_PROCESS = bytes([(1 << 4) | CompactType.STRUCT])
+_COMPACT_BATCH_SPANS = bytes([(1 << 4) | CompactType.LIST])
+_STOP = bytes([TType.STOP])
+
+
+def get_batch_overhead(process: bytes, protocol: str = PROTOCOL_BINARY) -> int:
+    """
+    Returns max number of bytes serialized Batch takes in addition to its
+    serialized spans.
+    """
+    if protocol == PROTOCOL_COMPACT:
+        # field headers, list header with up to 5 bytes varint size, stop
+        return len(process) + 9
+    # field headers, list header with i32 size, stop
+    return len(process) + 12
+
+
+def serialize_batch_parts(
+        spans: Sequence[bytes],
+        process: bytes,
+        protocol: str = PROTOCOL_BINARY
+) -> Tuple[bytes, bytes]:
+    """
+    Returns parts of serialized Batch which go before and after already
+    serialized ``spans``.
+    """
+    if protocol == PROTOCOL_COMPACT:
+        size = len(spans)
+        if size < 15:
+            spans_header = bytes([(size << 4) | CompactType.STRUCT])
+        else:
+            spans_header = (
+                bytes([0xf0 | CompactType.STRUCT]) + make_varint(size)
+            )
+        head = b''.join((
+            _COMPACT_BATCH_PROCESS, process,
+            _COMPACT_BATCH_SPANS, spans_header,
+        ))
+    else:
+        head = b''.join((
+            _BINARY_BATCH_PROCESS, process,
+            _BINARY_BATCH_SPANS, struct.pack('!i', len(spans)),
+        ))
+    return head, _STOP
+
+
+def serialize_batch(
+        spans: Sequence[bytes],
+        process: bytes,
+        protocol: str = PROTOCOL_BINARY
+) -> bytes:
+    """
+    Builds serialized Batch from already serialized Process and Span
+    structs, so that Process (which is the same for every batch) is
+    encoded only once.
+    """
+    head, tail = serialize_batch_parts(spans, process, protocol)
+    parts = [head]
+    parts.extend(spans)
+    parts.append(tail)
+    return b''.join(parts)
+
+
+# Agent.emitBatch(1: Batch batch) is a oneway call, jaeger-agent expects it
+# encoded with compact protocol in a single UDP packet.
+_EMIT_BATCH_NAME = b'emitBatch'
+_EMIT_BATCH_HEADER = bytes([
+    TCompactProtocol.PROTOCOL_ID,
+    (TMessageType.ONEWAY << TCompactProtocol.TYPE_SHIFT_AMOUNT)
+    | TCompactProtocol.VERSION,
+    0,  # seqid
+    len(_EMIT_BATCH_NAME),
+]) + _EMIT_BATCH_NAME + _COMPACT_BATCH_PROCESS  # field 1: batch
+_EMIT_BATCH_FOOTER = bytes([CompactType.STOP])
+
+# Number of bytes emitBatch message takes in addition to serialized Batch
+EMIT_BATCH_OVERHEAD = len(_EMIT_BATCH_HEADER) + len(_EMIT_BATCH_FOOTER)
+
+
+def serialize_emit_batch(batch: bytes) -> bytes:
+    """Wraps Batch serialized with compact protocol into emitBatch call."""
+    return b''.join((_EMIT_BATCH_HEADER, batch, _EMIT_BATCH_FOOTER))
+
+
+# Direct compact span encoder. It writes thrift structs straight from Span
+# attributes, without building intermediate SPEC.Span / SPEC.SpanRef
+# objects, which is much faster than pure-python TCompactProtocol. Output
+# is byte for byte the same as serializing make_span().
+
+_compact_double = struct.Struct('<d').pack
+
+_REF_TYPES = {
+    ReferenceType.CHILD_OF: SPEC.SpanRefType.CHILD_OF,
+    ReferenceType.FOLLOWS_FROM: SPEC.SpanRefType.FOLLOWS_FROM,
+}
+
+
+def _get_ref_type(reference: Reference) -> int:
+    try:
+        return _REF_TYPES[reference.type]
+    except KeyError:
+        raise ValueError('Unknown reference type %r' % reference.type)
+
+
+def _get_span_ids(span) -> Tuple[int, int, int, int]:
+    return (
+        convert_unsigned_int_to_signed(get_right_64_bits(span.trace_id)),
+        convert_unsigned_int_to_signed(get_left_64_bits(span.trace_id)),
+        convert_unsigned_int_to_signed(span.span_id),
+        (
+            convert_unsigned_int_to_signed(span.parent_id)
+            if span.parent_id else 0
+        ),
+    )
+
+
+def _to_bytes(value) -> bytes:
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+def _compact_varint(out: bytearray, value: int) -> None:
+    while value & ~0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _compact_i64(out: bytearray, value: int) -> None:
+    _compact_varint(out, (value << 1) ^ (value >> 63))
+
+
+def _compact_i32(out: bytearray, value: int) -> None:
+    _compact_varint(out, (value << 1) ^ (value >> 31))
+
+
+def _compact_string(out: bytearray, value) -> None:
+    value = _to_bytes(value)
+    _compact_varint(out, len(value))
+    out += value
+
+
+def _compact_list_header(out: bytearray, size: int) -> None:
+    if size < 15:
+        out.append((size << 4) | CompactType.STRUCT)
+    else:
+        out.append(0xf0 | CompactType.STRUCT)
+        _compact_varint(out, size)
+
+
+def _compact_tag(out: bytearray, tag) -> None:
+    out.append((1 << 4) | CompactType.BINARY)
+    _compact_string(out, tag.key)
+    out.append((1 << 4) | CompactType.I32)
+    _compact_i32(out, tag.vType)
+    last_fid = 2
+    if tag.vStr is not None:
+        out.append(((3 - last_fid) << 4) | CompactType.BINARY)
+        _compact_string(out, tag.vStr)
+        last_fid = 3
+    if tag.vDouble is not None:
+        out.append(((4 - last_fid) << 4) | CompactType.DOUBLE)
+        out += _compact_double(tag.vDouble)
+        last_fid = 4
+    if tag.vBool is not None:
+        out.append(
+            ((5 - last_fid) << 4)
+            | (CompactType.TRUE if tag.vBool else CompactType.FALSE)
+        )
+        last_fid = 5
+    if tag.vLong is not None:
+        out.append(((6 - last_fid) << 4) | CompactType.I64)
+        _compact_i64(out, tag.vLong)
+        last_fid = 6
+    if tag.vBinary is not None:
+        out.append(((7 - last_fid) << 4) | CompactType.BINARY)
+        _compact_string(out, tag.vBinary)
+    out.append(CompactType.STOP)
+
+
+def _compact_tags(out: bytearray, tags) -> None:
+    _compact_list_header(out, len(tags))
+    for tag in tags:
+        _compact_tag(out, tag)
+
+
+def serialize_span_compact(span) -> bytes:
+    out = bytearray()
+    for value in _get_span_ids(span):
+        out.append((1 << 4) | CompactType.I64)
+        _compact_i64(out, value)
+    out.append((1 << 4) | CompactType.BINARY)
+    _compact_string(out, span.operation_name)
+
+    references = span.references or ()
+    out.append((1 << 4) | CompactType.LIST)
+    _compact_list_header(out, len(references))
+    for ref in references:
+        context = ref.referenced_context
+        out.append((1 << 4) | CompactType.I32)
+        _compact_i32(out, _get_ref_type(ref))
+        out.append((1 << 4) | CompactType.I64)
+        _compact_i64(out, convert_unsigned_int_to_signed(
+            get_right_64_bits(context.trace_id)
+        ))
+        out.append((1 << 4) | CompactType.I64)
+        _compact_i64(out, convert_unsigned_int_to_signed(
+            get_left_64_bits(context.trace_id)
+        ))
+        out.append((1 << 4) | CompactType.I64)
+        _compact_i64(out, convert_unsigned_int_to_signed(context.span_id))
+        out.append(CompactType.STOP)
+
+    out.append((1 << 4) | CompactType.I32)
+    _compact_i32(out, span.flags)
+    out.append((1 << 4) | CompactType.I64)
+    _compact_i64(out, timestamp_to_microseconds(span.start_time))
+    out.append((1 << 4) | CompactType.I64)
+    _compact_i64(
+        out, timestamp_to_microseconds(span.end_time - span.start_time)
+    )
+    out.append((1 << 4) | CompactType.LIST)
+    _compact_tags(out, span.tags)
+
+    out.append((1 << 4) | CompactType.LIST)
+    _compact_list_header(out, len(span.logs))
+    for log in span.logs:
+        out.append((1 << 4) | CompactType.I64)
+        _compact_i64(out, log.timestamp)
+        out.append((1 << 4) | CompactType.LIST)
+        _compact_tags(out, log.fields)
+        out.append(CompactType.STOP)
+
+    out.append(CompactType.STOP)
+    return bytes(out)
+
+
+def serialize_span_binary(span) -> bytes:
+    # thriftpy2 implements binary protocol in cython, serializing
+    # make_span() with it is faster than encoding span in python
+    return serialize_struct(make_span(span), PROTOCOL_BINARY)
+
+
+SPAN_SERIALIZERS = {
+    PROTOCOL_BINARY: serialize_span_binary,
+    PROTOCOL_COMPACT: serialize_span_compact,
+}
+
+
+def serialize_span(span, protocol: str = PROTOCOL_BINARY) -> bytes:
+    return SPAN_SERIALIZERS[protocol](span)
@@ -30,6 +30,10 @@ logger = logging.getLogger('jaeger_tracing')
 class Tracer(opentracing.Tracer):
     """
     N.B. metrics has been deprecated, use metrics_factory instead.
+
+    With ``record_unsampled`` spans not sampled by ``sampler`` are recorded
+    and reported too, for reporters making the sampling decision themselves
+    (see TailSamplingReporter).
     """
     def __init__(
         self,
@@ -49,6 +53,7 @@ class Tracer(opentracing.Tracer):
         max_traceback_length: int = constants.MAX_TRACEBACK_LENGTH,
         throttler: Optional[Throttler] = None,
         scope_manager: Optional[ScopeManager] = None,
+        record_unsampled: bool = False,
     ) -> None:
         self.service_name = service_name
         self.reporter = reporter
@@ -58,6 +63,7 @@ class Tracer(opentracing.Tracer):
         self.random = random.Random(time.time() * (os.getpid() or 1))
         self.debug_id_header = debug_id_header
         self.one_span_per_rpc = one_span_per_rpc
+        self.record_unsampled = record_unsampled
         self.max_tag_value_length = max_tag_value_length
         self.max_traceback_length = max_traceback_length
         self.max_trace_id_bits = constants._max_trace_id_bits if generate_128bit_trace_id \
@@ -0,0 +1,83 @@
+import json
+
+from opentracing import Reference, ReferenceType
+
+from async_jaeger import ConstSampler, Tracer, jsonl, thrift
+from async_jaeger.reporter import InMemoryReporter
+
+
+def _make_spans():
+    tracer = Tracer(
+        service_name='jsonl_test', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True), tags={'version': '1.0'}
+    )
+    root = tracer.start_span('root')
+    span = tracer.start_span('child', references=[
+        Reference(ReferenceType.CHILD_OF, root.context),
+    ])
+    span.set_tag('str', 'value')
+    span.set_tag('int', -5)
+    span.set_tag('bool', False)
+    span.log_kv({'event': 'retry', 'attempt': 2}, timestamp=1.5)
+    span.finish(finish_time=span.start_time + 0.25)
+    root.finish()
+    return tracer, root, span
+
+
+def test_jsonl_serialize_span():
+    tracer, root, span = _make_spans()
+    value = json.loads(jsonl.serialize_span(span))
+    assert value['traceID'] == '%032x' % span.trace_id
+    assert value['spanID'] == '%016x' % span.span_id
+    assert value['parentSpanID'] == '%016x' % root.span_id
+    assert value['operationName'] == 'child'
+    assert value['references'] == [{
+        'refType': 'CHILD_OF',
+        'traceID': '%032x' % root.trace_id,
+        'spanID': '%016x' % root.span_id,
+    }]
+    assert value['startTime'] == int(span.start_time * 1000000)
+    assert abs(value['duration'] - 250000) <= 1
+    assert value['tags'] == [
+        {'key': 'str', 'type': 'string', 'value': 'value'},
+        {'key': 'int', 'type': 'int64', 'value': -5},
+        {'key': 'bool', 'type': 'bool', 'value': False},
+    ]
+    assert value['logs'] == [{
+        'timestamp': 1500000,
+        'fields': [
+            {'key': 'event', 'type': 'string', 'value': 'retry'},
+            {'key': 'attempt', 'type': 'int64', 'value': 2},
+        ],
+    }]
+    assert 'parentSpanID' not in json.loads(jsonl.serialize_span(root))
+
+
+def test_jsonl_serialize_lines():
+    tracer, root, span = _make_spans()
+    process = jsonl.serialize_process(
+        thrift.make_process('jsonl_test', tracer.tags)
+    )
+    data = jsonl.serialize_lines(
+        [jsonl.serialize_span(s) for s in (root, span)], process
+    )
+    lines = [json.loads(line) for line in data.splitlines()]
+    assert [line['operationName'] for line in lines] == ['root', 'child']
+    for line in lines:
+        assert line['process']['serviceName'] == 'jsonl_test'
+        assert {
+            'key': 'version', 'type': 'string', 'value': '1.0',
+        } in line['process']['tags']
+
+
+def test_jsonl_serialize_span_escaping():
+    tracer, root, span = _make_spans()
+    span.operation_name = 'quoted "name"\n'
+    span.set_tag('unicode', 'ünï\\')
+    span.set_tag('double', 0.1)
+    value = json.loads(jsonl.serialize_span(span))
+    assert value['operationName'] == 'quoted "name"\n'
+    assert value['tags'][-2:] == [
+        {'key': 'unicode', 'type': 'string', 'value': 'ünï\\'},
+        {'key': 'double', 'type': 'float64', 'value': 0.1},
+    ]
@@ -0,0 +1,159 @@
+import collections
+import struct
+
+from opentracing import Reference, ReferenceType
+
+from async_jaeger import ConstSampler, Tracer, otlp, thrift
+from async_jaeger.reporter import InMemoryReporter
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _decode(data):
+    """Decodes protobuf message into {field: [values]}."""
+    fields = collections.defaultdict(list)
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == otlp.WIRE_VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == otlp.WIRE_FIXED64:
+            value = data[pos:pos + 8]
+            pos += 8
+        else:
+            assert wire_type == otlp.WIRE_LEN
+            length, pos = _read_varint(data, pos)
+            value = data[pos:pos + length]
+            pos += length
+        fields[field].append(value)
+    return fields
+
+
+def _attributes(values):
+    result = {}
+    for data in values:
+        key_value = _decode(data)
+        value = _decode(key_value[2][0])
+        (field, (raw,)), = value.items()
+        if field == 1:
+            raw = raw.decode('utf-8')
+        elif field == 2:
+            raw = bool(raw)
+        elif field == 3:
+            raw = struct.unpack('<q', struct.pack('<Q', raw))[0]
+        elif field == 4:
+            raw = struct.unpack('<d', raw)[0]
+        result[key_value[1][0].decode('utf-8')] = raw
+    return result
+
+
+def _fixed64(data):
+    return struct.unpack('<Q', data)[0]
+
+
+def _make_spans():
+    tracer = Tracer(
+        service_name='otlp_test', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True), tags={'version': '1.0'}
+    )
+    root = tracer.start_span('root', tags={'span.kind': 'server'})
+    linked = tracer.start_span('linked')
+    span = tracer.start_span('child', references=[
+        Reference(ReferenceType.CHILD_OF, root.context),
+        Reference(ReferenceType.FOLLOWS_FROM, linked.context),
+    ])
+    span.set_tag('str', 'value')
+    span.set_tag('int', -5)
+    span.set_tag('float', 1.5)
+    span.set_tag('bool', False)
+    span.set_tag('error', True)
+    span.log_kv({'event': 'retry', 'attempt': 2}, timestamp=1.5)
+    span.finish()
+    root.finish()
+    linked.finish()
+    return tracer, root, linked, span
+
+
+def test_otlp_serialize_span():
+    tracer, root, linked, span = _make_spans()
+    data = otlp.serialize_span(span)
+    (encoded,) = _decode(data)[2]
+    fields = _decode(encoded)
+
+    assert fields[1] == [span.trace_id.to_bytes(16, 'big')]
+    assert fields[2] == [span.span_id.to_bytes(8, 'big')]
+    assert fields[4] == [root.span_id.to_bytes(8, 'big')]
+    assert fields[5] == [b'child']
+    assert 6 not in fields
+    assert _fixed64(fields[7][0]) == int(span.start_time * 1e9)
+    assert _fixed64(fields[8][0]) == int(span.end_time * 1e9)
+    assert _attributes(fields[9]) == {
+        'str': 'value', 'int': -5, 'float': 1.5, 'bool': False,
+    }
+
+    (event,) = fields[11]
+    event = _decode(event)
+    assert _fixed64(event[1][0]) == 1500000000
+    assert event[2] == [b'retry']
+    assert _attributes(event[3]) == {'attempt': 2}
+
+    (link,) = fields[13]
+    link = _decode(link)
+    assert link[1] == [linked.trace_id.to_bytes(16, 'big')]
+    assert link[2] == [linked.span_id.to_bytes(8, 'big')]
+
+    assert _decode(fields[15][0]) == {3: [otlp.STATUS_CODE_ERROR]}
+
+
+def test_otlp_serialize_span_kind():
+    tracer, root, linked, span = _make_spans()
+    fields = _decode(_decode(otlp.serialize_span(root))[2][0])
+    assert fields[6] == [otlp.SPAN_KIND_SERVER]
+    assert 4 not in fields
+    assert 15 not in fields
+    assert 'span.kind' not in _attributes(fields[9])
+
+
+def test_otlp_serialize_request():
+    tracer, root, linked, span = _make_spans()
+    process = thrift.make_process('otlp_test', tracer.tags)
+    resource = otlp.serialize_resource(process)
+    spans = [otlp.serialize_span(s) for s in (root, span)]
+    data = otlp.serialize_request(spans, resource)
+
+    (resource_spans,) = _decode(data)[1]
+    resource_spans = _decode(resource_spans)
+    attributes = _attributes(_decode(resource_spans[1][0])[1])
+    assert attributes['service.name'] == 'otlp_test'
+    assert attributes['version'] == '1.0'
+
+    (scope_spans,) = resource_spans[2]
+    scope_spans = _decode(scope_spans)
+    scope = _decode(scope_spans[1][0])
+    assert scope[1] == [b'async_jaeger']
+    assert [_decode(s)[5] for s in scope_spans[2]] == [[b'root'], [b'child']]
+
+    overhead = otlp.get_request_overhead(resource)
+    assert len(data) <= overhead + sum(len(s) for s in spans)
+
+
+def test_otlp_serialize_request_parts():
+    tracer, root, linked, span = _make_spans()
+    resource = otlp.serialize_resource(
+        thrift.make_process('otlp_test', tracer.tags)
+    )
+    spans = [otlp.serialize_span(s) for s in (root, span, linked) * 50]
+    head, tail = otlp.serialize_request_parts(spans, resource)
+    assert head + b''.join(spans) + tail == otlp.serialize_request(
+        spans, resource
+    )
@@ -0,0 +1,33 @@
+import pytest
+
+from async_jaeger import otlp, thrift
+from tests.test_thrift_benchmark import _generate_spans
+
+
+def _thrift_batch(spans, process, protocol):
+    thrift.serialize_batch(
+        [thrift.serialize_span(span, protocol) for span in spans],
+        process, protocol,
+    )
+
+
+def _otlp_request(spans, resource):
+    otlp.serialize_request(
+        [otlp.serialize_span(span) for span in spans], resource
+    )
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+def test_thrift_batch(benchmark, protocol):
+    process = thrift.make_process('benchmark', {'hostname': 'localhost'})
+    benchmark(
+        _thrift_batch, _generate_spans(),
+        thrift.serialize_struct(process, protocol), protocol,
+    )
+
+
+def test_otlp_request(benchmark):
+    process = thrift.make_process('benchmark', {'hostname': 'localhost'})
+    benchmark(
+        _otlp_request, _generate_spans(), otlp.serialize_resource(process)
+    )
@@ -1,19 +1,55 @@
+import asyncio
+import collections
+import concurrent.futures
+import gzip
+import json
 import logging
+import os
+import threading
 import time
-import collections
+import uuid
+import zlib
 
 import mock
 import pytest
 import tornado.gen
 import async_jaeger.reporter
 
+import aiohttp
+import aiohttp.web
+from aiohttp import hdrs
+from opentracing import Reference
+from thriftpy2.protocol import TCompactProtocolFactory
+from thriftpy2.thrift import TMessageType, TPayload, TType
+from thriftpy2.transport import TMemoryBuffer
+from thriftpy2.utils import deserialize
 from tornado.concurrent import Future
-from async_jaeger import Span, SpanContext
+from async_jaeger import ConstSampler, Span, SpanContext, Tracer, thrift
 from async_jaeger.metrics import LegacyMetricsFactory, Metrics
 from async_jaeger.utils import ErrorReporter
 from tornado.ioloop import IOLoop
 from tornado.testing import AsyncTestCase, gen_test
-from async_jaeger.reporter import HttpReporter
+from async_jaeger.reporter import (
+    AdaptiveBatching,
+    AgentUdpReporter,
+    DropLowPriorityPolicy,
+    DropNewestPolicy,
+    DropOldestPolicy,
+    FileReporter,
+    HttpReporter,
+    InMemoryReporter,
+    OtlpHttpReporter,
+    RootSpansOnlyPolicy,
+    SharedMemoryExporter,
+    SharedMemoryReporter,
+    SharedSpan,
+    ShardedHttpReporter,
+    TailSamplingReporter,
+    parse_retry_after,
+)
+from async_jaeger.sampler import BackpressureSampler
+from async_jaeger.spool import Spool
+from tests.test_otlp import _decode as _decode_protobuf
 
 
 async def test_null_reporter():
@@ -30,6 +66,47 @@ async def test_in_memory_reporter():
     assert [{}] == spans
 
 
+async def test_bounded_in_memory_reporter():
+    reporter = async_jaeger.reporter.BoundedInMemoryReporter(capacity=4)
+    tracer = Tracer(
+        service_name='reporter_test', reporter=reporter,
+        sampler=ConstSampler(True)
+    )
+    first = tracer.start_span('get')
+    second = tracer.start_span('get')
+    spans = [
+        tracer.start_span('query', child_of=first),
+        tracer.start_span('query', child_of=second),
+        second,
+        tracer.start_span('query', child_of=first),
+        first,
+    ]
+    for span in spans:
+        span.finish()
+    await reporter.close()
+
+    assert reporter.get_spans() == spans[1:]
+    assert reporter.get_spans('query') == [spans[1], spans[3]]
+    assert reporter.get_spans('get') == [second, first]
+    assert reporter.get_spans('missing') == []
+    assert reporter.get_trace(first.trace_id) == [spans[3], first]
+    assert reporter.get_trace(second.trace_id) == [spans[1], second]
+    assert reporter.get_trace_ids() == [first.trace_id, second.trace_id]
+    assert reporter.get_trace_ids(limit=1) == [first.trace_id]
+    assert reporter.get_operations() == ['query', 'get']
+
+    for _ in range(4):
+        tracer.start_span('other').finish()
+    assert reporter.get_operations() == ['other']
+    assert reporter.get_trace(first.trace_id) == []
+    assert len(reporter.traces) == 4
+
+
+async def test_bounded_in_memory_reporter_invalid():
+    with pytest.raises(ValueError):
+        async_jaeger.reporter.BoundedInMemoryReporter(capacity=0)
+
+
 async def test_logging_reporter():
     log_mock = mock.MagicMock()
     reporter = async_jaeger.reporter.LoggingReporter(logger=log_mock)
@@ -234,18 +311,18 @@ class ReporterTest(AsyncTestCase):
         reporter.batch_size = 3
         for i in range(10):
             reporter.report_span(self._new_span('%s' % i))
-        yield self._wait_for(lambda: reporter.queue.qsize() > 0)
-        assert reporter.queue.qsize() == 10, 'queued 10 spans'
+        yield self._wait_for(lambda: len(reporter.queue) > 0)
+        assert len(reporter.queue) == 10, 'queued 10 spans'
 
         # now unblock consumer
         sender.futures[0].set_result(1)
         yield self._wait_for(lambda: count[0] > 2)
 
         assert count[0] == 3, '9 out of 10 spans submitted in 3 batches'
-        assert reporter.queue._unfinished_tasks == 1, 'one span still pending'
+        assert len(reporter.queue) == 1, 'one span still pending'
 
         yield reporter.close()
-        assert reporter.queue.qsize() == 0, 'all spans drained'
+        assert len(reporter.queue) == 0, 'all spans drained'
         assert count[0] == 4, 'last span submitted in one extrac batch'
 
     @gen_test
@@ -284,3 +361,1613 @@ class ReporterTest(AsyncTestCase):
                 f2.set_result(True)
                 yield f
                 assert f.result()
+
+
+class FakeResponse(object):
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.request_info = None
+        self.history = ()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession(object):
+    """
+    Captures requests made by HttpReporter instead of sending them.
+    Responds with ``responses`` in order (status, exception or
+    (status, headers) tuple) and then with ``status``.
+    """
+    def __init__(self, status=202, responses=()):
+        self.status = status
+        self.responses = list(responses)
+        self.requests = []
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        self.requests.append((url, data, headers))
+        response = self.responses.pop(0) if self.responses else self.status
+        if isinstance(response, Exception):
+            raise response
+        if isinstance(response, tuple):
+            return FakeResponse(*response)
+        return FakeResponse(response)
+
+    async def close(self):
+        pass
+
+
+def _new_http_reporter(session=None, metrics_factory=None, **kwargs):
+    session = session or FakeSession()
+    metrics_factory = metrics_factory or FakeMetricsFactory()
+    reporter = HttpReporter(
+        session=session, metrics_factory=metrics_factory, **kwargs
+    )
+    return reporter, session
+
+
+def _new_tracer_span(reporter, name='span'):
+    tracer = Tracer(
+        service_name='reporter_test', reporter=reporter,
+        sampler=ConstSampler(True)
+    )
+    span = tracer.start_span(name)
+    span.set_tag('key', 'value')
+    span.log_kv({'event': 'log'})
+    return span
+
+
+async def test_http_reporter_default_encoding():
+    reporter, session = _new_http_reporter(batch_size=1)
+    _new_tracer_span(reporter).finish()
+    await reporter.close()
+
+    assert len(session.requests) == 1
+    _, data, headers = session.requests[0]
+    assert headers == {hdrs.CONTENT_TYPE: 'application/x-thrift'}
+    batch = deserialize(thrift.SPEC.Batch(), data)
+    assert batch.process.serviceName == 'reporter_test'
+    assert [span.operationName for span in batch.spans] == ['span']
+
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_bytes.payload_raw'] == len(data)
+    assert counters['jaeger:reporter_bytes.payload_sent'] == len(data)
+
+
+@pytest.mark.parametrize('compression,decompress', [
+    ('gzip', gzip.decompress),
+    ('deflate', zlib.decompress),
+])
+async def test_http_reporter_compact_compressed(compression, decompress):
+    reporter, session = _new_http_reporter(
+        batch_size=2, protocol='compact', compression=compression
+    )
+    _new_tracer_span(reporter, '1').finish()
+    _new_tracer_span(reporter, '2').finish()
+    await reporter.close()
+
+    assert len(session.requests) == 1
+    _, data, headers = session.requests[0]
+    assert headers == {
+        hdrs.CONTENT_TYPE: 'application/vnd.apache.thrift.compact',
+        hdrs.CONTENT_ENCODING: compression,
+    }
+    raw = decompress(data)
+    batch = deserialize(thrift.SPEC.Batch(), raw, TCompactProtocolFactory())
+    assert [span.operationName for span in batch.spans] == ['1', '2']
+    assert batch.spans[0].tags[-1].vStr == 'value'
+
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_bytes.payload_raw'] == len(raw)
+    assert counters['jaeger:reporter_bytes.payload_sent'] == len(data)
+
+
+async def test_http_reporter_unknown_encoding():
+    with pytest.raises(ValueError):
+        HttpReporter(session=FakeSession(), protocol='json')
+    with pytest.raises(ValueError):
+        HttpReporter(session=FakeSession(), compression='br')
+
+
+async def test_http_reporter_serialization_failure():
+    reporter, session = _new_http_reporter(batch_size=2)
+    broken = _new_tracer_span(reporter, 'broken')
+    broken.references = [Reference('unknown', broken.context)]
+    broken.finish()
+    _new_tracer_span(reporter, 'ok').finish()
+    await reporter.close()
+
+    assert len(session.requests) == 1
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == ['ok']
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_err'] == 1
+    assert counters['jaeger:reporter_spans.result_ok'] == 1
+
+
+async def test_http_reporter_max_batch_bytes():
+    reporter, session = _new_http_reporter(batch_size=10, flush_interval=0)
+    spans = [_new_tracer_span(reporter, str(i)) for i in range(5)]
+    for span in spans:
+        span.finish()
+    # consumer has not started yet, so the limit is applied to all spans
+    span_size = len(thrift.serialize_span(spans[0]))
+    reporter.max_batch_bytes = reporter._batch_overhead + 2 * span_size
+    await reporter.close()
+
+    batches = [
+        deserialize(thrift.SPEC.Batch(), data)
+        for _, data, _ in session.requests
+    ]
+    assert [
+        [span.operationName for span in batch.spans] for batch in batches
+    ] == [['0', '1'], ['2', '3'], ['4']]
+    for _, data, _ in session.requests:
+        assert len(data) <= reporter.max_batch_bytes
+    assert len(reporter.queue) == 0
+
+
+async def test_http_reporter_max_batch_bytes_oversized_span():
+    reporter, session = _new_http_reporter(batch_size=10, flush_interval=0)
+    reporter.max_batch_bytes = reporter._batch_overhead + 100
+    huge = _new_tracer_span(reporter, 'huge')
+    huge.set_tag('payload', 'x' * 200)
+    huge.finish()
+    await reporter.close()
+
+    assert session.requests == []
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_dropped'] == 1
+
+
+class SlowSession(FakeSession):
+    """Holds every request until release() is called."""
+    def __init__(self, status=202):
+        super().__init__(status)
+        self.released = asyncio.Event()
+        self.active = 0
+        self.max_active = 0
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        self.requests.append((url, data, headers))
+        session = self
+
+        class Response(FakeResponse):
+            async def __aenter__(self):
+                session.active += 1
+                session.max_active = max(session.max_active, session.active)
+                await session.released.wait()
+                session.active -= 1
+                return self
+
+        return Response(self.status)
+
+
+async def test_http_reporter_max_in_flight():
+    session = SlowSession()
+    metrics_factory = FakeMetricsFactory()
+    in_flight = []
+    metrics_factory._metrics._gauge = lambda key, value: (
+        key == 'jaeger:reporter_in_flight_requests' and in_flight.append(value)
+    )
+    reporter = HttpReporter(
+        session=session, batch_size=1, max_in_flight=3,
+        metrics_factory=metrics_factory,
+    )
+    for i in range(5):
+        _new_tracer_span(reporter, str(i)).finish()
+
+    for _ in range(100):
+        if len(session.requests) == 3:
+            break
+        await asyncio.sleep(0.001)
+    # window is full, the 4th batch waits for a slot, the 5th span is queued
+    assert len(session.requests) == 3
+    assert len(reporter.queue) == 1
+    assert max(in_flight) == 3
+
+    session.released.set()
+    await reporter.close()
+    assert len(session.requests) == 5
+    assert session.max_active == 3
+    assert in_flight[-1] == 0
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 5
+
+
+async def test_http_reporter_invalid_max_in_flight():
+    with pytest.raises(ValueError):
+        HttpReporter(session=FakeSession(), max_in_flight=0)
+
+
+async def test_http_reporter_connection_options():
+    metrics_factory = FakeMetricsFactory()
+    reporter = HttpReporter(
+        metrics_factory=metrics_factory, pool_size=4, keepalive_timeout=5.0,
+        dns_cache_ttl=0, request_timeout=2.0, connect_timeout=0.5,
+    )
+    connector = reporter.session.connector
+    assert connector.limit == 4
+    assert connector.use_dns_cache is False
+    assert reporter.timeout.total == 2.0
+    assert reporter.timeout.connect == 0.5
+    await reporter.close()
+    assert reporter.session.closed
+
+    with pytest.raises(ValueError):
+        HttpReporter(session=FakeSession(), pool_size=0)
+    with pytest.raises(ValueError):
+        HttpReporter(session=FakeSession(), warm_up_connections=-1)
+
+
+@pytest.fixture
+async def collector_url():
+    async def handle(request):
+        await request.read()
+        return aiohttp.web.Response(status=202)
+
+    app = aiohttp.web.Application()
+    app.router.add_route('*', '/api/traces', handle)
+    runner = aiohttp.web.AppRunner(app)
+    await runner.setup()
+    site = aiohttp.web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield 'http://127.0.0.1:%d/api/traces' % port
+    await runner.cleanup()
+
+
+async def test_http_reporter_warm_up_and_reuse(collector_url):
+    metrics_factory = FakeMetricsFactory()
+    reporter = HttpReporter(
+        url=collector_url, metrics_factory=metrics_factory,
+        batch_size=1, max_in_flight=2, warm_up_connections=2,
+    )
+    await reporter._warm_up_task
+    counters = metrics_factory.counters
+    assert counters['jaeger:reporter_connections.result_created'] == 2
+
+    for i in range(4):
+        _new_tracer_span(reporter).finish()
+        await asyncio.sleep(0.01)
+    await reporter.close()
+
+    assert counters['jaeger:reporter_spans.result_ok'] == 4
+    assert counters['jaeger:reporter_connections.result_created'] == 2
+    assert counters['jaeger:reporter_connections.result_reused'] == 4
+
+
+async def test_http_reporter_warm_up_failure():
+    error_reporter = mock.MagicMock()
+    reporter = HttpReporter(
+        url='http://127.0.0.1:1/api/traces', error_reporter=error_reporter,
+        connect_timeout=1.0,
+    )
+    await reporter.warm_up(2)
+    await reporter.close()
+    assert error_reporter.error.call_count == 2
+
+
+@pytest.mark.parametrize('response', [
+    503,
+    (429, {'Retry-After': '0'}),
+    aiohttp.ClientConnectionError(),
+    asyncio.TimeoutError(),
+])
+async def test_http_reporter_retry(response):
+    reporter, session = _new_http_reporter(
+        session=FakeSession(responses=[response]),
+        batch_size=1, max_retries=2, retry_backoff=0.001,
+    )
+    _new_tracer_span(reporter).finish()
+    await reporter.close()
+
+    assert len(session.requests) == 2
+    assert session.requests[0][1] == session.requests[1][1]
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 1
+    assert counters['jaeger:reporter_retries'] == 1
+    assert reporter._retry_buffer_size == 0
+
+
+async def test_http_reporter_retry_after():
+    reporter, session = _new_http_reporter(
+        session=FakeSession(responses=[(503, {'Retry-After': '0.01'})]),
+        batch_size=1, max_retries=1,
+    )
+    with mock.patch('random.uniform') as uniform_mock:
+        _new_tracer_span(reporter).finish()
+        while len(session.requests) < 2:
+            await asyncio.sleep(0.01)
+        await reporter.close()
+    uniform_mock.assert_not_called()
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 1
+
+
+async def test_http_reporter_retry_after_capped():
+    reporter, _ = _new_http_reporter(max_retries=1, retry_backoff_max=5.0)
+    error = aiohttp.ClientResponseError(
+        None, (), status=503, headers={'Retry-After': '3600'}
+    )
+    assert reporter._get_retry_delay(error, 0) == 5.0
+    await reporter.close()
+
+
+async def test_http_reporter_close_during_outage():
+    reporter, session = _new_http_reporter(
+        session=FakeSession(responses=[(503, {'Retry-After': '3600'})] * 2),
+        batch_size=1, max_retries=3, retry_backoff_max=3600,
+    )
+    _new_tracer_span(reporter).finish()
+    while not session.requests:
+        await asyncio.sleep(0.01)
+    await asyncio.wait_for(reporter.close(), 1)
+
+    # woken up from backoff for the final attempt
+    assert len(session.requests) == 2
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_dropped_spans.reason_closed'] == 1
+    assert counters['jaeger:reporter_retries'] == 1
+
+
+async def test_http_reporter_retries_exhausted():
+    reporter, session = _new_http_reporter(
+        session=FakeSession(status=500),
+        batch_size=1, max_retries=2, retry_backoff=0.001,
+    )
+    _new_tracer_span(reporter).finish()
+    while len(session.requests) < 3:
+        await asyncio.sleep(0.01)
+    await reporter.close()
+
+    assert len(session.requests) == 3
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_err'] == 1
+    assert counters['jaeger:reporter_retries'] == 2
+
+
+async def test_http_reporter_not_retryable():
+    reporter, session = _new_http_reporter(
+        session=FakeSession(status=400), batch_size=1, max_retries=2,
+    )
+    _new_tracer_span(reporter).finish()
+    await reporter.close()
+
+    assert len(session.requests) == 1
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_err'] == 1
+
+
+async def test_http_reporter_retry_buffer_full():
+    reporter, session = _new_http_reporter(
+        session=FakeSession(status=503),
+        batch_size=1, max_retries=2, retry_buffer_bytes=10,
+    )
+    _new_tracer_span(reporter).finish()
+    await reporter.close()
+
+    assert len(session.requests) == 1
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_dropped'] == 1
+    assert counters[
+        'jaeger:reporter_dropped_spans.reason_retry_buffer_full'
+    ] == 1
+
+
+async def test_http_reporter_dropped_reasons():
+    reporter, session = _new_http_reporter(queue_capacity=1)
+    _new_tracer_span(reporter).finish()
+    _new_tracer_span(reporter).finish()
+    await reporter.close()
+    _new_tracer_span(reporter).finish()
+
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_dropped'] == 2
+    assert counters['jaeger:reporter_dropped_spans.reason_queue_full'] == 1
+    assert counters['jaeger:reporter_dropped_spans.reason_closed'] == 1
+
+
+def _finish_in_thread(spans):
+    thread = threading.Thread(target=lambda: [span.finish() for span in spans])
+    thread.start()
+    # blocks the event loop, so all spans wait for one handover
+    thread.join()
+
+
+async def test_http_reporter_report_span_from_thread():
+    reporter, session = _new_http_reporter(batch_size=100)
+    spans = [_new_tracer_span(reporter, str(i)) for i in range(100)]
+    loop = asyncio.get_event_loop()
+    with mock.patch.object(
+        loop, 'call_soon_threadsafe', wraps=loop.call_soon_threadsafe
+    ) as call_soon_threadsafe:
+        _finish_in_thread(spans)
+        await asyncio.sleep(0)
+    call_soon_threadsafe.assert_called_once()
+    await reporter.close()
+
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == [
+        str(i) for i in range(100)
+    ]
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 100
+
+
+async def test_http_reporter_report_span_from_thread_queue_full():
+    reporter, session = _new_http_reporter(queue_capacity=5)
+    _finish_in_thread([_new_tracer_span(reporter) for _ in range(10)])
+    await reporter.close()
+
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 5
+    assert counters['jaeger:reporter_dropped_spans.reason_queue_full'] == 5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+
+
+class EmitBatchArgs(TPayload):
+    thrift_spec = {1: (TType.STRUCT, 'batch', thrift.SPEC.Batch, False)}
+    default_spec = [('batch', None)]
+
+
+class AgentServer(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.packets = []
+
+    def datagram_received(self, data, addr):
+        self.packets.append(data)
+
+    def get_batches(self):
+        batches = []
+        for packet in self.packets:
+            protocol = TCompactProtocolFactory().get_protocol(
+                TMemoryBuffer(packet)
+            )
+            assert protocol.read_message_begin() == (
+                'emitBatch', TMessageType.ONEWAY, 0
+            )
+            args = EmitBatchArgs()
+            protocol.read_struct(args)
+            batches.append(args.batch)
+        return batches
+
+
+async def test_agent_udp_reporter():
+    loop = asyncio.get_event_loop()
+    transport, server = await loop.create_datagram_endpoint(
+        AgentServer, local_addr=('127.0.0.1', 0)
+    )
+    port = transport.get_extra_info('sockname')[1]
+    reporter = AgentUdpReporter(
+        host='127.0.0.1', port=port, batch_size=10, flush_interval=0,
+        metrics_factory=FakeMetricsFactory(),
+    )
+    spans = [_new_tracer_span(reporter, str(i)) for i in range(5)]
+    for span in spans:
+        span.finish()
+    # cut packets so that every one holds two spans
+    reporter.max_batch_bytes = (
+        reporter._batch_overhead
+        + 2 * max(
+            len(thrift.serialize_span(span, 'compact')) for span in spans
+        )
+    )
+    await reporter.close()
+    for _ in range(100):
+        if len(server.packets) == 3:
+            break
+        await asyncio.sleep(0.001)
+    transport.close()
+
+    batches = server.get_batches()
+    assert [
+        [span.operationName for span in batch.spans] for batch in batches
+    ] == [['0', '1'], ['2', '3'], ['4']]
+    assert batches[0].process.serviceName == 'reporter_test'
+    for packet in server.packets:
+        assert len(packet) <= reporter.max_batch_bytes
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 5
+    assert counters['jaeger:reporter_bytes.payload_sent'] == sum(
+        len(packet) for packet in server.packets
+    )
+
+
+async def test_agent_udp_reporter_oversized_span():
+    reporter = AgentUdpReporter(
+        host='127.0.0.1', port=9, max_packet_size=1000,
+        metrics_factory=FakeMetricsFactory(),
+    )
+    span = _new_tracer_span(reporter)
+    span.set_tag('payload', 'x' * 1000)
+    span.finish()
+    await reporter.close()
+
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_dropped_spans.reason_too_large'] == 1
+    assert 'jaeger:reporter_spans.result_ok' not in counters
+
+
+async def test_http_reporter_spool(tmp_path):
+    reporter, session = _new_http_reporter(
+        session=FakeSession(responses=[aiohttp.ClientConnectionError()]),
+        batch_size=1, spool=Spool(str(tmp_path)), retry_backoff=0.001,
+    )
+    _new_tracer_span(reporter).finish()
+    for _ in range(100):
+        if len(session.requests) == 2 and reporter._drain_task is None:
+            break
+        await asyncio.sleep(0.001)
+    await reporter.close()
+
+    assert len(session.requests) == 2
+    assert session.requests[0][1] == session.requests[1][1]
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spooled_spans'] == 1
+    assert counters['jaeger:reporter_spans.result_ok'] == 1
+    assert 'jaeger:reporter_spans.result_err' not in counters
+
+
+async def test_http_reporter_spool_survives_restart(tmp_path):
+    reporter, session = _new_http_reporter(
+        session=FakeSession(status=503), batch_size=1,
+        spool=Spool(str(tmp_path)), retry_backoff=10,
+    )
+    _new_tracer_span(reporter, '1').finish()
+    for _ in range(100):
+        if reporter._drain_task is not None:
+            break
+        await asyncio.sleep(0.001)
+    # collector is down, the next batch goes straight to the spool
+    _new_tracer_span(reporter, '2').finish()
+    await reporter.close()
+    assert reporter.metrics_factory.counters[
+        'jaeger:reporter_spooled_spans'
+    ] == 2
+
+    reporter, session = _new_http_reporter(
+        batch_size=1, spool=Spool(str(tmp_path))
+    )
+    for _ in range(100):
+        if reporter._drain_task is None:
+            break
+        await asyncio.sleep(0.001)
+    await reporter.close()
+    batches = [
+        deserialize(thrift.SPEC.Batch(), data)
+        for _, data, _ in session.requests
+    ]
+    assert [batch.spans[0].operationName for batch in batches] == ['1', '2']
+    assert reporter.metrics_factory.counters[
+        'jaeger:reporter_spans.result_ok'
+    ] == 2
+
+
+class LatencySession(FakeSession):
+    """FakeSession answering after ``latency`` seconds."""
+    def __init__(self, latency, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.active = 0
+        self.max_active = 0
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        response = super().post(url, data, headers, **kwargs)
+        session = self
+
+        class SlowResponse(object):
+            async def __aenter__(self):
+                session.active += 1
+                session.max_active = max(session.max_active, session.active)
+                try:
+                    await asyncio.sleep(session.latency)
+                finally:
+                    session.active -= 1
+                return await response.__aenter__()
+
+            async def __aexit__(self, *args):
+                pass
+
+        return SlowResponse()
+
+
+async def test_http_reporter_spool_drains_under_load(tmp_path):
+    spool = Spool(str(tmp_path))
+    session = LatencySession(
+        0.02, responses=[aiohttp.ClientConnectionError()]
+    )
+    reporter, session = _new_http_reporter(
+        session=session, batch_size=1, max_in_flight=8, spool=spool,
+        retry_backoff=0.001,
+    )
+    # a single failure followed by 200 spans per second
+    for i in range(100):
+        _new_tracer_span(reporter, str(i)).finish()
+        await asyncio.sleep(0.005)
+    for _ in range(100):
+        if not len(spool) and reporter._drain_task is None:
+            break
+        await asyncio.sleep(0.01)
+    assert len(spool) == 0
+    assert session.max_active > 1
+    await reporter.close()
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 100
+
+
+async def test_shared_memory_exporter():
+    reporter, session = _new_http_reporter(batch_size=10, flush_interval=0)
+    names = ['jaeger-test-%d-%s' % (i, uuid.uuid4().hex[:8]) for i in range(2)]
+    exporter = SharedMemoryExporter(reporter, names, poll_interval=0.001)
+    workers = [
+        SharedMemoryReporter(name, metrics_factory=FakeMetricsFactory())
+        for name in names
+    ]
+    for i, worker in enumerate(workers):
+        for j in range(3):
+            _new_tracer_span(worker, '%d-%d' % (i, j)).finish()
+        await worker.close()
+    for _ in range(100):
+        if len(reporter.queue) + reporter.metrics_factory.counters.get(
+            'jaeger:reporter_spans.result_ok', 0
+        ) == 6:
+            break
+        await asyncio.sleep(0.001)
+    await exporter.close()
+
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert batch.process.serviceName == 'reporter_test'
+    names = sorted(
+        span.operationName
+        for _, data, _ in session.requests
+        for span in deserialize(thrift.SPEC.Batch(), data).spans
+    )
+    assert names == ['0-0', '0-1', '0-2', '1-0', '1-1', '1-2']
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 6
+
+
+async def test_shared_memory_reporter_ring_full():
+    reporter, session = _new_http_reporter()
+    name = 'jaeger-test-%s' % uuid.uuid4().hex[:8]
+    exporter = SharedMemoryExporter(reporter, [name], ring_bytes=1024)
+    exporter.stopped = True
+    await exporter.task
+    worker = SharedMemoryReporter(name, metrics_factory=FakeMetricsFactory())
+    assert worker.get_load() == 0.0
+    for _ in range(20):
+        _new_tracer_span(worker).finish()
+    # less than a span is left in the ring
+    assert worker.get_load() > 0.8
+    await worker.close()
+    await exporter.close()
+
+    counters = worker.metrics_factory.counters
+    dropped = counters['jaeger:reporter_dropped_spans.reason_queue_full']
+    assert 0 < dropped < 20
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 20 - dropped
+
+
+async def test_shared_memory_exporter_no_rings():
+    reporter, session = _new_http_reporter()
+    with pytest.raises(ValueError):
+        SharedMemoryExporter(reporter, [])
+    await reporter.close()
+
+
+async def test_otlp_http_reporter():
+    session = FakeSession(status=200)
+    reporter = OtlpHttpReporter(
+        session=session, batch_size=2, compression='gzip',
+        metrics_factory=FakeMetricsFactory(),
+    )
+    for i in range(3):
+        _new_tracer_span(reporter, str(i)).finish()
+    await reporter.close()
+
+    assert len(session.requests) == 2
+    url, data, headers = session.requests[0]
+    assert url == 'http://127.0.0.1:4318/v1/traces'
+    assert headers[hdrs.CONTENT_TYPE] == 'application/x-protobuf'
+    assert headers[hdrs.CONTENT_ENCODING] == 'gzip'
+    (resource_spans,) = _decode_protobuf(gzip.decompress(data))[1]
+    resource_spans = _decode_protobuf(resource_spans)
+    assert resource_spans[1] == [
+        _decode_protobuf(reporter._process_data)[1][0]
+    ]
+    scope_spans = _decode_protobuf(resource_spans[2][0])
+    assert [
+        _decode_protobuf(span)[5] for span in scope_spans[2]
+    ] == [[b'0'], [b'1']]
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 3
+
+
+def test_adaptive_batching():
+    with mock.patch('async_jaeger.reporter.time.monotonic', return_value=0):
+        adaptive = AdaptiveBatching(
+            min_batch_size=2, max_batch_size=100,
+            min_flush_interval=0.01, max_flush_interval=1.0, alpha=0.5,
+        )
+    # no samples yet, configured values are only clamped
+    assert adaptive.get_flush_interval(None) == 1.0
+    assert adaptive.get_flush_interval(5.0) == 1.0
+    assert adaptive.get_batch_size(1, 1.0) == 2
+
+    # 100 spans per second, 10ms submits
+    with mock.patch('async_jaeger.reporter.time.monotonic', return_value=1):
+        adaptive.observe_batch(100)
+    adaptive.observe_latency(0.01)
+    assert adaptive.get_flush_interval(1.0) == pytest.approx(0.1)
+    assert adaptive.get_batch_size(10, 0.1) == 10
+
+    # traffic grows, collector slows down
+    with mock.patch('async_jaeger.reporter.time.monotonic', return_value=1.1):
+        adaptive.observe_batch(290)
+    adaptive.observe_latency(0.05)
+    assert adaptive.rate == pytest.approx(1500)
+    assert adaptive.latency == pytest.approx(0.03)
+    assert adaptive.get_flush_interval(0.1) == pytest.approx(0.3)
+    assert adaptive.get_batch_size(10, 0.3) == 100
+
+    # traffic stops
+    adaptive.rate = 1
+    assert adaptive.get_batch_size(100, 0.3) == 2
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'min_batch_size': 0},
+    {'min_batch_size': 10, 'max_batch_size': 5},
+    {'min_flush_interval': 2, 'max_flush_interval': 1},
+    {'alpha': 0},
+])
+def test_adaptive_batching_invalid(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveBatching(**kwargs)
+
+
+async def test_http_reporter_adaptive():
+    metrics_factory = FakeMetricsFactory()
+    gauges = collections.defaultdict(list)
+    metrics_factory._metrics._gauge = lambda key, value: (
+        gauges[key].append(value)
+    )
+    adaptive = AdaptiveBatching(min_flush_interval=0.01, max_batch_size=50)
+    reporter, session = _new_http_reporter(
+        batch_size=2, adaptive=adaptive, metrics_factory=metrics_factory,
+    )
+    assert reporter.flush_interval == 1.0
+    for i in range(4):
+        _new_tracer_span(reporter, str(i)).finish()
+        await asyncio.sleep(0.01)
+    await reporter.close()
+
+    assert adaptive.rate is not None
+    assert adaptive.latency is not None
+    assert reporter.flush_interval == 0.01
+    assert gauges['jaeger:reporter_flush_interval'][-1] == 10
+    assert gauges['jaeger:reporter_batch_size'][-1] == reporter.batch_size
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 4
+
+
+def _new_overflow_spans():
+    tracer = Tracer(
+        service_name='reporter_test', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True)
+    )
+    root = tracer.start_span('root')
+    child = tracer.start_span('child', child_of=root)
+    error = tracer.start_span('error', child_of=root)
+    error.set_tag('error', True)
+    return root, child, error
+
+
+@pytest.mark.parametrize('policy,queued,reported,reason,expected', [
+    (DropNewestPolicy(), 'child', 'root', 'queue_full', ['child']),
+    (DropOldestPolicy(), 'root', 'child', 'oldest', ['child']),
+    (DropLowPriorityPolicy(), 'error', 'child', 'low_priority', ['error']),
+    (DropLowPriorityPolicy(), 'child', 'error', 'low_priority', ['error']),
+    (DropLowPriorityPolicy(), 'error', 'error', 'queue_full', ['error']),
+    (RootSpansOnlyPolicy(), 'root', 'child', 'non_root', ['root']),
+    (RootSpansOnlyPolicy(), 'child', 'root', 'non_root', ['root']),
+    (RootSpansOnlyPolicy(), 'root', 'root', 'queue_full', ['root']),
+])
+def test_overflow_policies(policy, queued, reported, reason, expected):
+    spans = dict(zip(('root', 'child', 'error'), _new_overflow_spans()))
+    queue = collections.deque([spans[queued]])
+    assert policy.overflow(queue, spans[reported]) == reason
+    assert [span.operation_name for span in queue] == expected
+
+
+async def test_http_reporter_overflow_policy():
+    reporter, session = _new_http_reporter(
+        queue_capacity=2, overflow_policy=DropLowPriorityPolicy()
+    )
+    for name in ('0', '1', '2'):
+        _new_tracer_span(reporter, name).finish()
+    error = _new_tracer_span(reporter, 'error')
+    error.set_tag('error', True)
+    error.finish()
+    await reporter.close()
+
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == ['1', 'error']
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_dropped'] == 2
+    assert counters['jaeger:reporter_dropped_spans.reason_low_priority'] == 2
+
+
+async def test_http_reporter_overflow_policy_evictable_count():
+    reporter, session = _new_http_reporter(
+        queue_capacity=2, overflow_policy=RootSpansOnlyPolicy()
+    )
+    tracer = Tracer(
+        service_name='reporter_test', reporter=reporter,
+        sampler=ConstSampler(True)
+    )
+    parent = tracer.start_span('parent')
+    # the child makes room for a root, a queue of roots is kept as is
+    for name in ('child', 'root', 'root-0', 'root-1', 'child-0'):
+        child_of = parent if name.startswith('child') else None
+        tracer.start_span(name, child_of=child_of).finish()
+    assert reporter._evictable == 0
+    assert [span.operation_name for span in reporter.queue] == [
+        'root', 'root-0'
+    ]
+    await reporter.close()
+    assert reporter._evictable == 0
+
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == ['root', 'root-0']
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_dropped_spans.reason_non_root'] == 2
+    assert counters['jaeger:reporter_dropped_spans.reason_queue_full'] == 1
+
+
+async def test_http_reporter_overflow_policy_serialized_spans():
+    reporter, session = _new_http_reporter(
+        queue_capacity=2, overflow_policy=DropOldestPolicy()
+    )
+    reporter.set_process('reporter_test', {})
+    for name in ('0', '1', '2'):
+        span = _new_tracer_span(reporter, name)
+        span.end_time = span.start_time
+        reporter.report_serialized_span(thrift.serialize_span(span))
+    await reporter.close()
+
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == ['1', '2']
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_dropped_spans.reason_oldest'] == 1
+
+
+async def test_http_reporter_priority_queue():
+    reporter, session = _new_http_reporter(
+        queue_capacity=2, priority_queue_capacity=2, batch_size=10,
+    )
+    for name in ('0', '1', '2'):
+        _new_tracer_span(reporter, name).finish()
+    debug = _new_tracer_span(reporter, 'debug')
+    debug.set_tag('sampling.priority', 1)
+    debug.finish()
+    for name in ('error', 'overflow'):
+        error = _new_tracer_span(reporter, name)
+        error.set_tag('error', True)
+        error.finish()
+    assert len(reporter.priority_queue) == 2
+    await reporter.close()
+
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == [
+        'debug', 'error', '0', '1'
+    ]
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_priority_spans.lane_priority'] == 2
+    assert counters['jaeger:reporter_priority_spans.lane_regular'] == 1
+    assert counters['jaeger:reporter_dropped_spans.reason_queue_full'] == 2
+
+
+def _new_tail_sampling_tracer(**kwargs):
+    reporter = TailSamplingReporter(
+        InMemoryReporter(), metrics_factory=FakeMetricsFactory(), **kwargs
+    )
+    tracer = Tracer(
+        service_name='reporter_test', reporter=reporter,
+        sampler=ConstSampler(False), record_unsampled=True,
+    )
+    return tracer, reporter
+
+
+def _reported(reporter):
+    return [span.operation_name for span in reporter.reporter.get_spans()]
+
+
+async def test_tail_sampling_reporter():
+    tracer, reporter = _new_tail_sampling_tracer(latency_threshold=10)
+
+    root = tracer.start_span('ok-root')
+    tracer.start_span('ok-child', child_of=root).finish()
+    root.finish()
+
+    root = tracer.start_span('error-root')
+    tracer.start_span('child', child_of=root).finish()
+    tracer.start_span('error', child_of=root).set_tag('error', True).finish()
+    tracer.start_span('late-child', child_of=root).finish()
+    root.finish()
+
+    root = tracer.start_span('slow-root', start_time=time.time() - 20)
+    tracer.start_span('child', child_of=root).finish()
+    root.finish()
+
+    debug = tracer.start_span('debug', tags={'sampling.priority': 1})
+    debug.finish()
+
+    assert _reported(reporter) == [
+        'child', 'error', 'late-child', 'error-root',
+        'child', 'slow-root', 'debug',
+    ]
+    assert reporter.buffered_spans == 2
+    await reporter.close()
+    assert len(_reported(reporter)) == 7
+
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:tail_sampling_traces.decision_error'] == 1
+    assert counters['jaeger:tail_sampling_traces.decision_latency'] == 1
+    assert counters['jaeger:tail_sampling_traces.decision_dropped'] == 1
+
+
+async def test_tail_sampling_reporter_probability():
+    tracer, reporter = _new_tail_sampling_tracer(
+        probability=1.0, decision_wait=0.01
+    )
+    root = tracer.start_span('root')
+    tracer.start_span('child', child_of=root).finish()
+    root.finish()
+    assert _reported(reporter) == []
+
+    for _ in range(100):
+        if reporter.reporter.get_spans():
+            break
+        await asyncio.sleep(0.01)
+    assert _reported(reporter) == ['child', 'root']
+    await reporter.close()
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:tail_sampling_traces.decision_probability'] == 1
+
+
+async def test_tail_sampling_reporter_evicts_oldest_traces():
+    tracer, reporter = _new_tail_sampling_tracer(max_spans=2)
+    for name in ('0', '1', '2'):
+        tracer.start_span(name).finish()
+    assert [
+        spans[0].operation_name for _, spans in reporter.traces.values()
+    ] == ['1', '2']
+    await reporter.close()
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:tail_sampling_traces.decision_evicted'] == 1
+    assert counters['jaeger:tail_sampling_traces.decision_dropped'] == 2
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'decision_wait': 0}, {'probability': 2}, {'max_spans': 0},
+])
+async def test_tail_sampling_reporter_invalid(kwargs):
+    with pytest.raises(ValueError):
+        TailSamplingReporter(InMemoryReporter(), **kwargs)
+
+
+class EndpointsSession(FakeSession):
+    """Responds with ``statuses`` by url, 202 for other urls."""
+    def __init__(self, statuses):
+        super().__init__()
+        self.statuses = statuses
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        self.status = self.statuses.get(url, 202)
+        return super().post(url, data, headers, **kwargs)
+
+
+def _new_sharded_reporter(statuses=None, **kwargs):
+    session = EndpointsSession(statuses or {})
+    metrics_factory = FakeMetricsFactory()
+    reporter = ShardedHttpReporter(
+        ['http://a/api/traces', 'http://b/api/traces', 'http://c/api/traces'],
+        session=session, metrics_factory=metrics_factory,
+        batch_size=1, **kwargs
+    )
+    reporter.metrics_factory = metrics_factory
+    reporter.set_process('reporter_test', {})
+    tracer = Tracer(
+        service_name='reporter_test', reporter=reporter,
+        sampler=ConstSampler(True)
+    )
+    return tracer, reporter, session
+
+
+async def test_sharded_http_reporter_trace_affinity():
+    tracer, reporter, session = _new_sharded_reporter()
+    expected = {}
+    for _ in range(30):
+        root = tracer.start_span('root')
+        tracer.start_span('child', child_of=root).finish()
+        root.finish()
+        expected[root.trace_id] = reporter.get_endpoint(root.trace_id).url
+    await reporter.close()
+
+    urls = collections.defaultdict(set)
+    for url, data, _ in session.requests:
+        batch = deserialize(thrift.SPEC.Batch(), data)
+        for span in batch.spans:
+            mask = (1 << 64) - 1
+            trace_id = (
+                (span.traceIdHigh & mask) << 64 | span.traceIdLow & mask
+            )
+            urls[trace_id].add(url)
+    assert len(session.requests) == 60
+    assert {trace_id: url for trace_id, (url,) in urls.items()} == expected
+    assert len(set(expected.values())) == 3
+
+
+async def test_sharded_http_reporter_ejects_failing_endpoint():
+    failing = 'http://b/api/traces'
+    tracer, reporter, session = _new_sharded_reporter(
+        {failing: 503}, max_failures=2, ejection_time=60
+    )
+    trace_ids = []
+    while len(trace_ids) < 2:
+        span = tracer.start_span('span')
+        if reporter.get_endpoint(span.trace_id).url == failing:
+            trace_ids.append(span.trace_id)
+            span.finish()
+            await asyncio.sleep(0.01)
+
+    endpoint = reporter.endpoints[1]
+    assert not endpoint.is_available(time.monotonic())
+    assert reporter.get_endpoint(trace_ids[0]).url != failing
+    await reporter.close()
+
+    counters = reporter.metrics_factory.counters
+    assert counters[
+        'jaeger:reporter_endpoint_ejections.endpoint_' + failing
+    ] == 1
+    assert counters[
+        'jaeger:reporter_spans.endpoint_%s.result_err' % failing
+    ] == 2
+
+
+async def test_sharded_http_reporter_probes_ejected_endpoint():
+    tracer, reporter, session = _new_sharded_reporter(
+        max_failures=2, ejection_time=60
+    )
+    endpoint = reporter.endpoints[0]
+    endpoint.on_failure()
+    endpoint.on_failure()
+    assert not endpoint.is_available(time.monotonic())
+
+    endpoint.ejected_until = 0
+    assert endpoint.is_available(time.monotonic())
+    endpoint.on_failure()
+    assert not endpoint.is_available(time.monotonic())
+
+    endpoint.ejected_until = 0
+    endpoint.on_success()
+    endpoint.on_failure()
+    assert endpoint.is_available(time.monotonic())
+    await reporter.close()
+
+
+def test_sharded_http_reporter_invalid():
+    with pytest.raises(ValueError):
+        ShardedHttpReporter([])
+    with pytest.raises(ValueError):
+        ShardedHttpReporter(['http://a/api/traces'], spool=mock.Mock())
+    with pytest.raises(ValueError):
+        ShardedHttpReporter(['http://a/api/traces'], adaptive=mock.Mock())
+
+
+async def test_sharded_http_reporter_spool_per_endpoint(tmp_path):
+    spools = {}
+
+    def spool_factory(url):
+        spools[url] = Spool(str(tmp_path / url.split('/')[2]))
+        return spools[url]
+
+    tracer, reporter, _ = _new_sharded_reporter(
+        spool_factory=spool_factory, adaptive_factory=AdaptiveBatching,
+    )
+    await reporter.close()
+    assert len(spools) == 3
+    for endpoint in reporter.endpoints:
+        assert endpoint.reporter.spool is spools[endpoint.url]
+    adaptive = {id(endpoint.reporter.adaptive) for endpoint in reporter.endpoints}
+    assert len(adaptive) == 3
+
+
+@pytest.mark.parametrize('executor_class', [
+    concurrent.futures.ThreadPoolExecutor,
+    concurrent.futures.ProcessPoolExecutor,
+])
+async def test_http_reporter_offloads_serialization(executor_class):
+    timings = []
+    metrics_factory = FakeMetricsFactory()
+    metrics_factory._metrics._timing = lambda key, value: timings.append(key)
+    with executor_class(max_workers=1) as executor:
+        reporter, session = _new_http_reporter(
+            batch_size=10, offload_threshold=5, executor=executor,
+            metrics_factory=metrics_factory,
+        )
+        reporter.set_process('reporter_test', {})
+        spans = [_new_tracer_span(reporter, str(i)) for i in range(12)]
+        for span in spans:
+            span.finish()
+        reporter.report_serialized_span(
+            thrift.serialize_span(spans[0], reporter.protocol)
+        )
+        await reporter.close()
+
+    batches = [
+        deserialize(thrift.SPEC.Batch(), data)
+        for _, data, _ in session.requests
+    ]
+    assert [len(batch.spans) for batch in batches] == [10, 3]
+    assert [
+        span.operationName for batch in batches for span in batch.spans
+    ] == [str(i) for i in range(12)] + ['0']
+    assert metrics_factory.counters['jaeger:reporter_spans.result_ok'] == 13
+    assert 'jaeger:reporter_loop_blocking.stage_serialize' in timings
+    assert 'jaeger:reporter_loop_blocking.stage_encode' in timings
+
+
+async def test_http_reporter_offloads_full_batch_by_default():
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        reporter, session = _new_http_reporter(executor=executor)
+        with mock.patch.object(
+                executor, 'submit', wraps=executor.submit
+        ) as submit:
+            for i in range(reporter.batch_size):
+                _new_tracer_span(reporter, str(i)).finish()
+            await reporter.close()
+
+    assert reporter.offload_threshold > reporter.batch_size
+    submit.assert_called_once()
+    (_, data, _), = session.requests
+    batch = deserialize(thrift.SPEC.Batch(), data)
+    assert len(batch.spans) == reporter.batch_size
+
+
+async def test_http_reporter_offload_failure():
+    error_reporter = mock.MagicMock()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        reporter, session = _new_http_reporter(
+            offload_threshold=2, executor=executor,
+            error_reporter=error_reporter,
+        )
+        reporter.set_process('reporter_test', {})
+        spans = [_new_tracer_span(reporter, str(i)) for i in range(3)]
+        spans[1].references = [Reference('unknown', spans[0].context)]
+        for span in spans:
+            span.finish()
+        await reporter.close()
+
+    (_, data, _), = session.requests
+    batch = deserialize(thrift.SPEC.Batch(), data)
+    assert [span.operationName for span in batch.spans] == ['0', '2']
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_err'] == 1
+    error_reporter.error.assert_called_once_with(
+        'Failed to serialize %d spans', 1
+    )
+
+
+async def _read_body(data):
+    if isinstance(data, bytes):
+        return data
+    return b''.join([chunk async for chunk in data])
+
+
+class StreamingSession(FakeSession):
+    """FakeSession reading request bodies into ``bodies`` before answering."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.bodies = []
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        response = super().post(url, data, headers, **kwargs)
+        session = self
+
+        class StreamedResponse(object):
+            async def __aenter__(self):
+                session.bodies.append(await _read_body(
+                    bytes(data) if isinstance(data, memoryview) else data
+                ))
+                return await response.__aenter__()
+
+            async def __aexit__(self, *args):
+                pass
+
+        return StreamedResponse()
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip', 'deflate'])
+async def test_http_reporter_streams_large_batches(compression):
+    metrics_factory = FakeMetricsFactory()
+    reporter, session = _new_http_reporter(
+        session=StreamingSession(),
+        batch_size=20, stream_threshold=2000, stream_chunk_size=1024,
+        compression=compression, metrics_factory=metrics_factory,
+    )
+    reporter.set_process('reporter_test', {})
+    for i in range(25):
+        _new_tracer_span(reporter, str(i)).finish()
+    await reporter.close()
+
+    _, small, _ = session.requests[1]
+    assert isinstance(small, bytes)
+    body, _ = session.bodies
+    counters = metrics_factory.counters
+    assert counters['jaeger:reporter_bytes.payload_sent'] == (
+        len(body) + len(small)
+    )
+    if compression == 'gzip':
+        body = gzip.decompress(body)
+    elif compression == 'deflate':
+        body = zlib.decompress(body)
+    batch = deserialize(thrift.SPEC.Batch(), body)
+    assert [span.operationName for span in batch.spans] == [
+        str(i) for i in range(20)
+    ]
+    assert counters['jaeger:reporter_spans.result_ok'] == 25
+
+
+async def test_http_reporter_streamed_batch_retry_and_spool(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=64 * 1024)
+    reporter, session = _new_http_reporter(
+        session=FakeSession(responses=[
+            aiohttp.ClientConnectionError(), aiohttp.ClientConnectionError(),
+        ]),
+        batch_size=10, stream_threshold=1, max_retries=1, retry_backoff=0,
+        spool=spool,
+    )
+    reporter.set_process('reporter_test', {})
+    for i in range(10):
+        _new_tracer_span(reporter, str(i)).finish()
+    for _ in range(100):
+        if len(session.requests) == 3:
+            break
+        await asyncio.sleep(0.01)
+    await reporter.close()
+
+    bodies = [await _read_body(data) for _, data, _ in session.requests]
+    assert len(bodies) == 3
+    # retried body is generated anew, spooled one is joined
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert isinstance(session.requests[2][1], (bytes, memoryview))
+
+
+async def test_http_reporter_streamed_batch_counted_once():
+    reporter, session = _new_http_reporter(
+        session=StreamingSession(responses=[503]),
+        batch_size=10, stream_threshold=1, compression='gzip',
+        max_retries=1, retry_backoff=0,
+    )
+    reporter.set_process('reporter_test', {})
+    for i in range(10):
+        _new_tracer_span(reporter, str(i)).finish()
+    await reporter.close()
+
+    # both attempts stream the whole body, only the acknowledged one counts
+    failed, body = session.bodies
+    assert len(failed) == len(body)
+    raw = gzip.decompress(body)
+    batch = deserialize(thrift.SPEC.Batch(), raw)
+    assert len(batch.spans) == 10
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_bytes.payload_sent'] == len(body)
+    assert counters['jaeger:reporter_bytes.payload_raw'] == len(raw)
+    assert counters['jaeger:reporter_spans.result_ok'] == 10
+
+
+def _read_thrift_records(path):
+    batches = []
+    with open(path, 'rb') as f:
+        data = f.read()
+    while data:
+        size = int.from_bytes(data[:4], 'big')
+        batches.append(deserialize(thrift.SPEC.Batch(), data[4:4 + size]))
+        data = data[4 + size:]
+    return batches
+
+
+async def test_file_reporter_thrift(tmp_path):
+    path = str(tmp_path / 'spans.thrift')
+    reporter = FileReporter(path, batch_size=2, fsync_interval=0)
+    reporter.set_process('reporter_test', {})
+    for i in range(3):
+        _new_tracer_span(reporter, str(i)).finish()
+    await reporter.close()
+
+    batches = _read_thrift_records(path)
+    assert [
+        [span.operationName for span in batch.spans] for batch in batches
+    ] == [['0', '1'], ['2']]
+    assert batches[0].process.serviceName == 'reporter_test'
+    assert reporter._file is None
+
+
+async def test_file_reporter_json(tmp_path):
+    path = str(tmp_path / 'spans.jsonl')
+    reporter = FileReporter(path, encoding='json', fsync_interval=None)
+    reporter.set_process('reporter_test', {})
+    spans = [_new_tracer_span(reporter, str(i)) for i in range(3)]
+    with mock.patch('os.fsync') as fsync_mock:
+        for span in spans:
+            span.finish()
+        await reporter.close()
+    # synced only on close
+    fsync_mock.assert_called_once()
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['operationName'] for line in lines] == ['0', '1', '2']
+    assert lines[0]['traceID'] == '%032x' % spans[0].trace_id
+    assert lines[0]['process']['serviceName'] == 'reporter_test'
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'max_bytes': 1}, {'rotate_interval': 0},
+])
+async def test_file_reporter_rotation(tmp_path, kwargs):
+    path = str(tmp_path / 'spans.thrift')
+    reporter = FileReporter(path, batch_size=1, backup_count=2, **kwargs)
+    reporter.set_process('reporter_test', {})
+    for i in range(4):
+        _new_tracer_span(reporter, str(i)).finish()
+        await asyncio.sleep(0.01)
+    await reporter.close()
+
+    assert sorted(os.listdir(str(tmp_path))) == [
+        'spans.thrift', 'spans.thrift.1', 'spans.thrift.2',
+    ]
+    names = [
+        span.operationName
+        for name in (path + '.2', path + '.1', path)
+        for batch in _read_thrift_records(name)
+        for span in batch.spans
+    ]
+    assert names == ['1', '2', '3']
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'max_bytes': 1}, {'rotate_interval': 0},
+])
+async def test_file_reporter_no_backups(tmp_path, kwargs):
+    path = str(tmp_path / 'spans.thrift')
+    reporter = FileReporter(path, batch_size=1, backup_count=0, **kwargs)
+    reporter.set_process('reporter_test', {})
+    for i in range(3):
+        _new_tracer_span(reporter, str(i)).finish()
+        await asyncio.sleep(0.01)
+    await reporter.close()
+
+    assert os.listdir(str(tmp_path)) == ['spans.thrift']
+    names = [
+        span.operationName
+        for batch in _read_thrift_records(path)
+        for span in batch.spans
+    ]
+    assert names == ['0', '1', '2']
+
+
+async def test_file_reporter_write_failure(tmp_path):
+    error_reporter = mock.MagicMock()
+    reporter = FileReporter(
+        str(tmp_path / 'missing' / 'spans.thrift'),
+        error_reporter=error_reporter, metrics_factory=FakeMetricsFactory(),
+    )
+    reporter.set_process('reporter_test', {})
+    _new_tracer_span(reporter).finish()
+    await reporter.close()
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_err'] == 1
+    assert error_reporter.error.called
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'encoding': 'xml'}, {'backup_count': -1},
+])
+async def test_file_reporter_invalid(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        FileReporter(str(tmp_path / 'spans'), **kwargs)
+
+
+async def test_composite_reporter_serializes_span_once():
+    first, first_session = _new_http_reporter(priority_queue_capacity=10)
+    second, second_session = _new_http_reporter()
+    otlp_reporter = OtlpHttpReporter(session=FakeSession())
+    memory = InMemoryReporter()
+    reporter = async_jaeger.reporter.CompositeReporter(
+        first, second, otlp_reporter, memory
+    )
+    reporter.set_process('reporter_test', {}, 10)
+    assert first._process.tags == second._process.tags
+
+    tracer = Tracer(
+        service_name='reporter_test', reporter=reporter,
+        sampler=ConstSampler(True)
+    )
+    with mock.patch.object(
+            thrift, 'serialize_span', wraps=thrift.serialize_span
+    ) as serialize_span:
+        tracer.start_span('regular').finish()
+        tracer.start_span('error', tags={'error': True}).finish()
+        # serialized by consumer of the first reporter
+        assert serialize_span.call_count == 0
+        assert len(first.priority_queue) == 1
+        await reporter.close()
+        assert serialize_span.call_count == 2
+
+    names = [
+        [
+            span.operationName for span in deserialize(
+                thrift.SPEC.Batch(), session.requests[0][1]
+            ).spans
+        ]
+        for session in (first_session, second_session)
+    ]
+    # the error span went to the priority lane of the first reporter
+    assert names == [['error', 'regular'], ['regular', 'error']]
+    assert len(otlp_reporter.session.requests) == 1
+    assert [span.operation_name for span in memory.get_spans()] == [
+        'regular', 'error',
+    ]
+
+
+async def test_composite_reporter_does_not_serialize_dropped_spans():
+    first, first_session = _new_http_reporter(queue_capacity=1)
+    second, second_session = _new_http_reporter(queue_capacity=1)
+    reporter = async_jaeger.reporter.CompositeReporter(first, second)
+    reporter.set_process('reporter_test', {})
+    with mock.patch.object(
+            thrift, 'serialize_span', wraps=thrift.serialize_span
+    ) as serialize_span:
+        for name in ('kept', 'dropped'):
+            _new_tracer_span(reporter, name).finish()
+        await reporter.close()
+        _new_tracer_span(reporter, 'closed').finish()
+    assert serialize_span.call_count == 1
+    assert first_session.requests[0][1] == second_session.requests[0][1]
+    for child in (first, second):
+        counters = child.metrics_factory.counters
+        assert counters['jaeger:reporter_dropped_spans.reason_queue_full'] == 1
+        assert counters['jaeger:reporter_dropped_spans.reason_closed'] == 1
+
+
+async def test_http_reporter_offloads_shared_spans():
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        reporter, session = _new_http_reporter(
+            batch_size=10, offload_threshold=2, executor=executor,
+        )
+        reporter.set_process('reporter_test', {})
+        spans = [_new_tracer_span(reporter, str(i)) for i in range(3)]
+        for span in spans:
+            span.end_time = span.start_time
+        shared = [SharedSpan(span) for span in spans]
+        shared[0].data = thrift.serialize_span(spans[0])
+        for span in shared:
+            reporter.report_shared_span(span)
+        await reporter.close()
+
+    # the other reporters reuse bytes serialized in executor
+    assert [span.data for span in shared] == [
+        thrift.serialize_span(span.span) for span in shared
+    ]
+    batch = deserialize(thrift.SPEC.Batch(), session.requests[0][1])
+    assert [span.operationName for span in batch.spans] == ['0', '1', '2']
+
+
+async def test_composite_reporter_shared_serialization_failure():
+    first, first_session = _new_http_reporter()
+    second, second_session = _new_http_reporter()
+    reporter = async_jaeger.reporter.CompositeReporter(first, second)
+    reporter.set_process('reporter_test', {})
+    span = _new_tracer_span(reporter)
+    span.references = [Reference('unknown', span.context)]
+    span.finish()
+    await reporter.close()
+    assert first_session.requests == second_session.requests == []
+    for child in (first, second):
+        counters = child.metrics_factory.counters
+        assert counters['jaeger:reporter_spans.result_err'] == 1
+
+
+async def test_http_reporter_shared_by_tracers():
+    reporter, session = _new_http_reporter(batch_size=4)
+    tracers = [
+        Tracer(
+            service_name=service_name, reporter=reporter,
+            sampler=ConstSampler(True), tags={'service': service_name},
+        )
+        for service_name in ('first', 'second')
+    ]
+    for i in range(4):
+        tracers[i % 2].start_span(str(i)).finish()
+    await reporter.close()
+
+    batches = [
+        deserialize(thrift.SPEC.Batch(), data)
+        for _, data, _ in session.requests
+    ]
+    assert [
+        (
+            batch.process.serviceName,
+            [span.operationName for span in batch.spans],
+        )
+        for batch in batches
+    ] == [('first', ['0', '2']), ('second', ['1', '3'])]
+    for batch in batches:
+        tags = {tag.key: tag.vStr for tag in batch.process.tags}
+        assert tags['service'] == batch.process.serviceName
+    counters = reporter.metrics_factory.counters
+    assert counters['jaeger:reporter_spans.result_ok'] == 4
+
+
+async def test_composite_reporter_shared_by_tracers():
+    first, first_session = _new_http_reporter(batch_size=2)
+    second, second_session = _new_http_reporter(batch_size=2)
+    reporter = async_jaeger.reporter.CompositeReporter(first, second)
+    for service_name in ('first', 'second'):
+        Tracer(
+            service_name=service_name, reporter=reporter,
+            sampler=ConstSampler(True),
+        ).start_span(service_name).finish()
+    await reporter.close()
+
+    for session in (first_session, second_session):
+        batches = [
+            deserialize(thrift.SPEC.Batch(), data)
+            for _, data, _ in session.requests
+        ]
+        assert [
+            (batch.process.serviceName, batch.spans[0].operationName)
+            for batch in batches
+        ] == [('first', 'first'), ('second', 'second')]
+
+
+async def test_reporter_get_load():
+    first, _ = _new_http_reporter(queue_capacity=4)
+    second, _ = _new_http_reporter(queue_capacity=2)
+    composite = async_jaeger.reporter.CompositeReporter(
+        first, second, InMemoryReporter()
+    )
+    assert composite.get_load() == 0.0
+    tracer = Tracer(
+        service_name='reporter_test', reporter=composite,
+        sampler=BackpressureSampler(
+            ConstSampler(True), composite, low_watermark=0.5,
+            high_watermark=1.0,
+        )
+    )
+    tracer.start_span('0').finish()
+    assert first.get_load() == 0.25
+    assert composite.get_load() == 0.5
+    # second reporter is full, sampling is shed
+    tracer.start_span('1').finish()
+    assert composite.get_load() == 1.0
+    assert not tracer.start_span('2').is_sampled()
+    await composite.close()
+    await tracer.sampler.close()
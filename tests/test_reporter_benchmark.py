@@ -0,0 +1,244 @@
+import asyncio
+import logging
+from typing import List
+
+import pytest
+
+from async_jaeger import ConstSampler, Tracer, thrift
+from async_jaeger.reporter import (
+    BatchReporter,
+    DropLowPriorityPolicy,
+    DropNewestPolicy,
+    DropOldestPolicy,
+    FileReporter,
+    InMemoryReporter,
+    LoggingReporter,
+    RootSpansOnlyPolicy,
+)
+
+
+SPANS = 10000
+
+
+def _generate_spans(count=SPANS):
+    tracer = Tracer(
+        service_name='benchmark', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True)
+    )
+    for i in range(count):
+        span = tracer.start_span('span-%d' % i)
+        span.set_tag('http.method', 'GET')
+        span.finish()
+    return tracer.reporter.get_spans()
+
+
+class NoopReporter(BatchReporter):
+    async def _send(self, data: bytes):
+        pass
+
+
+class QueueReporter(NoopReporter):
+    """
+    Consumer of the previous implementation: asyncio.Queue drained
+    with asyncio.wait_for() per span.
+    """
+    def __init__(self, **kwargs):
+        self.stop = object()
+        super().__init__(**kwargs)
+        self.queue = asyncio.Queue(maxsize=self.queue_capacity)
+
+    def report_span(self, span):
+        try:
+            self.queue.put_nowait(span)
+        except asyncio.QueueFull:
+            self.metrics.reporter_dropped(1)
+
+    async def _consume_queue(self):
+        spans: List[bytes] = []
+        stopped = False
+        while not stopped:
+            while len(spans) < self.batch_size:
+                try:
+                    span = await asyncio.wait_for(
+                        self.queue.get(),
+                        timeout=self.flush_interval if spans else None
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if span is self.stop:
+                    stopped = True
+                    break
+                spans.append(thrift.serialize_span(span, self.protocol))
+            if spans:
+                await self._submit(spans)
+                spans = []
+
+    async def close(self):
+        await self.queue.put(self.stop)
+        await self.task
+
+
+async def _report(reporter_class, spans):
+    reporter = reporter_class(queue_capacity=len(spans), batch_size=100)
+    reporter.set_process('benchmark', {})
+    for i, span in enumerate(spans):
+        reporter.report_span(span)
+        if i % 100 == 0:
+            # let consumer run like it would between requests
+            await asyncio.sleep(0)
+    await reporter.close()
+
+
+def _run(reporter_class, spans):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_report(reporter_class, spans))
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize(
+    'reporter_class', [QueueReporter, NoopReporter], ids=['queue', 'deque']
+)
+def test_reporter_throughput(benchmark, reporter_class):
+    spans = _generate_spans()
+    benchmark(_run, reporter_class, spans)
+    benchmark.extra_info['spans_per_second'] = SPANS / benchmark.stats['mean']
+
+
+def _generate_burst(traces=200, spans_per_trace=10):
+    tracer = Tracer(
+        service_name='benchmark', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True)
+    )
+    for i in range(traces):
+        root = tracer.start_span('root')
+        for j in range(spans_per_trace - 1):
+            span = tracer.start_span('child', child_of=root)
+            if i % 10 == 0 and j == 0:
+                span.set_tag('error', True)
+            span.finish()
+        root.finish()
+    return tracer.reporter.get_spans()
+
+
+async def _report_burst(policy, spans):
+    reporter = NoopReporter(queue_capacity=100, overflow_policy=policy)
+    reporter.set_process('benchmark', {})
+    # the whole burst is reported before the consumer runs
+    for span in spans:
+        reporter.report_span(span)
+    kept = {
+        'roots': sum(1 for span in reporter.queue if not span.parent_id),
+        'errors': sum(1 for span in reporter.queue if span.is_error()),
+    }
+    await reporter.close()
+    return kept
+
+
+@pytest.mark.parametrize('policy', [
+    DropNewestPolicy, DropOldestPolicy, DropLowPriorityPolicy,
+    RootSpansOnlyPolicy,
+])
+def test_reporter_burst(benchmark, policy):
+    spans = _generate_burst()
+    kept = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            kept.update(loop.run_until_complete(
+                _report_burst(policy(), spans)
+            ))
+        finally:
+            loop.close()
+
+    benchmark(run)
+    benchmark.extra_info.update(kept)
+
+
+def _new_file_reporter(tmp_path, encoding):
+    return FileReporter(
+        str(tmp_path / 'spans'), encoding=encoding,
+        queue_capacity=SPANS, batch_size=100,
+    )
+
+
+def _new_logging_reporter(tmp_path, encoding):
+    logger = logging.getLogger('benchmark.reporter')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        logger.addHandler(logging.FileHandler(str(tmp_path / 'spans.log')))
+    return LoggingReporter(logger)
+
+
+@pytest.mark.parametrize('new_reporter,encoding', [
+    (_new_logging_reporter, None),
+    (_new_file_reporter, 'thrift'),
+    (_new_file_reporter, 'json'),
+], ids=['logging', 'file-thrift', 'file-json'])
+def test_file_sink_throughput(benchmark, tmp_path, new_reporter, encoding):
+    spans = _generate_spans()
+
+    async def report():
+        reporter = new_reporter(tmp_path, encoding)
+        reporter.set_process('benchmark', {})
+        for i, span in enumerate(spans):
+            reporter.report_span(span)
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        await reporter.close()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(report())
+        finally:
+            loop.close()
+
+    benchmark(run)
+    benchmark.extra_info['spans_per_second'] = SPANS / benchmark.stats['mean']
+
+
+def _generate_roots(count, error=False):
+    tracer = Tracer(
+        service_name='benchmark', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True)
+    )
+    tags = {'error': True} if error else None
+    for _ in range(count):
+        tracer.start_span('root', tags=tags).finish()
+    return tracer.reporter.get_spans()
+
+
+@pytest.mark.parametrize('policy,error', [
+    (DropNewestPolicy, False),
+    (DropLowPriorityPolicy, True),
+    (RootSpansOnlyPolicy, False),
+])
+def test_reporter_overflow_full_queue(benchmark, policy, error):
+    """Cost of a dropped span with a full queue of roots nothing evicts."""
+    spans = _generate_roots(10000, error)
+    extra = _generate_roots(100, error)
+    loop = asyncio.new_event_loop()
+
+    async def new_reporter():
+        return NoopReporter(
+            queue_capacity=len(spans), overflow_policy=policy()
+        )
+
+    reporter = loop.run_until_complete(new_reporter())
+    reporter.set_process('benchmark', {})
+    for span in spans:
+        reporter.report_span(span)
+
+    def run():
+        for span in extra:
+            reporter.report_span(span)
+
+    try:
+        benchmark(run)
+    finally:
+        loop.run_until_complete(reporter.close())
+        loop.close()
@@ -3,12 +3,15 @@ import math
 import mock
 import pytest
 
+from async_jaeger.metrics import Metrics
+
 from async_jaeger.sampler import (
     ConstSampler,
     ProbabilisticSampler,
     RateLimitingSampler,
     GuaranteedThroughputProbabilisticSampler,
     AdaptiveSampler,
+    BackpressureSampler,
     get_sampling_probability,
     get_rate_limit,
 )
@@ -346,3 +349,68 @@ def test_get_sampling_probability(strategy, expected):
 ])
 def test_get_rate_limit(strategy, expected):
     assert math.fabs(expected - get_rate_limit(strategy)) < 0.0001
+
+
+def test_backpressure_sampler():
+    reporter = mock.MagicMock()
+    gauges = []
+    sampler = BackpressureSampler(
+        ProbabilisticSampler(0.5), reporter,
+        low_watermark=0.5, high_watermark=0.9, min_rate=0.1,
+        metrics=Metrics(gauge=lambda key, value: gauges.append((key, value))),
+    )
+    sampler.random = mock.MagicMock()
+
+    reporter.get_load.return_value = 0.2
+    sampled, tags = sampler.is_sampled(MAX_INT - 10)
+    assert sampled
+    assert tags == get_tags('probabilistic', 0.5)
+    assert not sampler.is_sampled(MAX_INT + 10)[0]
+    assert gauges == [('jaeger:sampler_effective_rate', 1.0)]
+
+    reporter.get_load.return_value = 0.7
+    assert sampler.get_rate() == pytest.approx(0.55)
+    sampler.random.random.return_value = 0.5
+    sampled, tags = sampler.is_sampled(MAX_INT - 10)
+    assert sampled
+    assert tags['sampler.param'] == pytest.approx(0.275)
+    assert sampler.sampler._tags == get_tags('probabilistic', 0.5)
+    sampler.random.random.return_value = 0.6
+    sampled, tags = sampler.is_sampled(MAX_INT - 10)
+    assert not sampled
+    assert not sampler.is_sampled(MAX_INT + 10)[0]
+
+    reporter.get_load.return_value = 1.0
+    assert sampler.get_rate() == 0.1
+    sampler.is_sampled(MAX_INT - 10)
+    reporter.get_load.return_value = 0.0
+    sampler.is_sampled(MAX_INT - 10)
+    assert [value for _, value in gauges] == [
+        1.0, pytest.approx(0.55), 0.1, 1.0,
+    ]
+    assert {key for key, _ in gauges} == {'jaeger:sampler_effective_rate'}
+    assert '%s' % sampler == (
+        'BackpressureSampler(ProbabilisticSampler(0.5), 0.500000, 0.900000)'
+    )
+
+
+def test_backpressure_sampler_keeps_rate_limiting_param():
+    reporter = mock.MagicMock()
+    reporter.get_load.return_value = 0.7
+    sampler = BackpressureSampler(RateLimitingSampler(10), reporter)
+    sampler.sampler.rate_limiter.balance = 10
+    sampler.random = mock.MagicMock()
+    sampler.random.random.return_value = 0.0
+    sampled, tags = sampler.is_sampled(MAX_INT - 10)
+    assert sampled
+    assert tags == get_tags('ratelimiting', 10)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'low_watermark': 0.9, 'high_watermark': 0.5},
+    {'high_watermark': 1.5},
+    {'min_rate': -1},
+])
+def test_backpressure_sampler_errors(kwargs):
+    with pytest.raises(ValueError):
+        BackpressureSampler(ConstSampler(True), mock.MagicMock(), **kwargs)
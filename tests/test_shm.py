@@ -0,0 +1,79 @@
+import multiprocessing
+import uuid
+
+import pytest
+
+from async_jaeger.shm import (
+    RECORD_HEADER, RECORD_PROCESS, RECORD_SPAN, SharedRing
+)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing(
+        'jaeger-test-%s' % uuid.uuid4().hex[:8], size=64,
+        protocol='compact', create=True
+    )
+    yield ring
+    ring.close()
+
+
+def test_shared_ring_fifo(ring):
+    assert ring.take() == []
+    assert ring.put(b'process', RECORD_PROCESS)
+    assert ring.put(b'span')
+    assert len(ring) == 2 * RECORD_HEADER.size + len(b'processspan')
+    assert ring.take(limit=1) == [(RECORD_PROCESS, b'process')]
+    assert ring.take() == [(RECORD_SPAN, b'span')]
+    assert len(ring) == 0
+
+
+def test_shared_ring_wrap_around(ring):
+    record = b'x' * 20
+    for i in range(10):
+        data = bytes([i]) + record
+        assert ring.put(data)
+        assert ring.take() == [(RECORD_SPAN, data)]
+
+
+def test_shared_ring_full(ring):
+    record = b'x' * (32 - RECORD_HEADER.size)
+    assert ring.put(record)
+    assert ring.put(record)
+    assert not ring.put(b'')
+    assert len(ring.take()) == 2
+    assert not ring.put(b'x' * 64)
+
+
+def test_shared_ring_attach(ring):
+    attached = SharedRing(ring.name)
+    assert attached.size == 64
+    assert attached.protocol == 'compact'
+    assert attached.put(b'span')
+    attached.close()
+    assert ring.take() == [(RECORD_SPAN, b'span')]
+
+
+def _write_spans(name, count):
+    ring = SharedRing(name)
+    for i in range(count):
+        while not ring.put(b'span-%d' % i):
+            pass
+    ring.close()
+
+
+def test_shared_ring_other_process(ring):
+    process = multiprocessing.get_context('fork').Process(
+        target=_write_spans, args=(ring.name, 100)
+    )
+    process.start()
+    records = []
+    while len(records) < 100:
+        records.extend(data for _, data in ring.take())
+    process.join()
+    assert records == [b'span-%d' % i for i in range(100)]
+
+
+def test_shared_ring_unknown_protocol():
+    with pytest.raises(ValueError):
+        SharedRing('jaeger-test-unknown', protocol='json', create=True)
@@ -78,6 +78,19 @@ def test_is_rpc():
     assert span.is_rpc_client() is True
 
 
+def test_is_error():
+    mock_tracer = mock.MagicMock()
+    mock_tracer.max_tag_value_length = 100
+    ctx = SpanContext(trace_id=1, span_id=2, parent_id=None, flags=1)
+
+    span = Span(context=ctx, operation_name='x', tracer=mock_tracer)
+    assert span.is_error() is False
+    span.set_tag(ext_tags.ERROR, False)
+    assert span.is_error() is False
+    span.set_tag(ext_tags.ERROR, True)
+    assert span.is_error() is True
+
+
 def test_sampling_priority(tracer):
     tracer.sampler = ConstSampler(False)
     span = tracer.start_span(operation_name='x')
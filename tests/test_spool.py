@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+from async_jaeger.spool import RECORD_HEADER, Spool
+
+
+def _records(spool):
+    result = []
+    while True:
+        record = spool.peek()
+        if record is None:
+            return result
+        result.append(record)
+        spool.consume()
+
+
+def test_spool_fifo(tmp_path):
+    spool = Spool(str(tmp_path))
+    assert spool.peek() is None
+    assert spool.append(b'first', 1) == 0
+    assert spool.append(b'second', 2) == 0
+    assert len(spool) == 2
+    assert spool.spans == 3
+
+    assert spool.peek() == (b'first', 1)
+    assert spool.peek() == (b'first', 1)
+    spool.consume()
+    assert _records(spool) == [(b'second', 2)]
+    assert len(spool) == 0
+    spool.close()
+
+
+def test_spool_rotation_and_eviction(tmp_path):
+    record_size = RECORD_HEADER.size + 10
+    spool = Spool(
+        str(tmp_path), segment_bytes=2 * record_size,
+        max_bytes=4 * record_size
+    )
+    evicted = [spool.append(b'%010d' % i, i) for i in range(6)]
+    # third segment evicts the first one with spans 0 and 1
+    assert evicted == [0, 0, 0, 0, 1, 0]
+    assert len(os.listdir(str(tmp_path))) == 2
+    assert [spans for _, spans in _records(spool)] == [2, 3, 4, 5]
+    spool.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_spool_eviction_while_peeked(tmp_path):
+    record_size = RECORD_HEADER.size + 1
+    spool = Spool(
+        str(tmp_path), segment_bytes=record_size, max_bytes=2 * record_size
+    )
+    spool.append(b'a', 1)
+    assert spool.peek() == (b'a', 1)
+    assert spool.append(b'b', 2) == 0
+    # the segment being delivered is kept, the next one is evicted
+    assert spool.append(b'c', 3) == 2
+    spool.consume()
+    assert _records(spool) == [(b'c', 3)]
+    spool.close()
+
+
+def test_spool_eviction_of_peeked_segment(tmp_path):
+    record_size = RECORD_HEADER.size + 1
+    spool = Spool(
+        str(tmp_path), segment_bytes=record_size, max_bytes=record_size
+    )
+    spool.append(b'a', 1)
+    assert spool.peek() == (b'a', 1)
+    assert spool.append(b'b', 2) == 1
+    # consuming evicted batch does not touch the next one
+    spool.consume()
+    assert _records(spool) == [(b'b', 2)]
+    spool.close()
+
+
+def test_spool_too_large(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=100)
+    with pytest.raises(ValueError):
+        spool.append(b'x' * 100, 1)
+    spool.close()
+
+
+def test_spool_recovery(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=1024)
+    for i in range(3):
+        spool.append(b'batch-%d' % i, i)
+    spool.consume()
+    spool.close()
+
+    spool = Spool(str(tmp_path), segment_bytes=1024)
+    assert len(spool) == 2
+    spool.append(b'batch-3', 3)
+    assert _records(spool) == [
+        (b'batch-1', 1), (b'batch-2', 2), (b'batch-3', 3)
+    ]
+    spool.close()
+
+
+def test_spool_recovery_truncated_record(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=1024)
+    spool.append(b'complete', 1)
+    spool.append(b'truncated', 2)
+    segment = spool.segments[0]
+    # simulate crash in the middle of writing the second record payload
+    offset = segment.records[1][0] + RECORD_HEADER.size
+    segment.mmap[offset:offset + 4] = b'\x00' * 4
+    spool.close()
+
+    spool = Spool(str(tmp_path), segment_bytes=1024)
+    assert len(spool) == 1
+    spool.append(b'next', 3)
+    spool.close()
+
+    spool = Spool(str(tmp_path), segment_bytes=1024)
+    assert _records(spool) == [(b'complete', 1), (b'next', 3)]
+    spool.close()
+
+
+def test_spool_recovery_empty_segment(tmp_path):
+    open(str(tmp_path / ('%020d.spool' % 5)), 'wb').close()
+    spool = Spool(str(tmp_path), segment_bytes=1024)
+    assert len(spool) == 0
+    spool.append(b'batch', 1)
+    assert os.listdir(str(tmp_path)) == ['%020d.spool' % 6]
+    spool.close()
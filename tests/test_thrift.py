@@ -0,0 +1,130 @@
+import pickle
+
+import pytest
+from opentracing import Reference, child_of, follows_from
+from thriftpy2.protocol import TCompactProtocolFactory
+from thriftpy2.utils import deserialize
+
+from async_jaeger import ConstSampler, Tracer, thrift
+from async_jaeger.reporter import InMemoryReporter
+
+
+@pytest.fixture
+def spans():
+    tracer = Tracer(
+        service_name='test_thrift', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True)
+    )
+    result = []
+    for i in range(20):
+        span = tracer.start_span('span-%d' % i)
+        span.set_tag('index', i)
+        span.log_kv({'event': 'log'})
+        span.finish()
+        result.append(span)
+    return result
+
+
+@pytest.fixture
+def process():
+    return thrift.make_process('test_thrift', {'ip': '127.0.0.1'})
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+@pytest.mark.parametrize('count', [0, 1, 14, 15, 20])
+def test_serialize_batch(spans, process, protocol, count):
+    spans = spans[:count]
+    expected = thrift.serialize_struct(
+        thrift.make_batch(spans=spans, process=process), protocol
+    )
+    result = thrift.serialize_batch(
+        spans=[
+            thrift.serialize_struct(thrift.make_span(span), protocol)
+            for span in spans
+        ],
+        process=thrift.serialize_struct(process, protocol),
+        protocol=protocol,
+    )
+    assert result == expected
+
+
+def test_serialize_batch_compact_roundtrip(spans, process):
+    data = thrift.serialize_batch(
+        spans=[
+            thrift.serialize_struct(thrift.make_span(span), 'compact')
+            for span in spans
+        ],
+        process=thrift.serialize_struct(process, 'compact'),
+        protocol='compact',
+    )
+    batch = deserialize(thrift.SPEC.Batch(), data, TCompactProtocolFactory())
+    assert batch.process == process
+    assert [span.operationName for span in batch.spans] == [
+        span.operation_name for span in spans
+    ]
+
+
+@pytest.mark.parametrize('value', [0, 1, 127, 128, 300, 1 << 35])
+def test_make_varint(value):
+    data = thrift.make_varint(value)
+    result = 0
+    for shift, byte in enumerate(data):
+        result |= (byte & 0x7f) << (7 * shift)
+    assert result == value
+    assert all(byte & 0x80 for byte in data[:-1])
+    assert not data[-1] & 0x80
+
+
+@pytest.fixture
+def complex_span():
+    tracer = Tracer(
+        service_name='test_thrift', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True), generate_128bit_trace_id=True,
+    )
+    root = tracer.start_span('root')
+    other = tracer.start_span('other')
+    span = tracer.start_span(
+        'ünicode', references=[child_of(root.context), follows_from(other)]
+    )
+    span.set_tag('str', 'value')
+    span.set_tag('int', -42)
+    span.set_tag('float', 1.5)
+    span.set_tag('true', True)
+    span.set_tag('false', False)
+    span.set_tag('bytes', b'\x00\xff')
+    for i in range(20):
+        span.set_tag('tag-%d' % i, i)
+    span.log_kv({'event': 'log', 'value': 1 << 62})
+    span.finish()
+    return span
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+def test_serialize_span(spans, complex_span, protocol):
+    for span in spans + [complex_span]:
+        expected = thrift.serialize_struct(thrift.make_span(span), protocol)
+        assert thrift.serialize_span(span, protocol) == expected
+
+
+def test_serialize_span_unknown_reference(complex_span):
+    complex_span.references = [Reference('unknown', complex_span.context)]
+    with pytest.raises(ValueError):
+        thrift.serialize_span(complex_span)
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+def test_serialize_span_record(complex_span, protocol):
+    record = pickle.loads(pickle.dumps(thrift.make_span_record(complex_span)))
+    assert thrift.serialize_span(record, protocol) == thrift.serialize_span(
+        complex_span, protocol
+    )
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+def test_serialize_batch_parts(spans, process, protocol):
+    process = thrift.serialize_struct(process, protocol)
+    serialized = [thrift.serialize_span(span, protocol) for span in spans]
+    head, tail = thrift.serialize_batch_parts(serialized, process, protocol)
+    assert head + b''.join(serialized) + tail == thrift.serialize_batch(
+        serialized, process, protocol
+    )
@@ -0,0 +1,39 @@
+import pytest
+
+from async_jaeger import ConstSampler, Tracer, thrift
+from async_jaeger.reporter import InMemoryReporter
+
+
+def _generate_spans(count=100):
+    tracer = Tracer(
+        service_name='benchmark', reporter=InMemoryReporter(),
+        sampler=ConstSampler(True)
+    )
+    for i in range(count):
+        span = tracer.start_span('span-%d' % i)
+        span.set_tag('http.method', 'GET')
+        span.set_tag('http.status_code', 200)
+        span.set_tag('error', False)
+        span.log_kv({'event': 'request', 'size': 1024})
+        span.finish()
+    return tracer.reporter.get_spans()
+
+
+def _make_span_serialize(spans, protocol):
+    for span in spans:
+        thrift.serialize_struct(thrift.make_span(span), protocol)
+
+
+def _serialize_span(spans, protocol):
+    for span in spans:
+        thrift.serialize_span(span, protocol)
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+def test_make_span_serialize(benchmark, protocol):
+    benchmark(_make_span_serialize, _generate_spans(), protocol)
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'compact'])
+def test_serialize_span(benchmark, protocol):
+    benchmark(_serialize_span, _generate_spans(), protocol)
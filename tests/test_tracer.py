@@ -162,6 +162,26 @@ def test_sampler_effects(tracer):
     tracer.close()
 
 
+def test_record_unsampled():
+    reporter = mock.MagicMock()
+    tracer = Tracer(
+        service_name='test', reporter=reporter, sampler=ConstSampler(False)
+    )
+    span = tracer.start_span('test', tags={'key': 'value'})
+    span.finish()
+    assert not span.tags
+    reporter.report_span.assert_not_called()
+
+    tracer.record_unsampled = True
+    span = tracer.start_span('test', tags={'key': 'value'})
+    span.log_kv({'event': 'log'})
+    span.finish()
+    assert not span.is_sampled()
+    assert find_tag(span, 'key') == 'value'
+    assert len(span.logs) == 1
+    reporter.report_span.assert_called_once_with(span)
+
+
 @pytest.mark.parametrize('inject_mode', ['span', 'context'])
 def test_serialization(tracer, inject_mode):
     span = tracer.start_span('help')